@@ -0,0 +1,2 @@
+"""Stand-alone performance benchmarks. Run from the project root, e.g.
+``python -m benchmarks.bench_db_write --rows 1000000``."""
@@ -0,0 +1,41 @@
+# benchmarks/bench_backtest.py
+"""
+Time a (fast, slow) SMA-window sweep over a synthetic universe.
+
+    python -m benchmarks.bench_backtest --tickers 3000 --years 5 --fast 5:100:5 --slow 110:300:10
+"""
+from __future__ import annotations
+import argparse
+import time
+import pandas as pd
+from src.backtest import parse_windows, summarize, sweep, window_pairs
+from benchmarks.synthetic import BARS_PER_YEAR, synthetic_history
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tickers", type=int, default=3000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--fast", default="5:100:5")
+    parser.add_argument("--slow", default="110:300:10")
+    args = parser.parse_args()
+
+    bars = args.years * BARS_PER_YEAR
+    closes = pd.DataFrame({
+        f"T{i:04d}": synthetic_history(f"T{i:04d}", bars)["Close"].to_numpy() for i in range(args.tickers)
+    })
+    fast, slow = parse_windows(args.fast), parse_windows(args.slow)
+    pairs = len(window_pairs(fast, slow))
+
+    start = time.perf_counter()
+    results = sweep(closes, fast, slow)
+    elapsed = time.perf_counter() - start
+
+    print(f"tickers={args.tickers} bars={bars} pairs={pairs} ({len(fast)}x{len(slow)})")
+    print(f"  sweep: {elapsed:7.2f}s  {pairs / elapsed:6.1f} pairs/sec  "
+          f"{pairs * args.tickers / elapsed:>10,.0f} ticker-backtests/sec")
+    print(summarize(results).head(5).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
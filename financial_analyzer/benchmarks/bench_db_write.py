@@ -0,0 +1,81 @@
+# benchmarks/bench_db_write.py
+"""
+Compare daily_metrics write throughput (rows/sec) of the legacy per-row
+INSERT OR REPLACE loop against the bulk upsert in database.save_daily_metrics.
+
+    python -m benchmarks.bench_db_write --rows 1000000
+"""
+from __future__ import annotations
+import argparse
+import tempfile
+import time
+import pathlib
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+from src.database import init_db, get_engine, save_daily_metrics
+
+
+def make_frame(rows: int, tickers: int = 100) -> pd.DataFrame:
+    """Synthetic processed frame with `rows` rows spread across `tickers` symbols."""
+    rng = np.random.default_rng(0)
+    per = -(-rows // tickers)
+    dates = pd.bdate_range("2000-01-03", periods=per)
+    close = 100 + rng.standard_normal(per * tickers).cumsum()
+    df = pd.DataFrame({
+        "ticker": np.repeat([f"T{i:04d}" for i in range(tickers)], per),
+        "date": np.tile(dates, tickers),
+        "open": close, "high": close + 1, "low": close - 1, "close": close,
+        "volume": rng.integers(1_000, 1_000_000, per * tickers),
+        "sma50": close, "sma200": close,
+        "price_to_book": np.nan, "bvps": np.nan, "enterprise_value": np.nan,
+    })
+    return df.iloc[:rows]
+
+
+def legacy_save_daily_metrics(df: pd.DataFrame, engine) -> None:
+    """The original implementation: one INSERT OR REPLACE per row, default pragmas."""
+    conn = engine.connect()
+    df2 = df.copy()
+    df2["date"] = pd.to_datetime(df2["date"]).dt.date
+    records = df2.to_dict(orient="records")
+    with conn.begin():
+        for r in records:
+            sql = f'INSERT OR REPLACE INTO daily_metrics ({", ".join(r.keys())}) VALUES ({", ".join(f":{k}" for k in r.keys())})'
+            conn.execute(sa.text(sql), r)
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--skip-legacy", action="store_true", help="Only time the bulk path")
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        if not args.skip_legacy:
+            engine = sa.create_engine(f"sqlite:///{pathlib.Path(tmp, 'legacy.db')}", future=True)
+            init_db(engine)
+            results["legacy"] = _timed(lambda: legacy_save_daily_metrics(df, engine))
+            engine.dispose()
+
+        engine = get_engine(str(pathlib.Path(tmp, "bulk.db")))
+        init_db(engine)
+        results["bulk insert"] = _timed(lambda: save_daily_metrics(df, engine=engine))
+        # second pass hits ON CONFLICT DO UPDATE for every row
+        results["bulk upsert"] = _timed(lambda: save_daily_metrics(df, engine=engine))
+        engine.dispose()
+
+    for name, secs in results.items():
+        print(f"{name:>12}: {len(df):>9,d} rows in {secs:7.2f}s  {len(df) / secs:>12,.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# benchmarks/bench_fetch.py
+"""
+Fetch latency for many tickers against the synthetic stub provider: serial
+fetch_stock_data versus the concurrent, rate-limited ConcurrentFetcher.
+
+    python -m benchmarks.bench_fetch --tickers 500 --latency 0.05
+"""
+from __future__ import annotations
+import argparse
+import time
+from src.data_fetcher import fetch_stock_data
+from src.fetch_pool import ConcurrentFetcher
+from benchmarks.synthetic import SyntheticYFinance
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per fake upstream call")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--rate", type=float, default=200.0, help="Token-bucket calls/sec (0 = unlimited)")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--serial-sample", type=int, default=50,
+                        help="Tickers timed on the serial path (extrapolated to --tickers)")
+    args = parser.parse_args()
+    symbols = [f"T{i:04d}" for i in range(args.tickers)]
+
+    provider = SyntheticYFinance(latency=args.latency, fail_rate=0.0)
+    sample = symbols[:args.serial_sample]
+    start = time.perf_counter()
+    for s in sample:
+        fetch_stock_data(s, ticker_factory=provider, use_cache=False)
+    serial = (time.perf_counter() - start) / len(sample) * len(symbols)
+
+    provider = SyntheticYFinance(latency=args.latency, fail_rate=args.fail_rate)
+    start = time.perf_counter()
+    with ConcurrentFetcher(max_workers=args.workers, rate_per_sec=args.rate or None, burst=args.workers,
+                           backoff_base=0.01, ticker_factory=provider, use_cache=False) as fetcher:
+        results = fetcher.fetch_many(symbols)
+    concurrent = time.perf_counter() - start
+    failed = sum(isinstance(r, Exception) for r in results.values())
+
+    print(f"tickers={args.tickers} latency={args.latency * 1000:.0f}ms/call workers={args.workers} rate={args.rate}/s")
+    print(f"  serial (extrapolated from {len(sample)}): {serial:8.2f}s  {args.tickers / serial:8.1f} tickers/sec")
+    print(f"  concurrent:                    {concurrent:8.2f}s  {args.tickers / concurrent:8.1f} tickers/sec"
+          f"  upstream calls={provider.calls} failed={failed}")
+
+
+if __name__ == "__main__":
+    main()
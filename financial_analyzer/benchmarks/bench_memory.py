@@ -0,0 +1,48 @@
+# benchmarks/bench_memory.py
+"""
+Memory per 1M processed rows, default vs compact frames (process_panel on
+synthetic data), and the largest relative deviation compact mode introduces.
+
+    python -m benchmarks.bench_memory --tickers 800 --years 5
+"""
+from __future__ import annotations
+import argparse
+import time
+import numpy as np
+from src.processor import build_panel, process_panel
+from benchmarks.synthetic import generate_universe
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tickers", type=int, default=800)
+    parser.add_argument("--years", type=float, default=5)
+    args = parser.parse_args()
+
+    prices, fundamentals = build_panel(generate_universe(args.tickers, years=args.years))
+    start = time.perf_counter()
+    full = process_panel(prices, fundamentals)
+    t_full = time.perf_counter() - start
+    start = time.perf_counter()
+    small = process_panel(prices, fundamentals, compact_frame=True)
+    t_small = time.perf_counter() - start
+
+    per_m = 1_000_000 / len(full)
+    a = full.memory_usage(deep=True).sum() * per_m / 2**20
+    b = small.memory_usage(deep=True).sum() * per_m / 2**20
+    print(f"rows: {len(full):,d}")
+    print(f"default  {a:8.1f} MB per 1M rows  ({t_full:.2f}s)")
+    print(f"compact  {b:8.1f} MB per 1M rows  ({t_small:.2f}s)  {a / b:.2f}x smaller")
+
+    worst = 0.0
+    for col in small.columns:
+        if small[col].dtype.kind == "f":
+            x, y = full[col].to_numpy(), small[col].to_numpy(dtype=float)
+            mask = np.isfinite(x) & (x != 0)
+            if mask.any():
+                worst = max(worst, float(np.max(np.abs(y[mask] - x[mask]) / np.abs(x[mask]))))
+    print(f"max relative deviation of compact floats: {worst:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# benchmarks/bench_panel.py
+"""
+Per-ticker process_data loop versus one process_panel call over the same
+synthetic universe.
+
+    python -m benchmarks.bench_panel --tickers 1000 --bars 1250
+"""
+from __future__ import annotations
+import argparse
+import time
+import pandas as pd
+from src.data_fetcher import fetch_stock_data
+from src.processor import build_panel, process_data, process_panel
+from benchmarks.synthetic import SyntheticYFinance
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tickers", type=int, default=1000)
+    parser.add_argument("--bars", type=int, default=1250)
+    args = parser.parse_args()
+
+    provider = SyntheticYFinance(latency=0.0, bars=args.bars)
+    raws = [fetch_stock_data(f"T{i:04d}", ticker_factory=provider, use_cache=False) for i in range(args.tickers)]
+    rows = sum(len(r["prices"]) for r in raws)
+
+    start = time.perf_counter()
+    pd.concat([process_data(r) for r in raws], ignore_index=True)
+    loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    prices, fundamentals = build_panel(raws)
+    process_panel(prices, fundamentals)
+    panel = time.perf_counter() - start
+
+    print(f"tickers={args.tickers} rows={rows:,d}")
+    print(f"  process_data loop: {loop:7.2f}s  {rows / loop:>12,.0f} rows/sec")
+    print(f"  process_panel:     {panel:7.2f}s  {rows / panel:>12,.0f} rows/sec  ({loop / panel:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# benchmarks/bench_pipeline.py
+"""
+Batch wall time of the per-ticker thread pool (analyze_ticker per worker)
+against the pipelined executor (fetch threads, process threads, one
+batching writer) over synthetic tickers with simulated network latency.
+
+    python -m benchmarks.bench_pipeline --tickers 200 --latency 0.05 --workers 8
+"""
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import os
+import pathlib
+import tempfile
+import time
+from src.database import get_engine, init_db
+from src.fetch_pool import ConcurrentFetcher
+from src.main import analyze_ticker
+from src.pipeline import Pipeline
+from benchmarks.synthetic import SyntheticYFinance
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tickers", type=int, default=100)
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per simulated upstream call")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    stub = SyntheticYFinance(years=args.years, latency=args.latency)
+    symbols = [f"T{i:05d}" for i in range(args.tickers)]
+    print(f"{os.cpu_count()} CPUs, {args.tickers} tickers x {args.years}y, {args.latency * 1000:.0f}ms per call")
+    # both sides fetch through the same unthrottled fetcher, as `batch` does
+    fetcher = ConcurrentFetcher(max_workers=args.workers, rate_per_sec=None, retries=0,
+                                ticker_factory=stub, use_cache=False)
+    with fetcher, tempfile.TemporaryDirectory() as tmp:
+        engine = get_engine(str(pathlib.Path(tmp, "pool.db")))
+        init_db(engine)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            list(pool.map(lambda t: analyze_ticker(t, engine=engine, fetcher=fetcher, validation=None), symbols))
+        pooled = time.perf_counter() - start
+
+        engine = get_engine(str(pathlib.Path(tmp, "pipe.db")))
+        init_db(engine)
+        pipeline = Pipeline(engine, fetcher=fetcher, fetch_workers=args.workers, validation=None)
+        start = time.perf_counter()
+        results = pipeline.run(symbols)
+        piped = time.perf_counter() - start
+        write = pipeline.writer_timer.as_dict()["write"]["wall_s"]
+        assert all(r["ok"] for r in results)
+
+    print(f"{'thread pool':>14}: {pooled:7.2f}s  {args.tickers / pooled:8.1f} tickers/sec")
+    print(f"{'pipeline':>14}: {piped:7.2f}s  {args.tickers / piped:8.1f} tickers/sec  (writer busy {write:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# benchmarks/bench_shards.py
+"""
+Compare daily_metrics write throughput (rows/sec) of one SQLite file against
+a ShardedStore written by threads (save_daily_metrics) and by one process
+per shard (bulk_save_daily_metrics). Gains need as many free cores as shards.
+
+    python -m benchmarks.bench_shards --rows 2000000 --shards 1,4,8
+"""
+from __future__ import annotations
+import argparse
+import os
+import pathlib
+import tempfile
+import time
+from src.database import get_engine, init_db, save_daily_metrics
+from src.sharding import ShardedStore, bulk_save_daily_metrics
+from benchmarks.bench_db_write import make_frame
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--shards", default="1,4,8", help="Comma-separated shard counts (1 = single file)")
+    args = parser.parse_args()
+
+    df = make_frame(args.rows, tickers=args.tickers)
+    print(f"{os.cpu_count()} CPUs, {len(df):,d} rows, {args.tickers} tickers")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in (int(s) for s in args.shards.split(",")):
+            db_path = pathlib.Path(tmp, f"s{n}.db")
+            if n == 1:
+                engine = get_engine(str(db_path))
+                init_db(engine)
+                results = {"single file": _timed(lambda engine=engine: save_daily_metrics(df, engine=engine))}
+                engine.dispose()
+            else:
+                threads = ShardedStore(db_path, n)
+                threads.init()
+                procs = ShardedStore(pathlib.Path(tmp, f"p{n}.db"), n)
+                procs.init()
+                results = {
+                    f"{n} shards/threads": _timed(lambda threads=threads: threads.save_daily_metrics(df)),
+                    f"{n} shards/procs": _timed(lambda procs=procs: bulk_save_daily_metrics(df, procs)),
+                }
+            for name, secs in results.items():
+                print(f"{name:>18}: {secs:7.2f}s  {len(df) / secs:>12,.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/bench_startup.py
+"""
+CLI startup time: median wall time of fresh interpreter invocations of
+`--help` and the DB-only `scan` command, plus the heavy modules each one
+ends up importing. Target: under 200 ms for non-fetching commands.
+
+    python -m benchmarks.bench_startup --repeat 10
+"""
+from __future__ import annotations
+import argparse
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HEAVY_MODULES = ["pandas", "sqlalchemy", "yfinance", "pydantic", "pyarrow"]
+TARGET_MS = 200
+
+# imports the CLI like `python -m src.main ...` does and reports heavy modules loaded
+_PROBE = (
+    "import sys, runpy; sys.argv = ['main'] + sys.argv[1:]\n"
+    "try:\n    runpy.run_module('src.main', run_name='__main__')\n"
+    "except SystemExit:\n    pass\n"
+    f"print('HEAVY=' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules), file=sys.stderr)\n"
+)
+
+
+def time_command(args, cwd, env, repeat):
+    cmd = [sys.executable, "-m", "src.main", *args]
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=cwd, env=env, capture_output=True, check=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    probe = subprocess.run([sys.executable, "-c", _PROBE, *args], cwd=cwd, env=env, capture_output=True, text=True)
+    heavy = [line for line in probe.stderr.splitlines() if line.startswith("HEAVY=")]
+    return statistics.median(samples), (heavy[-1][6:] if heavy else "?")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    root = pathlib.Path(__file__).resolve().parents[1]
+    env = {**os.environ, "PYTHONPATH": str(root)}
+    with tempfile.TemporaryDirectory() as tmp:
+        pathlib.Path(tmp, "config.yaml").write_text(
+            f"database:\n  path: \"{pathlib.Path(tmp, 'bench.db').as_posix()}\"\nlogging:\n  level: WARNING\n"
+        )
+        subprocess.run([sys.executable, "-m", "src.main", "scan"], cwd=tmp, env=env, capture_output=True, check=True)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            subprocess.run([sys.executable, "-c", "pass"], check=True)
+        interp = (time.perf_counter() - start) * 1000 / args.repeat
+        print(f"{'python -c pass':<24} {interp:7.1f} ms")
+        for command in (["--help"], ["scan", "--help"], ["run", "--help"], ["scan"]):
+            ms, heavy = time_command(command, tmp, env, args.repeat)
+            flag = "ok" if ms < TARGET_MS else f"over {TARGET_MS} ms"
+            print(f"{' '.join(command):<24} {ms:7.1f} ms  [{flag}]  heavy imports: {heavy or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
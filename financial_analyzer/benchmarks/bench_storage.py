@@ -0,0 +1,54 @@
+# benchmarks/bench_storage.py
+"""
+Compare a universe-wide scan of a few daily_metrics columns from SQLite
+against the partitioned Parquet backend (column pruning + memory mapping).
+
+    python -m benchmarks.bench_storage --tickers 1000 --bars 1250 --columns date,close,sma200
+"""
+from __future__ import annotations
+import argparse
+import tempfile
+import time
+import pathlib
+import pandas as pd
+from src.database import init_db, get_engine, save_daily_metrics
+from src.storage import ParquetStore
+from benchmarks.bench_db_write import make_frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tickers", type=int, default=1000)
+    parser.add_argument("--bars", type=int, default=1250)
+    parser.add_argument("--columns", default="date,close,sma200")
+    args = parser.parse_args()
+    columns = args.columns.split(",")
+
+    df = make_frame(args.tickers * args.bars, tickers=args.tickers)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = get_engine(str(pathlib.Path(tmp, "bench.db")))
+        init_db(engine)
+        store = ParquetStore(pathlib.Path(tmp, "pq"))
+
+        t0 = time.perf_counter()
+        save_daily_metrics(df, engine=engine)
+        t1 = time.perf_counter()
+        store.save_daily_metrics(df)
+        t2 = time.perf_counter()
+        print(f"write  sqlite {t1 - t0:7.2f}s   parquet {t2 - t1:7.2f}s   ({len(df):,d} rows)")
+
+        t0 = time.perf_counter()
+        a = pd.read_sql(f"SELECT ticker, {', '.join(columns)} FROM daily_metrics ORDER BY ticker, date",
+                        engine, parse_dates=["date"] if "date" in columns else None)
+        t1 = time.perf_counter()
+        b = store.read_daily_metrics(columns=columns)
+        t2 = time.perf_counter()
+        print(f"scan   sqlite {t1 - t0:7.2f}s   parquet {t2 - t1:7.2f}s   "
+              f"({len(a):,d}/{len(b):,d} rows, columns {columns})")
+        print(f"memory sqlite {a.memory_usage(deep=True).sum() / 2**20:7.1f}MB parquet "
+              f"{b.memory_usage(deep=True).sum() / 2**20:7.1f}MB")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/bench_validation.py
+"""
+Compare price validation throughput (rows/sec) of the per-row pydantic
+models.PriceRow path against the columnar validation.validate_prices.
+
+    python -m benchmarks.bench_validation --tickers 1000 --years 5
+"""
+from __future__ import annotations
+import argparse
+import time
+import warnings
+import pandas as pd
+from src.validation import validate_prices
+from benchmarks.synthetic import BARS_PER_YEAR, synthetic_history
+
+
+def make_panel(tickers: int, bars: int) -> pd.DataFrame:
+    """Long (ticker, date) price panel in fetch_stock_data's column layout."""
+    frames = []
+    for i in range(tickers):
+        h = synthetic_history(f"T{i:04d}", bars).rename_axis("date").reset_index()
+        h.columns = [c.lower().replace(" ", "_") for c in h.columns]
+        frames.append(h.assign(ticker=f"T{i:04d}"))
+    return pd.concat(frames, ignore_index=True)
+
+
+def pydantic_validate(df: pd.DataFrame) -> int:
+    """The per-row path: one PriceRow per bar; returns the number of invalid rows."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        from src.models import PriceRow
+    errors = 0
+    for r in df.assign(date=df["date"].astype(str)).to_dict("records"):
+        try:
+            PriceRow(**r)
+        except ValueError:
+            errors += 1
+    return errors
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - start, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tickers", type=int, default=1000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--pydantic-rows", type=int, default=100_000,
+                        help="Rows validated through pydantic (extrapolated; it is slow)")
+    args = parser.parse_args()
+
+    df = make_panel(args.tickers, args.years * BARS_PER_YEAR)
+    # a sprinkle of bad bars so every check has work to report
+    bad = df.sample(frac=0.001, random_state=0).index
+    df.loc[bad, "low"] = df.loc[bad, "high"] * 1.01
+    print(f"{len(df):,d} rows, {args.tickers} tickers")
+
+    subset = df.iloc[:args.pydantic_rows]
+    secs, errors = _timed(lambda: pydantic_validate(subset))
+    print(f"{'pydantic':>16}: {len(subset):>10,d} rows in {secs:7.2f}s  {len(subset) / secs:>12,.0f} rows/sec  "
+          f"({errors} invalid)")
+    for policy in ("warn", "drop", "repair"):
+        secs, (_, report) = _timed(lambda policy=policy: validate_prices(df, policy=policy))
+        print(f"{'columnar/' + policy:>16}: {len(df):>10,d} rows in {secs:7.2f}s  {len(df) / secs:>12,.0f} rows/sec  "
+              f"({report.counts['ohlc_bounds']} ohlc_bounds, {report.rows_out:,d} kept)")
+
+
+if __name__ == "__main__":
+    main()
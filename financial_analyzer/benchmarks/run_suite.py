@@ -0,0 +1,211 @@
+# benchmarks/run_suite.py
+"""
+End-to-end pipeline benchmark on synthetic data.
+Times each stage separately (fetch via the synthetic yfinance stub,
+process_data, signal detection, save_daily_metrics/save_signal_events,
+JSON export) at several universe sizes and writes throughput and peak
+memory to a JSON file. Each scale runs in a fresh subprocess so its peak
+RSS is its own. `--compare` checks a previous results file for regressions.
+
+    python -m benchmarks.run_suite --scales 1,100,5000 --years 5 --output bench_results.json
+    python -m benchmarks.run_suite --scales 1,100 --compare bench_results.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import pathlib
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+STAGES = ["fetch", "process", "signals", "save", "export"]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class StageClock:
+    """Accumulates wall time (and optionally traced peak memory) per stage."""
+
+    def __init__(self, trace_memory: bool):
+        self.seconds = {s: 0.0 for s in STAGES}
+        self.peak_traced = {s: 0 for s in STAGES}
+        self.trace_memory = trace_memory
+
+    @contextmanager
+    def stage(self, name: str):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+            if self.trace_memory:
+                self.peak_traced[name] = max(self.peak_traced[name], tracemalloc.get_traced_memory()[1])
+
+
+def run_scale(n_tickers: int, years: float, trace_memory: bool) -> Dict[str, Any]:
+    """Run the pipeline stages over n synthetic tickers in this process."""
+    from src.data_fetcher import fetch_stock_data
+    from src.database import get_engine, init_db, save_daily_metrics, save_signal_events, utc_now
+    from src.processor import process_data
+    from src.signals import detect_death_cross, detect_golden_crossover
+    from benchmarks.synthetic import SyntheticYFinance
+
+    stub = SyntheticYFinance(years=years)
+    clock = StageClock(trace_memory)
+    rows = 0
+    if trace_memory:
+        tracemalloc.start()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = get_engine(str(pathlib.Path(tmp, "bench.db")))
+        init_db(engine)
+        for i in range(n_tickers):
+            ticker = f"T{i:05d}"
+            with clock.stage("fetch"):
+                raw = fetch_stock_data(ticker, ticker_factory=stub, use_cache=False)
+            with clock.stage("process"):
+                processed = process_data(raw)
+                processed["date"] = processed["date"].dt.tz_localize(None)
+            with clock.stage("signals"):
+                events = [{"date": d, "signal_type": "golden_cross", "meta": {}} for d in detect_golden_crossover(processed)]
+                events += [{"date": d, "signal_type": "death_cross", "meta": {}} for d in detect_death_cross(processed)]
+            with clock.stage("save"):
+                save_daily_metrics(processed, engine=engine)
+                save_signal_events(ticker, events, engine=engine)
+            with clock.stage("export"):
+                payload = {
+                    "ticker": ticker,
+                    "generated_at": utc_now().isoformat(),
+                    "price_rows_count": int(len(processed)),
+                    "fundamentals_used": raw["source_info"]["used"],
+                    "signals": events,
+                }
+                with open(pathlib.Path(tmp, f"{ticker}.json"), "w", encoding="utf8") as f:
+                    json.dump(payload, f, indent=2)
+            rows += len(processed)
+        engine.dispose()
+    if trace_memory:
+        tracemalloc.stop()
+
+    stages = {}
+    for s in STAGES:
+        secs = clock.seconds[s]
+        stages[s] = {
+            "seconds": round(secs, 4),
+            "tickers_per_sec": round(n_tickers / secs, 2) if secs else None,
+            "rows_per_sec": round(rows / secs, 1) if secs else None,
+        }
+        if trace_memory:
+            stages[s]["peak_traced_mb"] = round(clock.peak_traced[s] / 2**20, 2)
+    total = sum(clock.seconds.values())
+    return {
+        "scale": n_tickers,
+        "years": years,
+        "trace_memory": trace_memory,
+        "rows": rows,
+        "total_seconds": round(total, 4),
+        "tickers_per_sec": round(n_tickers / total, 2) if total else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "stages": stages,
+    }
+
+
+def _metadata() -> Dict[str, Any]:
+    import numpy
+    import pandas
+    import sqlalchemy
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandas": pandas.__version__,
+        "numpy": numpy.__version__,
+        "sqlalchemy": sqlalchemy.__version__,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Stages at a common scale whose time grew by more than `threshold` (fraction)."""
+    base = {r["scale"]: r for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        b = base.get(r["scale"])
+        # tracemalloc slows every stage, so only like-for-like runs are compared
+        if b is None or b.get("years") != r.get("years") or b.get("trace_memory") != r.get("trace_memory"):
+            continue
+        for s in STAGES:
+            old, new = b["stages"][s]["seconds"], r["stages"][s]["seconds"]
+            if old and new > old * (1 + threshold):
+                regressions.append(f"scale={r['scale']} {s}: {old:.3f}s -> {new:.3f}s (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def _print(result: Dict[str, Any]):
+    print(f"scale={result['scale']} years={result['years']} rows={result['rows']:,d} "
+          f"total={result['total_seconds']:.2f}s ({result['tickers_per_sec']} tickers/sec) "
+          f"peak_rss={result['peak_rss_mb']} MB")
+    for s, v in result["stages"].items():
+        mem = f"  traced_peak={v['peak_traced_mb']} MB" if "peak_traced_mb" in v else ""
+        print(f"  {s:>8}: {v['seconds']:9.3f}s  {v['tickers_per_sec'] or 0:>10,.1f} tickers/s  "
+              f"{v['rows_per_sec'] or 0:>12,.0f} rows/s{mem}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scales", default="1,100,5000", help="Comma-separated ticker counts")
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--output", default="bench_results.json", help="Machine-readable results file")
+    parser.add_argument("--trace-memory", action="store_true", help="Per-stage tracemalloc peaks (slower)")
+    parser.add_argument("--compare", help="Previous results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown fraction for --compare")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)  # child mode: one scale, JSON to stdout
+    args = parser.parse_args()
+
+    if args.single is not None:
+        import logging
+        logging.disable(logging.INFO)
+        print(json.dumps(run_scale(args.single, args.years, args.trace_memory)))
+        return
+
+    results = []
+    for scale in (int(s) for s in args.scales.split(",") if s.strip()):
+        cmd = [sys.executable, "-m", "benchmarks.run_suite", "--single", str(scale), "--years", str(args.years)]
+        if args.trace_memory:
+            cmd.append("--trace-memory")
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        _print(result)
+        results.append(result)
+
+    report = {"meta": _metadata(), "results": results}
+    pathlib.Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf8")
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(pathlib.Path(args.compare).read_text(encoding="utf8"))
+        regressions = compare(report, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# benchmarks/synthetic.py
+"""
+Deterministic synthetic market data and a yfinance stand-in.
+Every ticker gets its own reproducible geometric random walk of OHLCV bars
+and quarterly fundamentals (seeded from the symbol), so benchmarks and
+tests can run any N tickers x M years without the network.
+"""
+from __future__ import annotations
+from functools import lru_cache
+from typing import Any, Dict, Iterator
+import random
+import re
+import threading
+import time
+import zlib
+import numpy as np
+import pandas as pd
+
+END_DATE = "2025-10-01"
+BARS_PER_YEAR = 252
+
+
+@lru_cache(maxsize=16)
+def _business_days(bars: int, end: str = END_DATE) -> pd.DatetimeIndex:
+    # building a business-day index is slow; share one per length
+    return pd.bdate_range(end=end, periods=bars, tz="America/New_York", name="Date")
+
+
+def _rng(ticker: str, seed: int) -> np.random.Generator:
+    return np.random.default_rng((zlib.crc32(ticker.encode()), seed))
+
+
+def synthetic_history(ticker: str, bars: int, seed: int = 0) -> pd.DataFrame:
+    """yfinance-shaped history: tz-aware 'Date' index and Open/High/Low/Close/Adj Close/Volume."""
+    rng = _rng(ticker, seed)
+    drift = rng.normal(0.0003, 0.0004)
+    vol = rng.uniform(0.01, 0.03)
+    close = rng.uniform(20, 500) * np.exp(np.cumsum(rng.normal(drift, vol, bars)))
+    open_ = close * np.exp(rng.normal(0, vol / 3, bars))
+    spread = np.abs(rng.normal(0, vol / 2, bars))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    return pd.DataFrame({
+        "Open": open_, "High": high, "Low": low, "Close": close, "Adj Close": close,
+        "Volume": rng.integers(10_000, 5_000_000, bars),
+    }, index=_business_days(bars))
+
+
+def synthetic_balance_sheet(ticker: str, quarters: int, seed: int = 0) -> pd.DataFrame:
+    """yfinance-shaped quarterly balance sheet: one column per quarter end, newest first."""
+    rng = _rng(ticker, seed + 1)
+    ends = pd.date_range(end=END_DATE, periods=quarters, freq="QE")[::-1]
+    equity = rng.uniform(1e9, 5e10) * np.exp(np.cumsum(rng.normal(0.01, 0.03, quarters)))
+    return pd.DataFrame(
+        {
+            end: {
+                "Total Stockholder Equity": equity[i],
+                "Total Debt": equity[i] * 0.4,
+                "Cash And Cash Equivalents": equity[i] * 0.1,
+                "Ordinary Shares Number": 1e9,
+            }
+            for i, end in enumerate(ends)
+        }
+    )
+
+
+def synthetic_fundamentals(ticker: str, quarters: int, seed: int = 0) -> list[Dict[str, Any]]:
+    """Quarterly fundamentals as the list of FundamentalsQuarter-style dicts process_data takes."""
+    bs = synthetic_balance_sheet(ticker, quarters, seed)
+    return [
+        {
+            "as_of": str(col.date()),
+            "total_stockholder_equity": bs[col]["Total Stockholder Equity"],
+            "total_debt": bs[col]["Total Debt"],
+            "cash_and_cash_equivalents": bs[col]["Cash And Cash Equivalents"],
+            "shares_outstanding": bs[col]["Ordinary Shares Number"],
+            "market_cap": bs[col]["Total Stockholder Equity"] * 3,
+        }
+        for col in bs.columns
+    ]
+
+
+def generate_universe(n_tickers: int, years: float = 5, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """Yield raw_data dicts (fetch_stock_data shape) for T00000..T{n-1}."""
+    bars = int(years * BARS_PER_YEAR)
+    for i in range(n_tickers):
+        ticker = f"T{i:05d}"
+        prices = synthetic_history(ticker, bars, seed).rename_axis("date").reset_index()
+        prices.columns = [c.lower().replace(" ", "_") for c in prices.columns]
+        yield {
+            "ticker": ticker,
+            "prices": prices,
+            "fundamentals": synthetic_fundamentals(ticker, max(1, int(years * 4)), seed),
+            "source_info": {"used": "synthetic"},
+        }
+
+
+def _period_bars(period: str, default: int) -> int:
+    m = re.fullmatch(r"(\d+)(d|mo|y)", period or "")
+    if not m:
+        return default
+    n, unit = int(m.group(1)), m.group(2)
+    return {"d": n, "mo": n * 21, "y": n * BARS_PER_YEAR}[unit]
+
+
+class SyntheticYFinance:
+    """
+    Ticker factory standing in for yf.Ticker (pass as ticker_factory).
+    Optional per-call latency and random failure rate simulate the network;
+    `calls` counts upstream calls across all tickers.
+    """
+
+    def __init__(self, years: float = 5, bars: int | None = None, latency: float = 0.0,
+                 fail_rate: float = 0.0, seed: int = 0):
+        self.bars = bars or int(years * BARS_PER_YEAR)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.seed = seed
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, symbol: str) -> "SyntheticTicker":
+        return SyntheticTicker(symbol, self)
+
+    def _hit(self):
+        with self._lock:
+            self.calls += 1
+            fail = self._rng.random() < self.fail_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise ConnectionError("synthetic transient failure")
+
+
+class SyntheticTicker:
+    def __init__(self, symbol: str, provider: SyntheticYFinance):
+        self.symbol = symbol
+        self._p = provider
+
+    def history(self, period: str = "5y", start: str | None = None, auto_adjust: bool = False, **_):
+        self._p._hit()
+        df = synthetic_history(self.symbol, self._p.bars, self._p.seed)
+        if start is not None:
+            return df[df.index.tz_localize(None) >= pd.Timestamp(start)]
+        return df.iloc[-_period_bars(period, self._p.bars):]
+
+    @property
+    def quarterly_balance_sheet(self):
+        self._p._hit()
+        return synthetic_balance_sheet(self.symbol, max(1, self._p.bars // 63), self._p.seed)
+
+    @property
+    def balance_sheet(self):
+        self._p._hit()
+        return pd.DataFrame()
+
+    @property
+    def info(self):
+        self._p._hit()
+        return {"sharesOutstanding": 1e9, "marketCap": 1e11, "totalDebt": 1e10, "cash": 1e9}
@@ -0,0 +1,252 @@
+# src/backtest.py
+"""
+Vectorized crossover backtests and SMA-window parameter sweeps.
+Closes are pivoted once into a (dates x tickers) matrix and turned into
+prefix sums; the SMA for any window is then one subtraction of two shifted
+prefix-sum rows, so a whole (fast, slow) grid is evaluated without ever
+re-running process_data. Every pair is simulated for all tickers at once
+with NumPy array operations.
+
+Strategy: long after a golden cross (fast SMA moves above slow, same rule as
+signals.py), flat after a death cross. Positions are taken at the close of
+the signal bar and earn from the next bar on. SMAs average partial windows
+(min_periods=1) like indicators.sma unless `full_windows` is set, so the
+50/200 pair trades exactly the crosses the pipeline stores.
+"""
+from __future__ import annotations
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+METRICS = ["total_return", "cagr", "hit_rate", "max_drawdown", "trades", "turnover", "exposure"]
+
+
+def parse_windows(spec: str) -> List[int]:
+    """'10,20,50' or 'start:stop:step' (stop inclusive) -> sorted unique windows."""
+    spec = str(spec).strip()
+    if ":" in spec:
+        parts = [int(p) for p in spec.split(":")]
+        start, stop, step = (parts + [1])[:3] if len(parts) == 2 else parts
+        windows = range(start, stop + 1, step)
+    else:
+        windows = (int(p) for p in spec.split(",") if p.strip())
+    out = sorted(set(windows))
+    if not out or out[0] < 1:
+        raise ValueError(f"Invalid window spec {spec!r}")
+    return out
+
+
+def window_pairs(fast: Iterable[int], slow: Iterable[int]) -> List[Tuple[int, int]]:
+    """All (fast, slow) combinations with fast < slow."""
+    return [(f, s) for f in sorted(set(fast)) for s in sorted(set(slow)) if f < s]
+
+
+def close_matrix(df: pd.DataFrame) -> pd.DataFrame:
+    """Long (ticker, date, close) rows -> wide dates x tickers close frame."""
+    wide = df.pivot_table(index="date", columns="ticker", values="close", aggfunc="last", observed=True)
+    wide.columns = wide.columns.astype(str)
+    return wide.sort_index()
+
+
+def load_closes(
+    store=None,
+    tickers: Optional[Iterable[str]] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> pd.DataFrame:
+    """Stored closes as a wide frame; `store` is an engine, a ShardedStore or a ParquetStore."""
+    from .storage import ParquetStore, ShardedStore
+
+    if isinstance(store, (ParquetStore, ShardedStore)):
+        df = store.read_daily_metrics(["date", "close"], tickers=tickers, start=start, end=end)
+    else:
+        from .database import get_engine
+
+        clauses, params = [], {}
+        if tickers is not None:
+            tickers = list(tickers)
+            params.update({f"t{i}": t for i, t in enumerate(tickers)})
+            clauses.append(f"ticker IN ({', '.join(f':t{i}' for i in range(len(tickers)))})" if tickers else "0")
+        if start is not None:
+            params["start"] = start.isoformat()
+            clauses.append("date >= :start")
+        if end is not None:
+            params["end"] = end.isoformat()
+            clauses.append("date <= :end")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT ticker, date, close FROM daily_metrics {where} ORDER BY ticker, date"
+        with (store or get_engine()).connect() as conn:
+            df = pd.read_sql_query(sql, conn.connection.driver_connection, params=params, parse_dates=["date"])
+    return close_matrix(df)
+
+
+class PrefixSMA:
+    """
+    SMAs of every window from one cumulative sum of the close matrix.
+    Missing closes (before listing, gaps in a panel) are skipped: the mean is
+    over the valid closes inside the last `window` dates.
+    """
+
+    def __init__(self, closes: np.ndarray, full_windows: bool = False):
+        self.valid = ~np.isnan(closes)
+        self.full_windows = full_windows
+        # summing deviations from each column's first close keeps the prefix
+        # sums small, so differences of them lose less precision
+        first = np.argmax(self.valid, axis=0)
+        self.offset = np.nan_to_num(closes[first, np.arange(closes.shape[1])])
+        zero = np.zeros((1, closes.shape[1]))
+        self.sums = np.vstack([zero, np.cumsum(np.where(self.valid, closes - self.offset, 0.0), axis=0)])
+        self.counts = np.vstack([zero, np.cumsum(self.valid, axis=0, dtype=np.float64)])
+
+    def _window(self, prefix: np.ndarray, window: int) -> np.ndarray:
+        out = prefix[1:].copy()
+        if window < len(out):
+            out[window:] -= prefix[1:len(prefix) - window]
+        return out
+
+    def __call__(self, window: int) -> np.ndarray:
+        count = self._window(self.counts, window)
+        need = window if self.full_windows else 1
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sma = self._window(self.sums, window) / count + self.offset
+        sma[(count < need) | ~self.valid] = np.nan
+        return sma
+
+
+def _last_true(events: np.ndarray) -> np.ndarray:
+    """Row index of the latest True at or before each row (-1 when none yet)."""
+    rows = np.arange(len(events), dtype=np.int32)[:, None]
+    return np.maximum.accumulate(np.where(events, rows, np.int32(-1)), axis=0)
+
+
+def simulate(
+    fast_sma: np.ndarray,
+    slow_sma: np.ndarray,
+    log_returns: np.ndarray,
+    cost: float = 0.0,
+) -> Dict[str, np.ndarray]:
+    """
+    Run the crossover strategy for one window pair on every column at once.
+    `log_returns[t]` is log(close[t] / close[t-1]) (0 where undefined); each
+    position change costs the fraction `cost` of equity.
+    Returns per-column arrays: final log equity, max drawdown, trades,
+    position changes, bars held, closed trades and winning trades.
+    """
+    with np.errstate(invalid="ignore"):
+        diff = fast_sma - slow_sma
+        above, below = diff > 0, diff < 0
+    # golden: fast > slow after fast <= slow on the previous bar (death mirrored)
+    known = ~np.isnan(diff[:-1])
+    golden = above.copy()
+    golden[0] = False
+    golden[1:] &= ~above[:-1] & known
+    death = below.copy()
+    death[0] = False
+    death[1:] &= ~below[:-1] & known
+
+    # long while the latest cross is a golden one
+    pos = _last_true(golden) > _last_true(death)
+    held = np.zeros_like(pos)
+    held[1:] = pos[:-1]
+    entries = pos & ~held
+    closing = held & ~pos
+    log_eq = np.where(held, log_returns, 0.0)
+    if cost:
+        log_eq += np.log1p(-cost) * (entries | closing)
+    np.cumsum(log_eq, axis=0, out=log_eq)
+
+    peak = np.maximum.accumulate(log_eq, axis=0)
+    np.maximum(peak, 0.0, out=peak)
+    max_dd = -np.expm1((log_eq - peak).min(axis=0))
+
+    # a trade runs from the close before its entry bar (so the entry cost
+    # counts) to the exit bar's close; open trades are marked to the last bar.
+    # Entries and closings alternate per column, so in column-major order the
+    # k-th entry pairs with the k-th closing.
+    closing[-1] |= pos[-1]
+    base = np.empty_like(log_eq)
+    base[0] = 0.0
+    base[1:] = log_eq[:-1]
+    won = log_eq.T[closing.T] > base.T[entries.T]
+    closed_col = np.nonzero(closing.T)[0]
+    n = pos.shape[1]
+    return {
+        "log_equity": log_eq[-1],
+        "max_drawdown": max_dd,
+        "trades": entries.sum(axis=0),
+        "changes": entries.sum(axis=0) + (held & ~pos).sum(axis=0),
+        "bars_held": pos.sum(axis=0),
+        "closed": np.bincount(closed_col, minlength=n),
+        "wins": np.bincount(closed_col, weights=won, minlength=n),
+    }
+
+
+def sweep(
+    closes: pd.DataFrame,
+    fast: Sequence[int],
+    slow: Sequence[int],
+    full_windows: bool = False,
+    cost_bps: float = 0.0,
+    periods_per_year: int = TRADING_DAYS,
+) -> pd.DataFrame:
+    """
+    Backtest every (fast, slow) pair with fast < slow over all tickers of the
+    wide `closes` frame (see close_matrix). `cost_bps` is charged on each
+    position change. One row per (fast, slow, ticker) with METRICS columns:
+    total/annualized return, hit rate of closed trades (open trades are
+    marked to the last bar), max drawdown, trade count, position changes per
+    year and the fraction of bars held.
+    """
+    pairs = window_pairs(fast, slow)
+    tickers = list(closes.columns)
+    values = closes.to_numpy(dtype=np.float64)
+    if not pairs or values.size == 0:
+        return pd.DataFrame(columns=["fast", "slow", "ticker"] + METRICS)
+
+    sma = PrefixSMA(values, full_windows=full_windows)
+    filled = closes.ffill().to_numpy(dtype=np.float64)
+    log_returns = np.zeros_like(filled)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        log_returns[1:] = np.log(filled[1:] / filled[:-1])
+    log_returns[~np.isfinite(log_returns)] = 0.0
+    years = np.maximum(np.count_nonzero(sma.valid, axis=0), 1) / periods_per_year
+    cost = cost_bps / 10_000
+
+    results: Dict[str, np.ndarray] = {m: np.empty((len(pairs), len(tickers))) for m in METRICS}
+    for i, (f, s) in enumerate(pairs):
+        # pairs are ordered by fast window: derive it once per run of pairs
+        if i == 0 or f != pairs[i - 1][0]:
+            fast_sma = sma(f)
+        r = simulate(fast_sma, sma(s), log_returns, cost=cost)
+        results["total_return"][i] = np.expm1(r["log_equity"])
+        results["cagr"][i] = np.expm1(r["log_equity"] / years)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            results["hit_rate"][i] = np.where(r["closed"] > 0, r["wins"] / r["closed"], np.nan)
+        results["max_drawdown"][i] = r["max_drawdown"]
+        results["trades"][i] = r["trades"]
+        results["turnover"][i] = r["changes"] / years
+        results["exposure"][i] = r["bars_held"] / (years * periods_per_year)
+    logger.info("Backtested %d window pairs over %d tickers", len(pairs), len(tickers))
+
+    out = pd.DataFrame({
+        "fast": np.repeat([p[0] for p in pairs], len(tickers)),
+        "slow": np.repeat([p[1] for p in pairs], len(tickers)),
+        "ticker": np.tile(np.asarray(tickers, dtype=object), len(pairs)),
+        **{m: results[m].ravel() for m in METRICS},
+    })
+    out["trades"] = out["trades"].astype(np.int64)
+    return out
+
+
+def summarize(results: pd.DataFrame, sort_by: str = "total_return") -> pd.DataFrame:
+    """Per window pair: mean of each metric across tickers (median return too), best first."""
+    grouped = results.groupby(["fast", "slow"])
+    summary = grouped[METRICS].mean()
+    summary.insert(1, "median_return", grouped["total_return"].median())
+    summary.insert(0, "tickers", grouped.size())
+    return summary.sort_values(sort_by, ascending=False).reset_index()
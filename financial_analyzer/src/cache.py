@@ -0,0 +1,206 @@
+# src/cache.py
+"""
+Persistent on-disk cache for raw yfinance responses.
+Entries are keyed by (ticker, period, endpoint) and stored as pickle
+(protocol 5: DataFrames go out as raw binary column blocks) with per-endpoint
+TTLs and size-bounded LRU eviction. In offline mode entries never expire and
+misses raise CacheMiss instead of touching the network.
+
+The cache size is tracked as a running byte total (one directory scan when the
+cache is opened, then updated per write and delete), so writes only sweep the
+directory once the total goes over max_bytes.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, Optional
+import hashlib
+import logging
+import os
+import pathlib
+import pickle
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# seconds; prices move daily, balance sheets quarterly
+DEFAULT_TTLS: Dict[str, int] = {
+    "history": 6 * 3600,
+    "quarterly_balance_sheet": 7 * 86400,
+    "balance_sheet": 30 * 86400,
+    "info": 86400,
+}
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class CacheMiss(KeyError):
+    """Raised in offline mode when a response is not cached."""
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        directory: str | pathlib.Path = ".cache/yfinance",
+        ttl: Optional[Dict[str, int]] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        offline: bool = False,
+    ):
+        self.directory = pathlib.Path(directory).expanduser()
+        self.ttl = {**DEFAULT_TTLS, **(ttl or {})}
+        self.max_bytes = int(max_bytes)
+        self.offline = offline
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._bytes = sum(size for _, size, _ in self._entries())
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any], offline: bool = False) -> Optional["ResponseCache"]:
+        """Build the cache from the `cache` config section; None when disabled (and online)."""
+        c = cfg.get("cache", {})
+        if not c.get("enabled", False) and not offline:
+            return None
+        return cls(
+            directory=c.get("dir", ".cache/yfinance"),
+            ttl=c.get("ttl"),
+            max_bytes=c.get("max_bytes", DEFAULT_MAX_BYTES),
+            offline=offline,
+        )
+
+    def _path(self, ticker: str, period: str, endpoint: str) -> pathlib.Path:
+        digest = hashlib.sha1(f"{ticker.upper()}|{period}|{endpoint}".encode()).hexdigest()
+        return self.directory / f"{endpoint}-{digest[:20]}.pkl"
+
+    def get(self, ticker: str, period: str, endpoint: str, loader: Callable[[], Any]) -> Any:
+        """Return the cached response, calling `loader` (and storing its result) on a miss."""
+        path = self._path(ticker, period, endpoint)
+        entry = self._read(path)
+        if entry is not None:
+            age = time.time() - entry["fetched_at"]
+            if self.offline or age <= self.ttl.get(endpoint, 0):
+                logger.debug("Cache hit %s %s %s (age %.0fs)", ticker, endpoint, period, age)
+                os.utime(path)  # mark as recently used for LRU eviction
+                return entry["value"]
+        if self.offline:
+            raise CacheMiss(f"{ticker} {endpoint} ({period}) not in cache")
+
+        value = loader()
+        self._write(path, {"fetched_at": time.time(), "key": (ticker, period, endpoint), "value": value})
+        return value
+
+    def _read(self, path: pathlib.Path) -> Optional[Dict[str, Any]]:
+        try:
+            with path.open("rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.warning("Discarding unreadable cache entry %s", path)
+            self._unlink(path)
+            return None
+
+    def _write(self, path: pathlib.Path, entry: Dict[str, Any]):
+        # write to a temp file and rename so concurrent readers never see partial data
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(entry, f, protocol=5)
+                size = f.tell()
+            replaced = _size(path)
+            os.replace(tmp, path)
+        except Exception:
+            pathlib.Path(tmp).unlink(missing_ok=True)
+            logger.exception("Failed to write cache entry %s", path)
+            return
+        with self._lock:
+            self._bytes += size - replaced
+            over = self._bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def _unlink(self, path: pathlib.Path):
+        size = _size(path)
+        path.unlink(missing_ok=True)
+        with self._lock:
+            self._bytes -= size
+
+    def _entries(self):
+        entries = []
+        for p in self.directory.glob("*.pkl"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        return entries
+
+    def evict(self) -> int:
+        """
+        Delete least recently used entries until the cache fits max_bytes.
+        Rescans the directory, which also resyncs the running total with
+        entries written or deleted by other processes.
+        """
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for _, size, p in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                p.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+            self._bytes = total
+        if removed:
+            logger.debug("Evicted %d cache entries", removed)
+        return removed
+
+
+def _size(path: pathlib.Path) -> int:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+class CachedTicker:
+    """
+    Drop-in stand-in for yf.Ticker that serves history, balance sheets and
+    info through a ResponseCache. The real ticker is only built on a miss.
+    """
+
+    def __init__(self, ticker: str, cache: ResponseCache, factory: Callable[[str], Any]):
+        self.ticker = ticker
+        self._cache = cache
+        self._factory = factory
+        self._t = None
+
+    @property
+    def _upstream(self):
+        if self._t is None:
+            self._t = self._factory(self.ticker)
+        return self._t
+
+    def history(self, **kwargs):
+        key = ",".join(f"{k}={kwargs[k]}" for k in sorted(kwargs))
+        return self._cache.get(self.ticker, key, "history", lambda: self._upstream.history(**kwargs))
+
+    @property
+    def quarterly_balance_sheet(self):
+        return self._cache.get(self.ticker, "-", "quarterly_balance_sheet", lambda: self._upstream.quarterly_balance_sheet)
+
+    @property
+    def balance_sheet(self):
+        return self._cache.get(self.ticker, "-", "balance_sheet", lambda: self._upstream.balance_sheet)
+
+    @property
+    def info(self):
+        return self._cache.get(self.ticker, "-", "info", lambda: self._upstream.info)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 import pathlib
 import yaml
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,7 +9,8 @@ logger = logging.getLogger(__name__)
 DEFAULTS: Dict[str, Any] = {
     "database": {"path": "financial_data.db"},
     "logging": {"level": "INFO"},
-    "data_settings": {"historical_period": "5y", "min_trading_days_for_sma": 200},
+    "data_settings": {"historical_period": "5y", "min_trading_days_for_sma": 200, "fundamentals_max_age_days": 7},
+    "cache": {"enabled": False, "dir": ".cache/yfinance", "max_bytes": 512 * 1024 * 1024, "ttl": {}},
 }
 
 
@@ -27,4 +28,21 @@ def load_config(path: str | pathlib.Path = "config.yaml") -> Dict[str, Any]:
     merged["database"] = {**DEFAULTS["database"], **cfg.get("database", {})}
     merged["logging"] = {**DEFAULTS["logging"], **cfg.get("logging", {})}
     merged["data_settings"] = {**DEFAULTS["data_settings"], **cfg.get("data_settings", {})}
-    return merged
\ No newline at end of file
+    merged["cache"] = {**DEFAULTS["cache"], **cfg.get("cache", {})}
+    return merged
+
+_CONFIG: Optional[Dict[str, Any]] = None
+
+
+def get_config() -> Dict[str, Any]:
+    """Process-wide config: config.yaml is parsed on first use only."""
+    global _CONFIG
+    if _CONFIG is None:
+        _CONFIG = load_config()
+    return _CONFIG
+
+
+def set_config(cfg: Dict[str, Any]):
+    """Install an already loaded config (e.g. passed to pool worker processes)."""
+    global _CONFIG
+    _CONFIG = cfg
@@ -5,15 +5,15 @@ Uses yfinance and Pydantic models for validation and fallback strategies.
 """
 from __future__ import annotations
 import logging
-from typing import Dict, Any
-import yfinance as yf
-from datetime import datetime
+from typing import Any, Callable, Collection, Dict, List, Optional, Tuple
+import pandas as pd
+from datetime import date, datetime
 from decimal import Decimal
 from .models import FundamentalsQuarter
-from .config import load_config
+from .config import get_config
+from .cache import CacheMiss, ResponseCache, CachedTicker
 
 logger = logging.getLogger(__name__)
-CONFIG = load_config()
 
 
 def _decimal_or_none(x):
@@ -25,27 +25,59 @@ def _decimal_or_none(x):
         return None
 
 
-def fetch_stock_data(ticker: str, period: str | None = None) -> Dict[str, Any]:
+def yf_ticker(ticker: str):
+    """yf.Ticker, importing yfinance (slow to import) only when really fetching."""
+    import yfinance as yf
+    return yf.Ticker(ticker)
+
+
+_DEFAULT_CACHE: ResponseCache | None = None
+
+
+def default_cache() -> ResponseCache | None:
+    """Response cache built from the `cache` config section (None if disabled)."""
+    global _DEFAULT_CACHE
+    cfg = get_config()
+    if _DEFAULT_CACHE is None and cfg["cache"].get("enabled", False):
+        _DEFAULT_CACHE = ResponseCache.from_config(cfg)
+    return _DEFAULT_CACHE
+
+
+def open_ticker(
+    ticker: str,
+    cache: ResponseCache | None = None,
+    ticker_factory: Callable[[str], Any] | None = None,
+    use_cache: bool = True,
+):
     """
-    Fetch price history and fundamental snapshots for ticker.
+    Build the ticker handle used by the fetch helpers: `ticker_factory` (default
+    yf.Ticker) wrapped in CachedTicker when a cache is configured and wanted.
+    """
+    factory = ticker_factory or yf_ticker
+    cache = (cache or default_cache()) if use_cache else None
+    return CachedTicker(ticker, cache, factory) if cache is not None else factory(ticker)
 
-    Returns raw dict:
-      {
-        "ticker": "NVDA",
-        "prices": pd.DataFrame,  # with Date index
-        "fundamentals": list[FundamentalsQuarter dicts],
-        "source_info": {"used": "...", "notes": "..."}
-      }
+
+def fetch_prices(t, ticker: str, period: str | None = None, start: date | None = None) -> pd.DataFrame:
+    """
+    Fetch and normalize the price history (lower-case columns, 'date' column).
+    Offline, a `start` with no cached response of its own is cut from the
+    cached `period` history, so incremental runs work from a full run's cache.
     """
     if period is None:
-        period = CONFIG["data_settings"].get("historical_period", "5y")
-
-    logger.info("Fetching %s with period=%s", ticker, period)
-    t = yf.Ticker(ticker)
+        period = get_config()["data_settings"].get("historical_period", "5y")
 
-    # 1) Fetch prices
     try:
-        prices = t.history(period=period, auto_adjust=False)
+        if start is not None:
+            logger.info("Fetching %s from start=%s", ticker, start)
+            try:
+                prices = t.history(start=start.isoformat(), auto_adjust=False)
+            except CacheMiss:
+                prices = t.history(period=period, auto_adjust=False)
+                prices = prices[prices.index.date >= start]
+        else:
+            logger.info("Fetching %s with period=%s", ticker, period)
+            prices = t.history(period=period, auto_adjust=False)
     except Exception as e:
         logger.exception("Failed to fetch price history for %s: %s", ticker, e)
         raise
@@ -55,10 +87,23 @@ def fetch_stock_data(ticker: str, period: str | None = None) -> Dict[str, Any]:
     prices = prices.rename_axis("date").reset_index()
     # later processing expects 'Close' etc., but we'll standardize to lowercase
     prices.columns = [c.lower().replace(" ", "_") for c in prices.columns]
+    return prices
 
-    # 2) Fetch fundamentals with fallback strategy
+
+def fetch_fundamentals(
+    t, ticker: str, known_quarters: Optional[Collection[str]] = None
+) -> Tuple[List[Dict[str, Any]], str | None]:
+    """
+    Fetch fundamentals with fallback strategy (quarterly -> annual -> info).
+    Returns (list of FundamentalsQuarter dicts, source used or None).
+    Balance-sheet columns whose ISO as_of date is in `known_quarters`
+    (already stored) are skipped instead of being parsed and validated again;
+    restatements of those quarters are then missed, so refreshes pass none.
+    """
     source_used = None
     fundamentals = []
+    known = set(known_quarters or ())
+    skipped = 0
 
     # Try quarterly financials (balance sheet, cashflow)
     try:
@@ -71,6 +116,9 @@ def fetch_stock_data(ticker: str, period: str | None = None) -> Dict[str, Any]:
             source_used = "quarterly_balance_sheet"
             # qb is a DataFrame with columns as periods
             for col in qb.columns:
+                if str(col)[:10] in known:
+                    skipped += 1
+                    continue
                 col_data = qb[col]
                 f = FundamentalsQuarter(
                     as_of=str(col),
@@ -82,12 +130,15 @@ def fetch_stock_data(ticker: str, period: str | None = None) -> Dict[str, Any]:
         logger.debug("quarterly_balance_sheet not usable for %s", ticker)
 
     # If no quarterly, try annual balance sheet
-    if not fundamentals:
+    if not fundamentals and not skipped:
         try:
             ab = t.balance_sheet
             if ab is not None and getattr(ab, "empty", True) is False:
                 source_used = "annual_balance_sheet"
                 for col in ab.columns:
+                    if str(col)[:10] in known:
+                        skipped += 1
+                        continue
                     col_data = ab[col]
                     f = FundamentalsQuarter(
                         as_of=str(col),
@@ -99,7 +150,7 @@ def fetch_stock_data(ticker: str, period: str | None = None) -> Dict[str, Any]:
             logger.debug("annual balance_sheet not usable for %s", ticker)
 
     # Finally use ticker.info as fallback
-    if not fundamentals:
+    if not fundamentals and not skipped:
         try:
             info = t.info or {}
             # Use info snapshot once
@@ -117,6 +168,55 @@ def fetch_stock_data(ticker: str, period: str | None = None) -> Dict[str, Any]:
         except Exception:
             logger.exception("ticker.info failed for %s", ticker)
 
+    if skipped:
+        logger.debug("Skipped %d stored fundamentals periods for %s", skipped, ticker)
+    return fundamentals, source_used
+
+
+def fetch_stock_data(
+    ticker: str,
+    period: str | None = None,
+    start: date | None = None,
+    cache: ResponseCache | None = None,
+    ticker_factory: Callable[[str], Any] | None = None,
+    use_cache: bool = True,
+    fundamentals: bool = True,
+    known_quarters: Optional[Collection[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Fetch price history and fundamental snapshots for ticker.
+    When `start` is given only bars from that date onward are requested
+    (used by incremental refresh) and `period` is ignored.
+    Responses go through `cache` (default: the configured on-disk cache);
+    an offline cache serves everything from disk and never hits the network.
+    `ticker_factory` replaces yf.Ticker (e.g. a fake provider in tests);
+    `use_cache=False` bypasses the cache entirely.
+    `fundamentals=False` skips the fundamentals requests (they are served from
+    the fundamentals table) and `known_quarters` skips already stored periods.
+
+    Returns raw dict:
+      {
+        "ticker": "NVDA",
+        "prices": pd.DataFrame,  # with Date index
+        "fundamentals": list[FundamentalsQuarter dicts],
+        "source_info": {"used": "...", "notes": "..."}
+      }
+    """
+    t = open_ticker(ticker, cache, ticker_factory, use_cache)
+
+    # 1) Fetch prices
+    prices = fetch_prices(t, ticker, period=period, start=start)
+
+    # 2) Fetch fundamentals with fallback strategy
+    if not fundamentals:
+        return build_raw_data(ticker, prices, [], "skipped")
+    records, source_used = fetch_fundamentals(t, ticker, known_quarters)
+
+    return build_raw_data(ticker, prices, records, source_used)
+
+
+def build_raw_data(ticker: str, prices: pd.DataFrame, fundamentals: List[Dict[str, Any]], source_used: str | None) -> Dict[str, Any]:
+    """Assemble the raw_data dict consumed by processor.process_data."""
     source_info = {"used": source_used or "none", "fetched_at": datetime.utcnow().isoformat()}
 
     return {
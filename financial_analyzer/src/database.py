@@ -2,122 +2,716 @@
 """
 SQLAlchemy-based SQLite persistence with idempotent inserts.
 We implement simple ORM classes and helper functions to upsert records.
+SQLAlchemy and the ORM metadata are only loaded when an engine is created
+or the schema is needed; scan-style commands can run on a plain sqlite3
+connection from connect().
 """
 from __future__ import annotations
-from typing import Iterable, List
-import sqlalchemy as sa
-from sqlalchemy.orm import declarative_base, Session
-from sqlalchemy import Column, Integer, String, Float, Date, Text, DateTime
-import pandas as pd
-from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+from datetime import date, datetime, timezone
+import json
 import logging
-from .config import load_config
+import sqlite3
+from .config import get_config
 import pathlib
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 logger = logging.getLogger(__name__)
-CONFIG = load_config()
-
-Base = declarative_base()
-
-
-class Ticker(Base):
-    __tablename__ = "tickers"
-    id = Column(Integer, primary_key=True)
-    ticker = Column(String, unique=True, nullable=False)
-    added_at = Column(DateTime, default=datetime.utcnow)
-    info = Column(Text)
-
-
-class DailyMetric(Base):
-    __tablename__ = "daily_metrics"
-    id = Column(Integer, primary_key=True)
-    ticker = Column(String, index=True)
-    date = Column(Date, index=True)
-    open = Column(Float)
-    high = Column(Float)
-    low = Column(Float)
-    close = Column(Float)
-    volume = Column(Integer)
-    sma50 = Column(Float)
-    sma200 = Column(Float)
-    price_to_book = Column(Float)
-    bvps = Column(Float)
-    enterprise_value = Column(Float)
-
-    __table_args__ = (sa.UniqueConstraint("ticker", "date", name="u_ticker_date"),)
-
-
-class SignalEvent(Base):
-    __tablename__ = "signal_events"
-    id = Column(Integer, primary_key=True)
-    ticker = Column(String, index=True)
-    date = Column(Date, index=True)
-    signal_type = Column(String)
-    meta = Column(Text)
-
-    __table_args__ = (sa.UniqueConstraint("ticker", "date", "signal_type", name="u_signal_unique"),)
-
-
-def get_engine(db_path: str | None = None):
-    if db_path is None:
-        db_path = CONFIG["database"]["path"]
-    db_url = f"sqlite:///{pathlib.Path(db_path).expanduser().as_posix()}"
-    engine = sa.create_engine(db_url, echo=False, future=True)
+
+_ORM: Optional[Dict[str, Any]] = None
+
+
+def utc_now() -> datetime:
+    """Current UTC time as a naive datetime, the form every stored timestamp uses."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _build_orm() -> Dict[str, Any]:
+    """Declare the ORM classes on first use (importing SQLAlchemy is slow)."""
+    global _ORM
+    if _ORM is not None:
+        return _ORM
+    import sqlalchemy as sa
+    from sqlalchemy.orm import declarative_base
+    from sqlalchemy import Column, Integer, String, Float, Date, Text, DateTime
+
+    Base = declarative_base()
+
+    class Ticker(Base):
+        """
+        One row per analyzed ticker. `fingerprint` is the content hash of the
+        inputs of its last full run (see memo.py), `processed_at` when it ran.
+        """
+        __tablename__ = "tickers"
+        id = Column(Integer, primary_key=True)
+        ticker = Column(String, unique=True, nullable=False)
+        added_at = Column(DateTime, default=datetime.utcnow)
+        info = Column(Text)
+        fingerprint = Column(String)
+        processed_at = Column(DateTime)
+
+    class DailyMetric(Base):
+        __tablename__ = "daily_metrics"
+        id = Column(Integer, primary_key=True)
+        ticker = Column(String, index=True)
+        date = Column(Date, index=True)
+        open = Column(Float)
+        high = Column(Float)
+        low = Column(Float)
+        close = Column(Float)
+        volume = Column(Integer)
+        sma50 = Column(Float)
+        sma200 = Column(Float)
+        price_to_book = Column(Float)
+        bvps = Column(Float)
+        enterprise_value = Column(Float)
+
+        __table_args__ = (sa.UniqueConstraint("ticker", "date", name="u_ticker_date"),)
+
+    class SignalEvent(Base):
+        __tablename__ = "signal_events"
+        id = Column(Integer, primary_key=True)
+        ticker = Column(String, index=True)
+        date = Column(Date, index=True)
+        signal_type = Column(String)
+        meta = Column(Text)
+
+        __table_args__ = (sa.UniqueConstraint("ticker", "date", "signal_type", name="u_signal_unique"),)
+
+    class Fundamental(Base):
+        """
+        Point-in-time fundamentals, one row per (ticker, as_of) quarter.
+        `version` counts value changes (restatements), `fetched_at` is when
+        the current values were fetched and `checked_at` the last time the
+        provider was asked for this ticker.
+        """
+        __tablename__ = "fundamentals"
+        id = Column(Integer, primary_key=True)
+        ticker = Column(String, index=True, nullable=False)
+        as_of = Column(Date, nullable=False)
+        total_stockholder_equity = Column(Float)
+        total_debt = Column(Float)
+        cash_and_cash_equivalents = Column(Float)
+        shares_outstanding = Column(Float)
+        market_cap = Column(Float)
+        source = Column(String)
+        fetched_at = Column(DateTime)
+        checked_at = Column(DateTime)
+        version = Column(Integer, nullable=False, default=1)
+
+        __table_args__ = (sa.UniqueConstraint("ticker", "as_of", name="u_fundamentals_ticker_as_of"),)
+
+    class LatestMetric(Base):
+        """
+        Snapshot of each ticker's newest daily_metrics row plus its 52-week
+        high, kept current by save_daily_metrics; indexed for screens.
+        """
+        __tablename__ = "latest_metrics"
+        ticker = Column(String, primary_key=True)
+        date = Column(Date, index=True)
+        open = Column(Float)
+        high = Column(Float)
+        low = Column(Float)
+        close = Column(Float, index=True)
+        volume = Column(Integer, index=True)
+        sma50 = Column(Float)
+        sma200 = Column(Float)
+        price_to_book = Column(Float, index=True)
+        bvps = Column(Float)
+        enterprise_value = Column(Float, index=True)
+        high_52w = Column(Float)
+        pct_from_high = Column(Float, index=True)
+
+    def rollup_table(name: str, table: str):
+        """Weekly/monthly bars (see ROLLUPS): one row per (ticker, period start)."""
+        return type(name, (Base,), {
+            "__tablename__": table,
+            "id": Column(Integer, primary_key=True),
+            "ticker": Column(String, nullable=False),
+            "period": Column(Date, nullable=False),
+            "last_date": Column(Date),
+            **{c: Column(Float) for c in ("open", "high", "low", "close")},
+            "volume": Column(Integer),
+            "bars": Column(Integer),
+            **{c: Column(Float) for c in ("sma10", "sma40", "pct_change")},
+            "__table_args__": (sa.UniqueConstraint("ticker", "period", name=f"u_{table}_ticker_period"),),
+        })
+
+    WeeklyMetric = rollup_table("WeeklyMetric", "weekly_metrics")
+    MonthlyMetric = rollup_table("MonthlyMetric", "monthly_metrics")
+
+    _ORM = {"Base": Base, "Ticker": Ticker, "DailyMetric": DailyMetric, "SignalEvent": SignalEvent,
+            "Fundamental": Fundamental, "LatestMetric": LatestMetric,
+            "WeeklyMetric": WeeklyMetric, "MonthlyMetric": MonthlyMetric}
+    return _ORM
+
+
+def __getattr__(name: str):
+    # database.Base / DailyMetric / ... still work, built lazily
+    if name in ("Base", "Ticker", "DailyMetric", "SignalEvent", "Fundamental", "LatestMetric",
+                "WeeklyMetric", "MonthlyMetric"):
+        return _build_orm()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Applied to every new SQLite connection. WAL lets readers run alongside the
+# single writer, NORMAL sync is durable under WAL, cache_size < 0 is in KiB.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -65536,
+    "temp_store": "MEMORY",
+}
+
+# Columns added to existing tables after their first release; init_db adds
+# them to older database files with ALTER TABLE.
+MIGRATIONS: Dict[str, Dict[str, str]] = {
+    "tickers": {"fingerprint": "VARCHAR", "processed_at": "DATETIME"},
+}
+
+# Rows converted and sent per executemany call when bulk saving.
+DEFAULT_CHUNKSIZE = 50_000
+
+FUNDAMENTAL_COLUMNS = ["total_stockholder_equity", "total_debt", "cash_and_cash_equivalents", "shares_outstanding", "market_cap"]
+
+DAILY_METRIC_COLUMNS = ["ticker", "date", "open", "high", "low", "close", "volume",
+                        "sma50", "sma200", "price_to_book", "bvps", "enterprise_value"]
+
+# latest_metrics: the newest daily_metrics row plus the rolling high of the
+# last HIGH_WINDOW_BARS closes (same as the "52w_high" indicator)
+LATEST_METRIC_COLUMNS = DAILY_METRIC_COLUMNS + ["high_52w", "pct_from_high"]
+HIGH_WINDOW_BARS = 252
+
+# Rollup bars built from daily_metrics. `period` is the SQLite expression of
+# the first calendar day of the period an ISO date falls in (Monday / the 1st);
+# `lookback` reaches back far enough for the longest SMA (sma40) of its bars.
+ROLLUPS: Dict[str, Dict[str, str]] = {
+    "weekly": {"table": "weekly_metrics", "period": "date({}, '-6 days', 'weekday 1')", "lookback": "-273 days"},
+    "monthly": {"table": "monthly_metrics", "period": "substr({}, 1, 8) || '01'", "lookback": "-39 months"},
+}
+ROLLUP_COLUMNS = ["ticker", "period", "last_date", "open", "high", "low", "close", "volume", "bars",
+                  "sma10", "sma40", "pct_change"]
+
+
+def _db_settings(db_path: str | None, pragmas: Optional[Dict[str, Any]]):
+    if db_path is None or pragmas is None:
+        db_cfg = get_config()["database"]
+        db_path = db_path if db_path is not None else db_cfg["path"]
+        pragmas = pragmas if pragmas is not None else db_cfg.get("pragmas", {})
+    return pathlib.Path(db_path).expanduser(), {**SQLITE_PRAGMAS, **pragmas}
+
+
+def _apply_pragmas(dbapi_conn, pragmas: Dict[str, Any]):
+    cur = dbapi_conn.cursor()
+    for name, value in pragmas.items():
+        cur.execute(f"PRAGMA {name}={value}")
+    cur.close()
+
+
+def get_engine(db_path: str | None = None, pragmas: Optional[Dict[str, Any]] = None):
+    """
+    SQLAlchemy engine for the SQLite file. `db_path` and extra `pragmas`
+    default to the `database` config section.
+    """
+    import sqlalchemy as sa
+
+    path, pragmas = _db_settings(db_path, pragmas)
+    db_url = f"sqlite:///{path.as_posix()}"
+    # generous busy timeout so concurrent batch workers wait for the write lock
+    engine = sa.create_engine(db_url, echo=False, future=True, connect_args={"timeout": 30})
+
+    @sa.event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, _record):
+        _apply_pragmas(dbapi_conn, pragmas)
+
     return engine
 
 
+def connect(db_path: str | None = None, pragmas: Optional[Dict[str, Any]] = None) -> sqlite3.Connection:
+    """Plain sqlite3 connection with the same pragmas, for commands that need no ORM."""
+    path, pragmas = _db_settings(db_path, pragmas)
+    conn = sqlite3.connect(path, timeout=30)
+    _apply_pragmas(conn, pragmas)
+    return conn
+
+
+def has_schema(conn: sqlite3.Connection) -> bool:
+    """True when the pipeline tables exist in the sqlite3 database."""
+    names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return {"tickers", "daily_metrics", "signal_events"} <= names
+
+
 def init_db(engine=None):
     engine = engine or get_engine()
-    Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        before = table_names(conn)
+    _build_orm()["Base"].metadata.create_all(engine)
+    _add_missing_columns(engine)
+    # derived tables added to an existing database are built from its daily_metrics once
+    if "daily_metrics" in before:
+        if "latest_metrics" not in before:
+            refresh_latest_metrics(engine)
+        missing = [tf for tf, spec in ROLLUPS.items() if spec["table"] not in before]
+        if missing:
+            refresh_rollups(engine, missing)
+
+
+def _add_missing_columns(engine):
+    with engine.begin() as conn:
+        for table, columns in MIGRATIONS.items():
+            present = {r[1] for r in conn.exec_driver_sql(f"PRAGMA table_info({table})").fetchall()}
+            for name, sql_type in columns.items():
+                if name not in present:
+                    conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {name} {sql_type}")
+                    logger.info("Added column %s.%s", table, name)
 
 
-def save_daily_metrics(df: pd.DataFrame, engine=None):
+def get_latest_date(ticker: str, engine=None) -> Optional[date]:
+    """Return the most recent stored daily_metrics date for ticker, or None."""
+    engine = engine or get_engine()
+    with engine.connect() as conn:
+        latest = conn.exec_driver_sql(
+            "SELECT MAX(date) FROM daily_metrics WHERE ticker = ?", (ticker,)
+        ).scalar()
+    if latest is None:
+        return None
+    return date.fromisoformat(str(latest)[:10])
+
+
+def _upsert_sql(table: str, cols: List[str], key_cols: List[str]) -> str:
+    """INSERT ... ON CONFLICT(key) DO UPDATE statement with DB-API '?' placeholders."""
+    updates = ", ".join(f"{c}=excluded.{c}" for c in cols if c not in key_cols)
+    action = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+    return (
+        f'INSERT INTO {table} ({", ".join(cols)}) VALUES ({", ".join("?" for _ in cols)}) '
+        f'ON CONFLICT({", ".join(key_cols)}) {action}'
+    )
+
+
+def _column_values(series: pd.Series) -> list:
+    """Column as a list of plain Python values with NaN/NaT mapped to None."""
+    if series.dtype.kind == "f":
+        values = series.to_numpy(dtype=object)
+        values[series.isna().to_numpy()] = None
+        return values.tolist()
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def save_daily_metrics(df: pd.DataFrame, engine=None, chunksize: int = DEFAULT_CHUNKSIZE) -> int:
     """
     Save processed metrics to daily_metrics table in an idempotent way.
+    Rows are upserted on (ticker, date) with executemany, chunksize rows at a
+    time, inside a single transaction. Returns the number of rows written.
     """
+    import pandas as pd
+
+    # Keep only columns in DailyMetric
+    cols = [c for c in DAILY_METRIC_COLUMNS if c in df.columns]
+    if df.empty or not cols:
+        logger.warning("No daily metrics to save")
+        return 0
+
     engine = engine or get_engine()
-    conn = engine.connect()
+    sql = _upsert_sql("daily_metrics", cols, ["ticker", "date"])
+    with engine.begin() as conn:
+        for lo in range(0, len(df), chunksize):
+            chunk = df.iloc[lo:lo + chunksize]
+            columns = []
+            for c in cols:
+                col = chunk[c]
+                if c == "date":
+                    # stored as ISO 'YYYY-MM-DD' like the ORM Date type
+                    columns.append(pd.to_datetime(col).dt.strftime("%Y-%m-%d").tolist())
+                elif c == "volume":
+                    columns.append([None if pd.isna(v) else int(v) for v in col.tolist()])
+                else:
+                    columns.append(_column_values(col))
+            conn.exec_driver_sql(sql, list(zip(*columns)))
+        if "date" in cols:
+            # keep the derived tables (snapshot, rollups) in step, same transaction
+            present = table_names(conn)
+            span = df.groupby(df["ticker"].astype(str))["date"].agg(["min", "max"])
+            iso = {k: {t: pd.Timestamp(d).strftime("%Y-%m-%d") for t, d in span[k].items()} for k in ("min", "max")}
+            if "latest_metrics" in present:
+                _refresh_latest(conn.exec_driver_sql, iso["max"])
+            for timeframe, spec in ROLLUPS.items():
+                if spec["table"] in present:
+                    _refresh_rollup(conn.exec_driver_sql, timeframe, iso["min"])
+    logger.debug("Saved %d daily metric rows", len(df))
+    return len(df)
 
-    df2 = df.copy()
-    # Ensure date column is datetime.date
-    if "date" in df2.columns:
-        df2["date"] = pd.to_datetime(df2["date"]).dt.date
 
-    # Keep only columns in DailyMetric
-    cols = ["ticker", "date", "open", "high", "low", "close", "volume",
-            "sma50", "sma200", "price_to_book", "bvps", "enterprise_value"]
-    df2 = df2[[c for c in cols if c in df2.columns]]
+def table_names(conn) -> set:
+    """Names of the tables in the database (sqlite3 or SQLAlchemy connection)."""
+    execute = conn.execute if isinstance(conn, sqlite3.Connection) else conn.exec_driver_sql
+    return {r[0] for r in execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()}
 
-    records = df2.to_dict(orient="records")  # list of dicts
-    if not records:
-        logger.warning("No daily metrics to save")
+
+def has_table(conn, name: str) -> bool:
+    """True when table `name` exists (sqlite3 or SQLAlchemy connection)."""
+    return name in table_names(conn)
+
+
+def _latest_sql(source: str) -> str:
+    """Upsert the newest row of every (ticker, max_date) in `source` that is not older than its snapshot."""
+    cols = ", ".join(DAILY_METRIC_COLUMNS)
+    updates = ", ".join(f"{c}=excluded.{c}" for c in LATEST_METRIC_COLUMNS if c != "ticker")
+    return f"""
+        INSERT INTO latest_metrics ({cols}, high_52w, pct_from_high)
+        SELECT {cols}, high_52w, (close / high_52w - 1.0) * 100.0
+        FROM (
+            SELECT d.*, (
+                SELECT MAX(w.close) FROM daily_metrics w
+                WHERE w.ticker = d.ticker AND w.date >= COALESCE((
+                    SELECT date FROM daily_metrics WHERE ticker = d.ticker
+                    ORDER BY date DESC LIMIT 1 OFFSET {HIGH_WINDOW_BARS - 1}), '')
+            ) AS high_52w
+            FROM {source} t
+            JOIN daily_metrics d
+              ON d.ticker = t.ticker AND d.date = (SELECT MAX(date) FROM daily_metrics WHERE ticker = t.ticker)
+            LEFT JOIN latest_metrics l ON l.ticker = t.ticker
+            WHERE l.date IS NULL OR t.max_date >= l.date
+        ) WHERE true
+        ON CONFLICT(ticker) DO UPDATE SET {updates}
+    """
+
+
+def _refresh_latest(execute, touched: Optional[Dict[str, str]] = None) -> int:
+    """
+    Refresh latest_metrics for the tickers in `touched` (ticker -> newest
+    date just written; writes that only touched older dates are skipped) or,
+    with None, rebuild it for every stored ticker. Each ticker costs a few
+    index seeks on (ticker, date), so this runs inside every metrics save.
+    """
+    if touched is None:
+        execute("DELETE FROM latest_metrics WHERE ticker NOT IN (SELECT DISTINCT ticker FROM daily_metrics)")
+        sql = _latest_sql("(SELECT ticker, MAX(date) AS max_date FROM daily_metrics GROUP BY ticker)")
+        return execute(sql).rowcount
+    if not touched:
+        return 0
+    sql = _latest_sql("(SELECT key AS ticker, value AS max_date FROM json_each(:touched))")
+    return execute(sql, {"touched": json.dumps(touched)}).rowcount
+
+
+def refresh_latest_metrics(engine=None) -> int:
+    """
+    Rebuild the latest_metrics snapshot from daily_metrics (for databases
+    written before it existed). `engine` may also be a plain sqlite3
+    connection. Returns the number of snapshot rows written.
+    """
+    engine = engine or get_engine()
+    if isinstance(engine, sqlite3.Connection):
+        with engine:
+            written = _refresh_latest(engine.execute)
+    else:
+        with engine.begin() as conn:
+            written = _refresh_latest(conn.exec_driver_sql)
+    logger.info("Rebuilt latest_metrics for %d tickers", written)
+    return written
+
+
+def _rollup_sql(timeframe: str, source: str) -> List[str]:
+    """
+    Statements refreshing the `timeframe` rollup for every (ticker, since)
+    in `source`: re-aggregate the periods from the one containing `since` on,
+    then recompute the bar indicators of those periods (the SMA windows read
+    up to 39 earlier bars).
+    """
+    spec = ROLLUPS[timeframe]
+    table, period = spec["table"], spec["period"].format
+    bar_cols = ["last_date", "open", "high", "low", "close", "volume", "bars"]
+    updates = ", ".join(f"{c}=excluded.{c}" for c in bar_cols)
+    # open/close are read back by index seeks at each period's first/last date
+    bars = f"""
+        INSERT INTO {table} (ticker, period, {", ".join(bar_cols)})
+        SELECT g.ticker, g.period, g.last_date, o.open, g.high, g.low, c.close, g.volume, g.bars
+        FROM (
+            SELECT d.ticker, {period("d.date")} AS period, MIN(d.date) AS first_date, MAX(d.date) AS last_date,
+                   MAX(d.high) AS high, MIN(d.low) AS low, SUM(d.volume) AS volume, COUNT(*) AS bars
+            FROM {source} t
+            JOIN daily_metrics d ON d.ticker = t.ticker AND d.date >= {period("t.since")}
+            GROUP BY d.ticker, period
+        ) g
+        JOIN daily_metrics o ON o.ticker = g.ticker AND o.date = g.first_date
+        JOIN daily_metrics c ON c.ticker = g.ticker AND c.date = g.last_date
+        WHERE true
+        ON CONFLICT(ticker, period) DO UPDATE SET {updates}
+    """
+    indicators = f"""
+        UPDATE {table} AS r SET sma10 = w.sma10, sma40 = w.sma40, pct_change = w.pct_change
+        FROM (
+            SELECT x.ticker, x.period, {period("t.since")} AS first_period,
+                   AVG(x.close) OVER (PARTITION BY x.ticker ORDER BY x.period ROWS 9 PRECEDING) AS sma10,
+                   AVG(x.close) OVER (PARTITION BY x.ticker ORDER BY x.period ROWS 39 PRECEDING) AS sma40,
+                   x.close / LAG(x.close) OVER (PARTITION BY x.ticker ORDER BY x.period) - 1.0 AS pct_change
+            FROM {source} t
+            JOIN {table} x ON x.ticker = t.ticker AND x.period >= date({period("t.since")}, '{spec["lookback"]}')
+        ) AS w
+        WHERE r.ticker = w.ticker AND r.period = w.period AND w.period >= w.first_period
+    """
+    return [bars, indicators]
+
+
+def _refresh_rollup(execute, timeframe: str, touched: Optional[Dict[str, str]] = None):
+    """
+    Refresh the `timeframe` rollup for the tickers in `touched` (ticker ->
+    oldest date just written). A daily refresh only rewrites the current,
+    still open period; older periods are redone only when older dates were
+    written. With None the table is rebuilt for every stored ticker.
+    """
+    if touched is None:
+        execute(f"DELETE FROM {ROLLUPS[timeframe]['table']}")
+        statements = _rollup_sql(timeframe, "(SELECT ticker, MIN(date) AS since FROM daily_metrics GROUP BY ticker)")
+        params: Dict[str, Any] = {}
+    elif not touched:
         return
+    else:
+        statements = _rollup_sql(timeframe, "(SELECT key AS ticker, value AS since FROM json_each(:touched))")
+        params = {"touched": json.dumps(touched)}
+    for sql in statements:
+        execute(sql, params)
 
-    with conn.begin() as trans:
-        for r in records:
-            sql = f'INSERT OR REPLACE INTO daily_metrics ({", ".join(r.keys())}) VALUES ({", ".join(f":{k}" for k in r.keys())})'
-            conn.execute(sa.text(sql), r)
 
+def refresh_rollups(engine=None, timeframes: Optional[Iterable[str]] = None):
+    """Rebuild the weekly/monthly rollup tables (default: all of ROLLUPS) from daily_metrics."""
+    engine = engine or get_engine()
+    timeframes = list(timeframes or ROLLUPS)
+    with engine.begin() as conn:
+        for timeframe in timeframes:
+            _refresh_rollup(conn.exec_driver_sql, timeframe)
+    logger.info("Rebuilt %s rollups", ", ".join(timeframes))
+
+
+def load_rollups(
+    engine=None,
+    timeframe: str = "weekly",
+    tickers: Optional[Iterable[str]] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> "pd.DataFrame":
+    """
+    Stored `timeframe` bars (ROLLUP_COLUMNS) of all (or the given) tickers,
+    optionally limited to periods starting in [start, end], sorted by
+    (ticker, period); an indexed read instead of resampling daily_metrics.
+    """
+    import pandas as pd
+
+    if timeframe not in ROLLUPS:
+        raise ValueError(f"Unknown timeframe {timeframe!r}; expected one of {tuple(ROLLUPS)}")
+    engine = engine or get_engine()
+    clauses, params = [], {}
+    if tickers is not None:
+        tickers = list(tickers)
+        params.update({f"t{i}": t for i, t in enumerate(tickers)})
+        clauses.append(f"ticker IN ({', '.join(f':t{i}' for i in range(len(tickers)))})" if tickers else "0")
+    if start is not None:
+        params["start"] = start.isoformat()
+        clauses.append("period >= :start")
+    if end is not None:
+        params["end"] = end.isoformat()
+        clauses.append("period <= :end")
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = f"SELECT {', '.join(ROLLUP_COLUMNS)} FROM {ROLLUPS[timeframe]['table']} {where} ORDER BY ticker, period"
+    with engine.connect() as conn:
+        df = pd.read_sql_query(sql, conn.connection.driver_connection, params=params,
+                               dtype={"volume": "Int64", "bars": "int64"})
+    for c in ("period", "last_date"):
+        df[c] = pd.to_datetime(df[c])
+    return df
 
 
-def save_signal_events(ticker: str, events: Iterable[dict], engine=None):
+def save_signal_events(ticker: Optional[str], events: Iterable[dict], engine=None) -> int:
     """
-    Save signal events to DB using INSERT OR REPLACE.
+    Save signal events to DB, upserting on (ticker, date, signal_type).
     Each event dict must have: date (ISO/string), signal_type, meta (optional)
+    and, when `ticker` is None (several tickers in one transaction), ticker.
+    Returns the number of events written.
     """
+    import pandas as pd
+
+    rows = []
+    for ev in events:
+        if not isinstance(ev, dict):
+            continue  # skip bad entries
+        d = ev.get("date")
+        # Normalise date strings/timestamps to ISO date
+        if isinstance(d, datetime) or (d is not None and not isinstance(d, date)):
+            d = pd.to_datetime(d).date()
+        rows.append((ev.get("ticker") if ticker is None else ticker, d.isoformat() if d is not None else None, ev.get("signal_type"), json.dumps(ev.get("meta") or {}, default=str)))
+    if not rows:
+        return 0
+
+    engine = engine or get_engine()
+    sql = _upsert_sql("signal_events", ["ticker", "date", "signal_type", "meta"], ["ticker", "date", "signal_type"])
+    with engine.begin() as conn:
+        conn.exec_driver_sql(sql, rows)
+    return len(rows)
+
+
+def get_fingerprint(ticker: str, engine=None) -> Optional[str]:
+    """Input fingerprint stored by the ticker's last full run (None when there is none)."""
+    engine = engine or get_engine()
+    with engine.connect() as conn:
+        row = conn.exec_driver_sql("SELECT fingerprint FROM tickers WHERE ticker = ?", (ticker,)).fetchone()
+    return row[0] if row else None
+
+
+def save_fingerprints(fingerprints: Dict[str, str], engine=None, processed_at: Optional[datetime] = None) -> int:
+    """Upsert {ticker: fingerprint} into the tickers table in one transaction."""
+    if not fingerprints:
+        return 0
+    stamp = (processed_at or utc_now()).isoformat(sep=" ")
+    sql = ("INSERT INTO tickers (ticker, added_at, fingerprint, processed_at) VALUES (?, ?, ?, ?) "
+           "ON CONFLICT(ticker) DO UPDATE SET fingerprint=excluded.fingerprint, processed_at=excluded.processed_at")
     engine = engine or get_engine()
-    conn = engine.connect()
-
-    with conn.begin() as trans:
-        for ev in events:
-            if not isinstance(ev, dict):
-                continue  # skip bad entries
-            d = ev.get("date")
-            # Convert date string to datetime.date if needed
-            if isinstance(d, str):
-                d = pd.to_datetime(d).date()
-            ttype = ev.get("signal_type")
-            meta = str(ev.get("meta", {}))
-            sql = 'INSERT OR REPLACE INTO signal_events (ticker, date, signal_type, meta) VALUES (:ticker, :date, :signal_type, :meta)'
-            conn.execute(sa.text(sql), {"ticker": ticker, "date": d, "signal_type": ttype, "meta": meta})
+    with engine.begin() as conn:
+        conn.exec_driver_sql(sql, [(t, stamp, fp, stamp) for t, fp in fingerprints.items()])
+    return len(fingerprints)
+
+
+def scan_crossovers(
+    engine=None,
+    tickers: Optional[Iterable[str]] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    replace: bool = False,
+) -> int:
+    """
+    Detect golden/death crosses for all (or the given) tickers directly in
+    SQLite with LAG() over the (ticker, date) index and insert them into
+    signal_events in one INSERT ... SELECT. Same rule as signals.py:
+    golden = sma50 > sma200 and previous sma50 <= previous sma200 (death mirrored).
+    `start`/`end` limit which event dates are written; the previous bar is
+    still taken from before `start`. With `replace`, existing crosses in the
+    scanned scope are deleted first. Returns the number of events inserted.
+    `engine` may also be a plain sqlite3 connection (see connect()).
+    """
+    engine = engine or get_engine()
+    params: Dict[str, Any] = {}
+    inner, outer = [], []
+    if tickers is not None:
+        tickers = list(tickers)
+        if not tickers:
+            return 0
+        names = [f":t{i}" for i in range(len(tickers))]
+        params.update({f"t{i}": t for i, t in enumerate(tickers)})
+        inner.append(f"ticker IN ({', '.join(names)})")
+    if end is not None:
+        params["end"] = end.isoformat()
+        inner.append("date <= :end")
+    if start is not None:
+        params["start"] = start.isoformat()
+        outer.append("date >= :start")
+    inner_where = f"WHERE {' AND '.join(inner)}" if inner else ""
+    outer_where = "".join(f" AND {c}" for c in outer)
+
+    sql = f"""
+        INSERT INTO signal_events (ticker, date, signal_type, meta)
+        SELECT ticker, date,
+               CASE WHEN sma50 > sma200 THEN 'golden_cross' ELSE 'death_cross' END,
+               '{{}}'
+        FROM (
+            SELECT ticker, date, sma50, sma200,
+                   LAG(sma50) OVER w AS prev50,
+                   LAG(sma200) OVER w AS prev200
+            FROM daily_metrics
+            {inner_where}
+            WINDOW w AS (PARTITION BY ticker ORDER BY date)
+        )
+        WHERE ((sma50 > sma200 AND prev50 <= prev200) OR (sma50 < sma200 AND prev50 >= prev200)){outer_where}
+        ON CONFLICT(ticker, date, signal_type) DO NOTHING
+    """
+    delete = (
+        "DELETE FROM signal_events WHERE signal_type IN ('golden_cross', 'death_cross')"
+        + "".join(f" AND {c}" for c in inner + outer)
+    )
+    # named :params are understood by sqlite3 directly, with or without SQLAlchemy
+    if isinstance(engine, sqlite3.Connection):
+        with engine:
+            if replace:
+                engine.execute(delete, params)
+            inserted = engine.execute(sql, params).rowcount
+    else:
+        with engine.begin() as conn:
+            if replace:
+                conn.exec_driver_sql(delete, params)
+            inserted = conn.exec_driver_sql(sql, params).rowcount
+    logger.info("Crossover scan inserted %d signal events", inserted)
+    return inserted
 
+
+def fundamental_rows(ticker: str, records: Iterable[dict], source: Optional[str], fetched_at: str) -> List[tuple]:
+    """
+    (ticker, as_of, *FUNDAMENTAL_COLUMNS, source, fetched_at) tuples from
+    FundamentalsQuarter dicts; as_of is cut to its ISO date, values to float.
+    """
+    rows = []
+    for rec in records:
+        as_of = str(rec.get("as_of") or "")[:10]
+        if not as_of:
+            continue
+        values = [None if rec.get(c) is None else float(rec[c]) for c in FUNDAMENTAL_COLUMNS]
+        rows.append((ticker, as_of, *values, source, fetched_at))
+    return rows
+
+
+def save_fundamentals(
+    ticker: str,
+    records: Iterable[dict],
+    engine=None,
+    source: Optional[str] = None,
+    fetched_at: Optional[datetime] = None,
+) -> int:
+    """
+    Upsert fundamentals on (ticker, as_of). An existing quarter is only
+    rewritten (version + 1) when a value changed. Every call also stamps
+    checked_at on all of the ticker's rows, recording that the provider was
+    asked even when nothing new came back. Returns rows inserted or changed.
+    """
+    stamp = (fetched_at or utc_now()).isoformat(sep=" ")
+    rows = fundamental_rows(ticker, records, source, stamp)
+    cols = ["ticker", "as_of", *FUNDAMENTAL_COLUMNS, "source", "fetched_at"]
+    changed = " OR ".join(f"fundamentals.{c} IS NOT excluded.{c}" for c in FUNDAMENTAL_COLUMNS)
+    updates = ", ".join(f"{c}=excluded.{c}" for c in [*FUNDAMENTAL_COLUMNS, "source", "fetched_at"])
+    sql = (
+        f'INSERT INTO fundamentals ({", ".join(cols)}, checked_at, version) '
+        f'VALUES ({", ".join("?" for _ in cols)}, ?, 1) '
+        f"ON CONFLICT(ticker, as_of) DO UPDATE SET {updates}, version=fundamentals.version + 1 "
+        f"WHERE {changed}"
+    )
+    engine = engine or get_engine()
+    written = 0
+    with engine.begin() as conn:
+        if rows:
+            written = conn.exec_driver_sql(sql, [(*r, stamp) for r in rows]).rowcount
+        conn.exec_driver_sql("UPDATE fundamentals SET checked_at = ? WHERE ticker = ?", (stamp, ticker))
+    logger.debug("Saved %d fundamentals rows for %s", written, ticker)
+    return written
+
+
+def load_fundamentals(engine=None, tickers: Optional[Iterable[str]] = None) -> "pd.DataFrame":
+    """
+    Stored fundamentals for all (or the given) tickers in one query, as a
+    long frame (ticker, as_of, fields..., source, fetched_at, checked_at,
+    version) sorted by (ticker, as_of), ready for processor.process_panel.
+    """
+    import pandas as pd
+
+    engine = engine or get_engine()
+    sql = "SELECT ticker, as_of, {}, source, fetched_at, checked_at, version FROM fundamentals".format(
+        ", ".join(FUNDAMENTAL_COLUMNS))
+    params: tuple = ()
+    if tickers is not None:
+        tickers = list(tickers)
+        sql += f" WHERE ticker IN ({', '.join('?' for _ in tickers)})"
+        params = tuple(tickers)
+    sql += " ORDER BY ticker, as_of"
+    with engine.connect() as conn:
+        result = conn.exec_driver_sql(sql, params)
+        df = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+    for c in ("as_of", "fetched_at", "checked_at"):
+        df[c] = pd.to_datetime(df[c])
+    df[FUNDAMENTAL_COLUMNS] = df[FUNDAMENTAL_COLUMNS].astype(float)
+    return df
@@ -0,0 +1,226 @@
+# src/export.py
+"""
+Streaming bulk export of stored results.
+Daily metric time series or signal events for any number of tickers are
+read chunk by chunk (a SQLite cursor via fetchmany, or Parquet record
+batches) and appended to one NDJSON or Arrow IPC file, so memory stays at
+one chunk regardless of the universe size.
+
+NDJSON lines are serialized by pandas' C JSON writer (NaN -> null, dates as
+YYYY-MM-DD); Arrow IPC keeps native types (date32, float64) and needs
+pyarrow (the `columnar` extra), which is imported only for that format.
+"""
+from __future__ import annotations
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+import itertools
+import json
+import logging
+import pathlib
+import sys
+import pandas as pd
+from .database import DAILY_METRIC_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("ndjson", "arrow")
+DATASETS: Dict[str, List[str]] = {
+    "metrics": DAILY_METRIC_COLUMNS,
+    "signals": ["ticker", "date", "signal_type", "meta"],
+}
+KEY_COLUMNS = ["ticker", "date"]
+_TEXT_COLUMNS = {"ticker", "date", "signal_type", "meta"}
+DEFAULT_CHUNK_ROWS = 100_000
+_ARROW_SUFFIXES = {".arrow", ".arrows", ".ipc", ".feather"}
+
+
+def infer_format(path: str) -> str:
+    """'arrow' for .arrow/.ipc/.feather paths, 'ndjson' otherwise (and for stdout)."""
+    return "arrow" if pathlib.Path(path).suffix.lower() in _ARROW_SUFFIXES else "ndjson"
+
+
+def select_columns(dataset: str, columns: Optional[Sequence[str]] = None) -> List[str]:
+    """Requested columns of `dataset`, always led by the ticker/date keys."""
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset {dataset!r}; expected one of {tuple(DATASETS)}")
+    available = DATASETS[dataset]
+    if not columns:
+        return list(available)
+    unknown = [c for c in columns if c not in available]
+    if unknown:
+        raise ValueError(f"Unknown {dataset} column(s) {unknown}; available: {available}")
+    return KEY_COLUMNS + [c for c in dict.fromkeys(columns) if c not in KEY_COLUMNS]
+
+
+def _sql_chunks(store, table: str, columns: List[str], tickers, start, end, chunk_rows) -> Iterator[pd.DataFrame]:
+    from .database import get_engine
+
+    clauses, params = [], {}
+    if tickers is not None:
+        tickers = list(tickers)
+        if not tickers:
+            return
+        params.update({f"t{i}": t for i, t in enumerate(tickers)})
+        clauses.append(f"ticker IN ({', '.join(f':t{i}' for i in range(len(tickers)))})")
+    if start is not None:
+        params["start"] = start.isoformat()
+        clauses.append("date >= :start")
+    if end is not None:
+        params["end"] = end.isoformat()
+        clauses.append("date <= :end")
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    cols = ", ".join(f'"{c}"' for c in columns)
+    # (ticker, date) is covered by the unique index, so no sort pass is needed
+    sql = f"SELECT {cols} FROM {table} {where} ORDER BY ticker, date"
+    with (store or get_engine()).connect() as conn:
+        # fixed dtypes: an all-NULL column would otherwise come back as object
+        dtype = {c: ("Int64" if c == "volume" else "float64") for c in columns if c not in _TEXT_COLUMNS}
+        yield from pd.read_sql_query(sql, conn.connection.driver_connection, params=params,
+                                     chunksize=chunk_rows, dtype=dtype)
+
+
+def iter_chunks(
+    store=None,
+    dataset: str = "metrics",
+    columns: Optional[Sequence[str]] = None,
+    tickers: Optional[Iterable[str]] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield the selected rows as DataFrames of at most `chunk_rows` rows,
+    ordered by ticker and date. `date` is an ISO string column in every chunk.
+    `store` is an engine, a ShardedStore (rows come shard by shard, ordered
+    within each) or a ParquetStore (see storage.open_store).
+    """
+    from .storage import ParquetStore, ShardedStore
+
+    cols = select_columns(dataset, columns)
+    if isinstance(store, ShardedStore):
+        table = "daily_metrics" if dataset == "metrics" else "signal_events"
+        for shard, names in sorted(store.group(tickers).items()):
+            if store.paths[shard].exists():
+                yield from _sql_chunks(store.engine(shard), table, cols, names, start, end, chunk_rows)
+        return
+    if not isinstance(store, ParquetStore):
+        table = "daily_metrics" if dataset == "metrics" else "signal_events"
+        yield from _sql_chunks(store, table, cols, tickers, start, end, chunk_rows)
+        return
+
+    if dataset == "signals":
+        df = store.read_signal_events(tickers)
+        dates = pd.to_datetime(df["date"])
+        keep = pd.Series(True, index=df.index)
+        if start is not None:
+            keep &= dates >= pd.Timestamp(start)
+        if end is not None:
+            keep &= dates <= pd.Timestamp(end)
+        df = df.loc[keep, cols].reset_index(drop=True)
+        df["date"] = dates[keep].dt.strftime("%Y-%m-%d").to_numpy()
+        for i in range(0, len(df), chunk_rows):
+            yield df.iloc[i:i + chunk_rows]
+        return
+
+    import pyarrow as pa
+
+    for batch in store.iter_batches(cols, tickers=tickers, start=start, end=end, batch_size=chunk_rows):
+        if batch.num_rows == 0:
+            continue
+        idx = batch.schema.get_field_index("date")
+        batch = batch.set_column(idx, "date", batch.column(idx).cast(pa.string()))
+        yield batch.to_pandas()
+
+
+def _meta(text: Optional[str]) -> Any:
+    try:
+        return json.loads(text) if text else {}
+    except ValueError:
+        return text  # rows written before meta was stored as JSON
+
+
+def _ndjson_chunk(chunk: pd.DataFrame) -> str:
+    if "meta" in chunk.columns:
+        # stored as JSON text; embed as objects like the per-ticker payloads
+        chunk = chunk.assign(meta=[_meta(m) for m in chunk["meta"]])
+    return chunk.to_json(orient="records", lines=True, date_format="iso", double_precision=15)
+
+
+def _arrow_schema(columns: Sequence[str]):
+    import pyarrow as pa
+
+    types = {"ticker": pa.string(), "date": pa.date32(), "volume": pa.int64(),
+             "signal_type": pa.string(), "meta": pa.string()}
+    return pa.schema([(c, types.get(c, pa.float64())) for c in columns])
+
+
+def _arrow_batch(chunk: pd.DataFrame, schema):
+    import pyarrow as pa
+
+    # per-column casts: a chunk's inferred dtype (e.g. an all-NULL volume
+    # chunk read as object) must not change the file's schema
+    arrays = [pa.array(chunk[f.name], from_pandas=True).cast(f.type) for f in schema]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_chunks(
+    chunks: Iterable[pd.DataFrame],
+    path: str,
+    fmt: Optional[str] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> int:
+    """
+    Append every chunk to `path` ('-' is stdout, NDJSON only) and return the
+    number of rows written. The Arrow IPC schema is derived from `columns`
+    (default: the first chunk's), so empty exports are still typed files.
+    """
+    fmt = fmt or infer_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {FORMATS}")
+    rows = 0
+    if fmt == "ndjson":
+        out = sys.stdout if path == "-" else open(path, "w", encoding="utf8")
+        try:
+            for chunk in chunks:
+                out.write(_ndjson_chunk(chunk))
+                rows += len(chunk)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        return rows
+
+    if path == "-":
+        raise ValueError("Arrow IPC export needs a file path")
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError("Arrow IPC export requires pyarrow: install the 'columnar' extra "
+                          "(uv sync --extra columnar, or pip install 'financial-analyzer[columnar]')") from e
+
+    if columns is None:
+        chunks = iter(chunks)
+        first = next(chunks, None)
+        columns = [] if first is None else list(first.columns)
+        chunks = itertools.chain([] if first is None else [first], chunks)
+    schema = _arrow_schema(columns)
+    with pa.ipc.new_file(path, schema) as writer:
+        for chunk in chunks:
+            writer.write_batch(_arrow_batch(chunk, schema))
+            rows += len(chunk)
+    return rows
+
+
+def export(
+    path: str,
+    store=None,
+    dataset: str = "metrics",
+    fmt: Optional[str] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    **filters: Any,
+) -> int:
+    """Stream `dataset` rows matching `filters` (columns, tickers, start, end) into `path`."""
+    columns = select_columns(dataset, filters.pop("columns", None))
+    chunks = iter_chunks(store, dataset, columns=columns, chunk_rows=chunk_rows, **filters)
+    rows = write_chunks(chunks, path, fmt, columns)
+    logger.info("Exported %d %s rows to %s", rows, dataset, path)
+    return rows
@@ -0,0 +1,239 @@
+# src/fetch_pool.py
+"""
+Concurrent fetch subsystem.
+ConcurrentFetcher issues the price-history and fundamentals requests of many
+tickers on a shared thread pool. Every upstream call passes through a global
+token bucket and is retried with jittered exponential backoff; concurrent
+requests for the same ticker are coalesced into a single in-flight fetch.
+"""
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date
+from typing import Any, Callable, Collection, Dict, FrozenSet, Iterable, Optional, Tuple
+import logging
+import random
+import threading
+import time
+from .cache import ResponseCache
+from .data_fetcher import build_raw_data, fetch_fundamentals, fetch_prices, open_ticker, yf_ticker
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FETCH_SETTINGS: Dict[str, Any] = {
+    "max_workers": 16,
+    "rate_per_sec": 10.0,
+    "burst": 20,
+    "retries": 3,
+    "backoff_base": 0.5,
+    "backoff_cap": 30.0,
+}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens/sec refill, at most `burst` stored."""
+
+    def __init__(self, rate: float, burst: int = 1, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.burst)
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng: random.Random = random) -> float:
+    """'Full jitter' exponential backoff: uniform(0, min(cap, base * 2**attempt))."""
+    return rng.uniform(0.0, min(cap, base * (2 ** attempt)))
+
+
+class ResilientTicker:
+    """
+    Wraps a provider ticker so each upstream call takes a rate-limit token and
+    is retried with backoff. Sits underneath CachedTicker, so cache hits are free.
+    """
+
+    def __init__(self, inner, limiter: Optional[TokenBucket], retries: int, backoff_base: float,
+                 backoff_cap: float, sleep: Callable[[float], None] = time.sleep):
+        self._inner = inner
+        self._limiter = limiter
+        self._retries = retries
+        self._base = backoff_base
+        self._cap = backoff_cap
+        self._sleep = sleep
+
+    def _call(self, what: str, fn: Callable[[], Any]) -> Any:
+        for attempt in range(self._retries + 1):
+            if self._limiter is not None:
+                self._limiter.acquire()
+            try:
+                return fn()
+            except Exception as e:
+                if attempt >= self._retries:
+                    raise
+                delay = backoff_delay(attempt, self._base, self._cap)
+                logger.warning("%s failed (%s); retry %d/%d in %.2fs", what, e, attempt + 1, self._retries, delay)
+                self._sleep(delay)
+
+    def history(self, **kwargs):
+        return self._call("history", lambda: self._inner.history(**kwargs))
+
+    @property
+    def quarterly_balance_sheet(self):
+        return self._call("quarterly_balance_sheet", lambda: self._inner.quarterly_balance_sheet)
+
+    @property
+    def balance_sheet(self):
+        return self._call("balance_sheet", lambda: self._inner.balance_sheet)
+
+    @property
+    def info(self):
+        return self._call("info", lambda: self._inner.info)
+
+
+class ConcurrentFetcher:
+    """
+    Fetch raw_data dicts (as fetch_stock_data returns) for many tickers at once.
+    Prices and fundamentals of one ticker are fetched in parallel, tickers are
+    fetched in parallel, and duplicate requests share one Future.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_FETCH_SETTINGS["max_workers"],
+        rate_per_sec: Optional[float] = DEFAULT_FETCH_SETTINGS["rate_per_sec"],
+        burst: int = DEFAULT_FETCH_SETTINGS["burst"],
+        retries: int = DEFAULT_FETCH_SETTINGS["retries"],
+        backoff_base: float = DEFAULT_FETCH_SETTINGS["backoff_base"],
+        backoff_cap: float = DEFAULT_FETCH_SETTINGS["backoff_cap"],
+        ticker_factory: Optional[Callable[[str], Any]] = None,
+        cache: Optional[ResponseCache] = None,
+        use_cache: bool = True,
+    ):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+        self._limiter = TokenBucket(rate_per_sec, burst) if rate_per_sec else None
+        self._retries = retries
+        self._backoff = (backoff_base, backoff_cap)
+        self._factory = ticker_factory
+        self._cache = cache
+        self._use_cache = use_cache
+        self._inflight: Dict[Tuple[str, Optional[str], Optional[date], bool, FrozenSet[str]], Future] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any], workers_share: int = 1, **kwargs) -> "ConcurrentFetcher":
+        """
+        Build from the `fetch` config section. `workers_share` splits the rate
+        limit between that many independent fetchers (e.g. one per process).
+        """
+        s = {**DEFAULT_FETCH_SETTINGS, **cfg.get("fetch", {})}
+        rate = s["rate_per_sec"] / workers_share if s["rate_per_sec"] else None
+        return cls(max_workers=s["max_workers"], rate_per_sec=rate, burst=s["burst"], retries=s["retries"],
+                   backoff_base=s["backoff_base"], backoff_cap=s["backoff_cap"], **kwargs)
+
+    def _open(self, ticker: str):
+        factory = self._factory or yf_ticker
+        base, cap = self._backoff
+
+        def resilient(symbol: str):
+            return ResilientTicker(factory(symbol), self._limiter, self._retries, base, cap)
+        return open_ticker(ticker, self._cache, resilient, self._use_cache)
+
+    def submit(
+        self,
+        ticker: str,
+        period: Optional[str] = None,
+        start: Optional[date] = None,
+        fundamentals: bool = True,
+        known_quarters: Optional[Collection[str]] = None,
+    ) -> Future:
+        """
+        Schedule a fetch (or join the identical one already in flight).
+        `fundamentals`/`known_quarters` as in fetch_stock_data; callers with
+        different known quarters get fundamentals filtered for their own set.
+        """
+        key = (ticker, period, start, fundamentals, frozenset(known_quarters or ()))
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                return fut
+            fut = Future()
+            self._inflight[key] = fut
+        fut.add_done_callback(lambda _f: self._forget(key))
+
+        t = self._open(ticker)
+        prices_f = self._pool.submit(fetch_prices, t, ticker, period, start)
+        if fundamentals:
+            fund_f = self._pool.submit(fetch_fundamentals, t, ticker, known_quarters)
+        else:
+            fund_f = Future()
+            fund_f.set_result(([], "skipped"))
+        remaining = [2]
+        remaining_lock = threading.Lock()
+
+        def _part_done(_f):
+            with remaining_lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            try:
+                fundamentals, source_used = fund_f.result()
+                fut.set_result(build_raw_data(ticker, prices_f.result(), fundamentals, source_used))
+            except BaseException as e:
+                fut.set_exception(e)
+
+        prices_f.add_done_callback(_part_done)
+        fund_f.add_done_callback(_part_done)
+        return fut
+
+    def _forget(self, key):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def fetch(
+        self,
+        ticker: str,
+        period: Optional[str] = None,
+        start: Optional[date] = None,
+        fundamentals: bool = True,
+        known_quarters: Optional[Collection[str]] = None,
+    ) -> Dict[str, Any]:
+        """Blocking fetch of one ticker; same signature/result as fetch_stock_data."""
+        return self.submit(ticker, period=period, start=start, fundamentals=fundamentals,
+                           known_quarters=known_quarters).result()
+
+    def fetch_many(self, tickers: Iterable[str], period: Optional[str] = None) -> Dict[str, Any]:
+        """Fetch all tickers concurrently; values are raw_data dicts or the raised exception."""
+        futures = {t: self.submit(t, period=period) for t in tickers}
+        out: Dict[str, Any] = {}
+        for t, f in futures.items():
+            try:
+                out[t] = f.result()
+            except Exception as e:
+                out[t] = e
+        return out
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
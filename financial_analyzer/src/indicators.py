@@ -0,0 +1,224 @@
+# src/indicators.py
+"""
+Columnar indicator engine.
+Indicators are registered by kind and implemented as whole-column pandas/NumPy
+kernels, so adding one never costs a Python call per row.
+
+A spec is "kind" or "kind:param[:param...]", e.g. "sma:50", "ema:20",
+"rolling_max:252", "rsi:14", "volatility:20", "sma:20:volume". Integer params
+are parsed as ints; anything else is passed through as a string (column name).
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Tuple, Union
+import inspect
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+IndicatorFn = Callable[..., pd.Series]
+LookbackFn = Callable[..., int]
+
+INDICATORS: Dict[str, IndicatorFn] = {}
+LOOKBACKS: Dict[str, LookbackFn] = {}
+# kind -> fn(*params) returning the (kind, params) of a column the kernel builds on
+USES: Dict[str, Callable[..., Tuple[str, Tuple[Any, ...]]]] = {}
+
+# column name -> spec; reproduces the columns process_data has always produced
+PRICE_INDICATORS: Dict[str, str] = {
+    "sma50": "sma:50",
+    "sma200": "sma:200",
+    "52w_high": "rolling_max:252",
+    "pct_from_52w_high": "pct_from_high:252",
+}
+RATIO_INDICATORS: Dict[str, str] = {
+    "bvps": "bvps",
+    "price_to_book": "price_to_book",
+    "enterprise_value": "enterprise_value",
+}
+DEFAULT_INDICATORS: Dict[str, str] = {**PRICE_INDICATORS, **RATIO_INDICATORS}
+
+IndicatorSpecs = Union[Mapping[str, str], Iterable[str]]
+
+
+def register_indicator(kind: str, lookback: Optional[LookbackFn] = None, uses=None):
+    """
+    Decorator registering a column kernel `fn(df, *params, by=None) -> Series`
+    under `kind`; `by` names the group column in panel mode.
+    `lookback(*params)` returns how many trailing bars the kernel needs for an
+    exact value; by default the first param (the window) or 1.
+    `uses(*params)` names another indicator (kind, params) the kernel builds
+    on; compute_indicators passes it as `base=`, computed once per pass.
+    """
+    def deco(fn: IndicatorFn) -> IndicatorFn:
+        INDICATORS[kind] = fn
+        LOOKBACKS[kind] = lookback or (lambda window=1, *_: int(window))
+        if uses is not None:
+            USES[kind] = uses
+        return fn
+    return deco
+
+
+def parse_spec(spec: str) -> Tuple[str, Tuple[Any, ...]]:
+    """Split 'kind:p1:p2' into (kind, params), converting integer params."""
+    kind, *raw = str(spec).strip().split(":")
+    if kind not in INDICATORS:
+        raise ValueError(f"Unknown indicator '{kind}' in spec '{spec}'")
+    params = tuple(int(p) if p.lstrip("-").isdigit() else p for p in raw)
+    return kind, params
+
+
+def normalize_specs(specs: Optional[IndicatorSpecs]) -> Dict[str, str]:
+    """
+    Accept a {column: spec} mapping or a list of specs and return a mapping.
+    Bare specs are named after their params, e.g. "ema:20" -> "ema20" and
+    "sma:20:volume" -> "sma20_volume".
+    """
+    if specs is None:
+        return dict(DEFAULT_INDICATORS)
+    if isinstance(specs, Mapping):
+        return {str(k): str(v) for k, v in specs.items()}
+    out = {}
+    for spec in specs:
+        kind, *params = str(spec).strip().split(":")
+        out[kind + "_".join(params)] = str(spec)
+    return out
+
+
+def required_lookback(specs: Optional[IndicatorSpecs] = None) -> int:
+    """Largest number of trailing bars any of the given indicators needs."""
+    bars = 1
+    for spec in normalize_specs(specs).values():
+        kind, params = parse_spec(spec)
+        bars = max(bars, LOOKBACKS[kind](*params))
+    return bars
+
+
+def compute_indicators(
+    df: pd.DataFrame,
+    specs: Optional[IndicatorSpecs] = None,
+    by: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Compute every requested indicator over df's columns and return df with
+    the new columns attached in a single assign. With `by` (e.g. "ticker")
+    df is a panel: windows restart at each group and never span two groups.
+    """
+    src = df
+    if by is not None and not isinstance(df[by].dtype, pd.CategoricalDtype):
+        # factorize the group keys once instead of once per kernel
+        src = df.assign(**{by: df[by].astype("category")})
+    out: Dict[str, pd.Series] = {}
+    done: Dict[Tuple[str, Tuple[Any, ...]], pd.Series] = {}
+
+    def compute(kind: str, params: Tuple[Any, ...]) -> pd.Series:
+        key = _canonical(kind, params)
+        if key not in done:
+            extra = {"base": compute(*USES[kind](*params))} if kind in USES else {}
+            done[key] = INDICATORS[kind](src, *params, by=by, **extra)
+        return done[key]
+
+    for col, spec in normalize_specs(specs).items():
+        out[col] = compute(*parse_spec(spec))
+    return df.assign(**out)
+
+
+def _canonical(kind: str, params: Tuple[Any, ...]) -> Tuple[str, Tuple[Any, ...]]:
+    """(kind, params) with defaults filled in, so "sma" and "sma:50:close" share one key."""
+    bound = inspect.signature(INDICATORS[kind]).bind_partial(None, *params)
+    bound.apply_defaults()
+    return kind, tuple(v for k, v in list(bound.arguments.items())[1:] if k != "by")
+
+
+def _nonzero(s: pd.Series) -> pd.Series:
+    return s.where(s != 0)
+
+
+def _keys(df: pd.DataFrame, by: Optional[str]):
+    return None if by is None else df[by]
+
+
+def _rolling(s: pd.Series, keys, window: int, agg: str, min_periods: int = 1) -> pd.Series:
+    """Rolling `agg` over s, per group when keys are given; aligned to s.index."""
+    if keys is None:
+        return getattr(s.rolling(window=window, min_periods=min_periods), agg)()
+    r = s.groupby(keys, sort=False, observed=True).rolling(window=window, min_periods=min_periods)
+    return getattr(r, agg)().droplevel(0).reindex(s.index)
+
+
+# --- price kernels -----------------------------------------------------------
+
+@register_indicator("sma")
+def sma(df: pd.DataFrame, window: int = 50, column: str = "close", by: Optional[str] = None) -> pd.Series:
+    """Simple moving average; partial windows are averaged (min_periods=1)."""
+    return _rolling(df[column], _keys(df, by), window, "mean")
+
+
+@register_indicator("ema", lookback=lambda span=20, *_: 10 * int(span))
+def ema(df: pd.DataFrame, span: int = 20, column: str = "close", by: Optional[str] = None) -> pd.Series:
+    """Exponential moving average (recursive form, adjust=False)."""
+    if by is None:
+        return df[column].ewm(span=span, adjust=False).mean()
+    r = df[column].groupby(df[by], sort=False, observed=True).ewm(span=span, adjust=False).mean()
+    return r.droplevel(0).reindex(df.index)
+
+
+@register_indicator("rolling_max")
+def rolling_max(df: pd.DataFrame, window: int = 252, column: str = "close", by: Optional[str] = None) -> pd.Series:
+    return _rolling(df[column], _keys(df, by), window, "max")
+
+
+@register_indicator("rolling_min")
+def rolling_min(df: pd.DataFrame, window: int = 252, column: str = "close", by: Optional[str] = None) -> pd.Series:
+    return _rolling(df[column], _keys(df, by), window, "min")
+
+
+@register_indicator("pct_from_high", uses=lambda window=252, *rest: ("rolling_max", (window, *rest)))
+def pct_from_high(df: pd.DataFrame, window: int = 252, column: str = "close", by: Optional[str] = None,
+                  base: Optional[pd.Series] = None) -> pd.Series:
+    """
+    Percent distance of column from its rolling `window` high (<= 0).
+    `base` is that rolling high when already computed (e.g. the 52w_high column).
+    """
+    high = rolling_max(df, window, column, by=by) if base is None else base
+    return (df[column] / high - 1.0) * 100.0
+
+
+@register_indicator("rsi", lookback=lambda window=14, *_: int(window) + 1)
+def rsi(df: pd.DataFrame, window: int = 14, column: str = "close", by: Optional[str] = None) -> pd.Series:
+    """Relative Strength Index using simple rolling averages of gains/losses."""
+    keys = _keys(df, by)
+    delta = df[column].diff() if keys is None else df[column].groupby(keys, sort=False, observed=True).diff()
+    gain = _rolling(delta.clip(lower=0), keys, window, "mean", min_periods=window)
+    loss = _rolling(-delta.clip(upper=0), keys, window, "mean", min_periods=window)
+    return 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+@register_indicator("volatility", lookback=lambda window=20, *_: int(window) + 1)
+def volatility(df: pd.DataFrame, window: int = 20, column: str = "close", by: Optional[str] = None) -> pd.Series:
+    """Annualised rolling standard deviation of daily returns."""
+    keys = _keys(df, by)
+    s = df[column]
+    returns = s.pct_change() if keys is None else s.groupby(keys, sort=False, observed=True).pct_change()
+    return _rolling(returns, keys, window, "std", min_periods=2) * np.sqrt(252.0)
+
+
+# --- fundamental ratio kernels -----------------------------------------------
+
+@register_indicator("bvps")
+def bvps(df: pd.DataFrame, by: Optional[str] = None) -> pd.Series:
+    """Book Value per Share = total_stockholder_equity / shares_outstanding."""
+    return df["total_stockholder_equity"] / _nonzero(df["shares_outstanding"])
+
+
+@register_indicator("price_to_book")
+def price_to_book(df: pd.DataFrame, by: Optional[str] = None) -> pd.Series:
+    """Price-to-Book = close / bvps."""
+    return df["close"] / _nonzero(bvps(df))
+
+
+@register_indicator("enterprise_value")
+def enterprise_value(df: pd.DataFrame, by: Optional[str] = None) -> pd.Series:
+    """Enterprise Value (simplified): market_cap + total_debt - cash."""
+    return df["market_cap"] + df["total_debt"] - df["cash_and_cash_equivalents"]
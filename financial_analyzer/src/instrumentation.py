@@ -0,0 +1,211 @@
+# src/instrumentation.py
+"""
+Per-stage pipeline instrumentation.
+A StageTimer records wall time, CPU time, rows in/out, bytes, DB rows
+written and the process peak RSS for each named stage of a run. Deeper code
+(e.g. the merge_asof step in processor) opens sub-stages through the
+module-level `stage()` helper, which is a no-op unless a timer is active in
+the current thread/context. Timings can be exported as a JSON-ready dict and
+as a Prometheus textfile for the node exporter's textfile collector.
+"""
+from __future__ import annotations
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, Optional
+import cProfile
+import io
+import logging
+import os
+import pathlib
+import pstats
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "financial_analyzer"
+
+_ACTIVE: ContextVar[Optional["StageTimer"]] = ContextVar("active_stage_timer", default=None)
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """High-water resident set size of this process, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def frame_bytes(obj: Any) -> int:
+    """In-memory size of a DataFrame, used as 'bytes fetched' (yfinance hides wire sizes)."""
+    if hasattr(obj, "memory_usage"):
+        return int(obj.memory_usage(deep=True).sum())
+    return 0
+
+
+class StageTimer:
+    """
+    Collects one record per stage:
+      {"wall_s", "cpu_s", "rows_in", "rows_out", "bytes", "db_rows", "peak_rss_bytes"}
+    Counters default to None and are filled by the caller through the record
+    yielded from stage(). With `profile=True` every stage is run under its own
+    cProfile.Profile so the slowest one can be dumped afterwards.
+    """
+
+    def __init__(self, profile: bool = False):
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.profile = profile
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._profiling = False
+
+    @contextmanager
+    def stage(self, name: str, rows_in: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        record = {"rows_in": rows_in, "rows_out": None, "bytes": None, "db_rows": None}
+        prof = None
+        # cProfile refuses nested profilers, so sub-stages run unprofiled
+        if self.profile and not self._profiling:
+            prof = self._profiles.setdefault(name, cProfile.Profile())
+            self._profiling = True
+        token = _ACTIVE.set(self)
+        wall, cpu = time.perf_counter(), time.thread_time()
+        if prof is not None:
+            prof.enable()
+        try:
+            yield record
+        finally:
+            if prof is not None:
+                prof.disable()
+                self._profiling = False
+            record["wall_s"] = time.perf_counter() - wall
+            record["cpu_s"] = time.thread_time() - cpu
+            record["peak_rss_bytes"] = peak_rss_bytes()
+            _ACTIVE.reset(token)
+            self._merge(name, record)
+
+    def _merge(self, name: str, record: Dict[str, Any]):
+        # a stage entered more than once (e.g. per chunk) accumulates
+        prev = self.stages.get(name)
+        if prev is None:
+            self.stages[name] = record
+            return
+        for key in ("wall_s", "cpu_s", "rows_in", "rows_out", "bytes", "db_rows"):
+            if record[key] is not None:
+                prev[key] = (prev[key] or 0) + record[key]
+        prev["peak_rss_bytes"] = record["peak_rss_bytes"]
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        """JSON-ready copy of the stage records (times rounded to microseconds)."""
+        out = {}
+        for name, rec in self.stages.items():
+            out[name] = {
+                k: (round(v, 6) if isinstance(v, float) else v)
+                for k, v in rec.items()
+            }
+        return out
+
+    def hot_stage(self) -> Optional[str]:
+        """Name of the top-level stage with the largest wall time."""
+        top = {n: r for n, r in self.stages.items() if "." not in n}
+        return max(top, key=lambda n: top[n]["wall_s"]) if top else None
+
+    def dump_profile(self, path: str, top: int = 20) -> Optional[str]:
+        """Write the hot stage's cProfile stats to `path` and log its top functions."""
+        name = self.hot_stage()
+        prof = self._profiles.get(name) if name else None
+        if prof is None:
+            logger.warning("No profile captured")
+            return None
+        prof.dump_stats(path)
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(top)
+        logger.info("Profile of hot stage '%s' written to %s\n%s", name, path, buf.getvalue())
+        return name
+
+
+@contextmanager
+def stage(name: str, rows_in: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Sub-stage of the timer active in this context; records nothing when none is."""
+    timer = _ACTIVE.get()
+    if timer is None:
+        yield {}
+        return
+    with timer.stage(name, rows_in=rows_in) as record:
+        yield record
+
+
+def merge_timings(timings: Iterable[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """Sum per-stage counters across runs (e.g. all tickers of a batch); RSS keeps the max."""
+    out: Dict[str, Dict[str, Any]] = {}
+    for t in timings:
+        for name, rec in t.items():
+            agg = out.setdefault(name, {})
+            for key, value in rec.items():
+                if value is None:
+                    agg.setdefault(key, None)
+                elif key == "peak_rss_bytes":
+                    agg[key] = max(agg.get(key) or 0, value)
+                else:
+                    agg[key] = (agg.get(key) or 0) + value
+    return out
+
+
+_METRICS = {
+    "wall_s": ("stage_wall_seconds", "Wall-clock time spent in a pipeline stage."),
+    "cpu_s": ("stage_cpu_seconds", "CPU time (calling thread) spent in a pipeline stage."),
+    "rows_in": ("stage_rows_in", "Rows entering a pipeline stage."),
+    "rows_out": ("stage_rows_out", "Rows produced by a pipeline stage."),
+    "bytes": ("stage_bytes", "Bytes handled by a pipeline stage (in-memory size of fetched data)."),
+    "db_rows": ("stage_db_rows_written", "Database rows written by a pipeline stage."),
+}
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    def esc(v: str) -> str:
+        return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return ",".join(f'{k}="{esc(v)}"' for k, v in labels.items())
+
+
+def to_prometheus(timings: Dict[str, Dict[str, Any]], labels: Optional[Dict[str, str]] = None) -> str:
+    """Render stage timings in the Prometheus text exposition format."""
+    labels = labels or {}
+    lines = []
+    for key, (metric, help_text) in _METRICS.items():
+        samples = [(n, r[key]) for n, r in timings.items() if r.get(key) is not None]
+        if not samples:
+            continue
+        full = f"{METRIC_PREFIX}_{metric}"
+        lines.append(f"# HELP {full} {help_text}")
+        lines.append(f"# TYPE {full} gauge")
+        for name, value in samples:
+            lines.append(f"{full}{{{_labels({**labels, 'stage': name})}}} {value}")
+    peaks = [r["peak_rss_bytes"] for r in timings.values() if r.get("peak_rss_bytes") is not None]
+    if peaks:
+        full = f"{METRIC_PREFIX}_peak_rss_bytes"
+        lines.append(f"# HELP {full} Peak resident set size of the pipeline process.")
+        lines.append(f"# TYPE {full} gauge")
+        lines.append(f"{full}{{{_labels(labels)}}} {max(peaks)}" if labels else f"{full} {max(peaks)}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str, timings: Dict[str, Dict[str, Any]], labels: Optional[Dict[str, str]] = None):
+    """
+    Write a .prom textfile atomically (temp file + rename), as the node
+    exporter's textfile collector may read it at any moment.
+    """
+    target = pathlib.Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".", suffix=".prom.tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf8") as f:
+            f.write(to_prometheus(timings, labels))
+        os.replace(tmp, target)
+    except BaseException:
+        os.unlink(tmp)
+        raise
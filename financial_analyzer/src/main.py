@@ -3,17 +3,33 @@ from __future__ import annotations
 import typer
 import logging
 import json
-import pandas as pd
+import sys
+import time
+import pathlib
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from datetime import datetime, timezone
-from .signals import detect_golden_crossover, detect_death_cross
-from .database import init_db, get_engine, save_daily_metrics, save_signal_events
-from .config import load_config
-from .data_fetcher import fetch_stock_data
-from .processor import process_data
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from .config import get_config, set_config
+from .cache import ResponseCache
+from .instrumentation import StageTimer, merge_timings, write_prometheus
 
-app = typer.Typer()
+if TYPE_CHECKING:
+    from .fetch_pool import ConcurrentFetcher
+    from .signals import RuleSet
+    from .scheduler import PriceHistory
+
+# pandas, SQLAlchemy, yfinance and pydantic take over a second to import, so
+# they are imported inside the commands that use them: `--help` and DB-only
+# commands (scan) start without them.
+
+app = typer.Typer(rich_markup_mode=None, pretty_exceptions_enable=False)
 logger = logging.getLogger("financial_analyzer")
 
+# One engine (and fetcher) per worker: threads share the module-level ones
+# (SQLAlchemy engines are thread-safe), while each pool process creates its own.
+_WORKER_ENGINE = None
+_WORKER_FETCHER: Optional[ConcurrentFetcher] = None
+
 
 def setup_logging(cfg):
     level = cfg.get("logging", {}).get("level", "INFO").upper()
@@ -24,14 +40,196 @@ def setup_logging(cfg):
     )
 
 
+def analyze_ticker(
+    ticker: str,
+    engine=None,
+    output: Optional[str] = None,
+    incremental: bool = False,
+    indicators: Optional[Dict[str, str]] = None,
+    cache: Optional[ResponseCache] = None,
+    fetcher: Optional[ConcurrentFetcher] = None,
+    timer: Optional[StageTimer] = None,
+    compact: bool = False,
+    fundamentals_max_age_days: Optional[float] = 7,
+    history: Optional["PriceHistory"] = None,
+    validation: Optional[Dict[str, Any]] = None,
+    rules: Optional["RuleSet"] = None,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """
+    Fetch, process, detect signals and save a single ticker.
+    Returns the JSON summary payload; writes it to `output` when given.
+
+    In incremental mode only bars newer than the latest stored date are saved;
+    the fetch starts far enough back for the longest indicator window.
+    A shared `fetcher` (rate limited, coalescing) replaces the serial fetch.
+    `engine` is the storage backend: a SQLAlchemy engine or a ParquetStore.
+    Every stage is measured by `timer` (a fresh StageTimer by default) and
+    the records go into the payload's `timings` section. `compact` keeps the
+    processed frame in processor.compact() form (float32, categorical ticker).
+
+    Fundamentals come from the fundamentals table: the provider is only asked
+    again when the ticker was last checked more than `fundamentals_max_age_days`
+    ago (None: every run), and then only quarters not stored yet are parsed
+    and upserted.
+
+    `history` (a scheduler.PriceHistory) keeps recent prices in memory across
+    calls: an incremental run with a warm entry skips the DB lookup and only
+    fetches bars after the last cached one.
+
+    `validation` (validation.settings_from_config) checks the fetched prices
+    with validation.validate_prices before processing; its report goes into
+    the payload when something was found. None skips the stage.
+
+    `rules` (a signals.RuleSet) are evaluated together over the processed
+    frame; the default is signals.DEFAULT_RULES (golden and death crosses).
+
+    Runs are memoized: when the fingerprint of the inputs (prices,
+    fundamentals, settings, code version; see memo.py) equals the one stored
+    by the ticker's last run (and `output` exists), processing, the results
+    save and the `output` rewrite are skipped and the payload is marked
+    `unchanged`. `force` recomputes regardless; incremental runs are not memoized.
+    """
+    from .pipeline import (TickerRun, fetch_stage, memo_settings, memo_stage, payload, process_stage,
+                           save_fundamentals_stage, save_stage)
+
+    if engine is None:
+        from .database import get_engine
+        engine = get_engine()
+    run = TickerRun(ticker, timer)
+    fetch_stage(run, engine, incremental=incremental, indicators=indicators, cache=cache, fetcher=fetcher,
+                fundamentals_max_age_days=fundamentals_max_age_days, history=history, validation=validation)
+    memo_stage(run, engine, memo_settings(indicators, compact, rules, validation), force=force, output=output,
+               incremental=incremental)
+    save_fundamentals_stage(run, engine)
+    if not run.unchanged:
+        process_stage(run, indicators=indicators, compact=compact, rules=rules)
+        save_stage(run, engine)
+    if history is not None:
+        history.put(ticker, run.raw["prices"])
+    return payload(run, incremental=incremental, output=output)
+
+
+def indicator_specs(cfg: Dict[str, Any]) -> Dict[str, str]:
+    """Default indicators extended by the optional `indicators` config section."""
+    from .indicators import DEFAULT_INDICATORS, normalize_specs
+    return {**DEFAULT_INDICATORS, **normalize_specs(cfg.get("indicators") or {})}
+
+
+def signal_rules(cfg: Dict[str, Any]) -> "RuleSet":
+    """Default signal rules extended by the optional `signals` config section."""
+    from .signals import rules_from_config
+
+    try:
+        return rules_from_config(cfg)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+
+
+def _validation_settings(cfg: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """validate_prices options from the `validation` config section (None when the policy is off)."""
+    from .validation import settings_from_config
+
+    try:
+        settings = settings_from_config(cfg)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    return None if settings["policy"] == "off" else settings
+
+
+def _with_cache(cfg: Dict[str, Any], cache: Optional[bool]) -> Dict[str, Any]:
+    """Apply the --cache/--no-cache override to the config (installed process-wide, so workers see it)."""
+    if cache is None:
+        return cfg
+    cfg = {**cfg, "cache": {**cfg.get("cache", {}), "enabled": cache}}
+    set_config(cfg)
+    return cfg
+
+
+def read_tickers(source: str) -> List[str]:
+    """
+    Read ticker symbols from a file (or stdin when source is '-').
+    One ticker per line (commas also accepted); blank lines and '#' comments
+    are ignored and duplicates are dropped, keeping the first occurrence.
+    """
+    if source == "-":
+        text = sys.stdin.read()
+    else:
+        text = pathlib.Path(source).read_text(encoding="utf8")
+    tickers: List[str] = []
+    seen = set()
+    for line in text.splitlines():
+        line = line.split("#", 1)[0]
+        for tok in line.replace(",", " ").split():
+            tok = tok.strip().upper()
+            if tok and tok not in seen:
+                seen.add(tok)
+                tickers.append(tok)
+    return tickers
+
+
+def _init_worker(cfg: Dict[str, Any], workers: int, cache: Optional[ResponseCache]):
+    """
+    Process-pool initializer: configure logging and build the worker's engine
+    and fetcher. The configured rate limit is split evenly across processes.
+    """
+    from .fetch_pool import ConcurrentFetcher
+    from .storage import open_store
+
+    global _WORKER_ENGINE, _WORKER_FETCHER
+    set_config(cfg)  # the parent's config; the worker never re-reads config.yaml
+    setup_logging(cfg)
+    _WORKER_ENGINE = open_store(cfg)
+    _WORKER_FETCHER = ConcurrentFetcher.from_config(cfg, workers_share=workers, cache=cache)
+
+
+def _batch_job(ticker: str, db_path: str, output_dir: Optional[str], options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one ticker inside a pool worker; `options` are passed to analyze_ticker.
+    Failures are caught and reported in the result so a single bad symbol
+    never aborts the batch.
+    """
+    global _WORKER_ENGINE
+    if _WORKER_ENGINE is None:
+        from .database import get_engine
+        _WORKER_ENGINE = get_engine(db_path)
+    output = None
+    if output_dir:
+        output = str(pathlib.Path(output_dir) / f"{ticker.lower()}_analysis.json")
+    start = time.perf_counter()
+    try:
+        payload = analyze_ticker(ticker, engine=_WORKER_ENGINE, output=output, fetcher=_WORKER_FETCHER, **options)
+        return {
+            "ticker": ticker,
+            "ok": True,
+            "rows": payload["price_rows_count"],
+            "signals": len(payload["signals"]),
+            "seconds": time.perf_counter() - start,
+            "timings": payload.get("timings", {}),
+            "unchanged": payload.get("unchanged", False),
+        }
+    except Exception as e:
+        logger.exception("Pipeline failed for %s", ticker)
+        return {"ticker": ticker, "ok": False, "error": f"{type(e).__name__}: {e}", "seconds": time.perf_counter() - start}
+
+
 @app.command()
 def run(
     ticker: str = typer.Option(..., help="Ticker symbol e.g. NVDA, AAPL, RELIANCE.NS"),
     output: str = typer.Option("analysis.json", help="Output JSON file"),
-    initdb: bool = typer.Option(True, help="Initialize DB tables if needed")
+    initdb: bool = typer.Option(True, help="Initialize DB tables if needed"),
+    incremental: bool = typer.Option(False, help="Only fetch and save bars newer than the latest stored date"),
+    offline: bool = typer.Option(False, help="Serve all market data from the on-disk cache, never the network"),
+    use_cache: Optional[bool] = typer.Option(None, "--cache/--no-cache",
+                                             help="Reuse cached market data within its TTL (default: cache.enabled)"),
+    metrics_file: Optional[str] = typer.Option(None, help="Write stage timings as a Prometheus textfile (.prom)"),
+    profile: Optional[str] = typer.Option(None, help="Write a cProfile dump of the slowest stage to this path"),
+    force: bool = typer.Option(False, help="Recompute even when the inputs are unchanged since the last run"),
 ):
     """
     Run full pipeline for a single ticker:
+
+    \b
       1. Init DB
       2. Fetch and validate data
       3. Process metrics
@@ -39,56 +237,457 @@ def run(
       5. Save to DB and JSON
       6. Log success/failure
     """
-    cfg = load_config()
+    cfg = _with_cache(get_config(), use_cache)
     setup_logging(cfg)
+    from .storage import init_store, open_store
 
     logger.info("Starting pipeline for %s", ticker)
 
+    engine = open_store(cfg)
     # Initialize DB if requested
     if initdb:
-        engine = get_engine()
-        init_db(engine)
+        init_store(engine)
         logger.info("Database initialized")
 
-   
-    raw = fetch_stock_data(ticker)
-    processed = process_data(raw)
-  
-    processed = processed.assign(
-        date=pd.to_datetime(processed["date"]).dt.tz_localize(None)
-    )
-    # Detect signals
-    logger.info("Detecting signals...")
-    golden_dates = detect_golden_crossover(processed.assign(date=pd.to_datetime(processed["date"])))
-    death_dates = detect_death_cross(processed.assign(date=pd.to_datetime(processed["date"])))
-    logger.info("Signals detected: %d golden, %d death", len(golden_dates), len(death_dates))
-
-    # Convert signal dates to ISO strings to ensure DB compatibility
-    events = []
-    for d in golden_dates:
-        events.append({"date": pd.to_datetime(d).isoformat(), "signal_type": "golden_cross", "meta": {}})
-    for d in death_dates:
-        events.append({"date": pd.to_datetime(d).isoformat(), "signal_type": "death_cross", "meta": {}})
-
-    # Save to DB
-    
-    engine = get_engine()
-    save_daily_metrics(processed.assign(date=pd.to_datetime(processed["date"])), engine=engine)
-    save_signal_events(ticker, events, engine=engine)
-
-    # Export JSON summary
-    payload = {
-        "ticker": ticker,
-        "generated_at": datetime.utcnow().isoformat(),
-        "price_rows_count": int(len(processed)),
-        "fundamentals_used": raw.get("source_info", {}).get("used", "unknown"),
-        "signals": events,
-    }
-    with open(output, "w", encoding="utf8") as f:
-        json.dump(payload, f, indent=2)
+    cache = ResponseCache.from_config(cfg, offline=True) if offline else None
+    timer = StageTimer(profile=bool(profile))
+    payload = analyze_ticker(ticker, engine=engine, output=output, incremental=incremental,
+                             indicators=indicator_specs(cfg), cache=cache, timer=timer,
+                             compact=cfg["data_settings"].get("compact_frames", False),
+                             fundamentals_max_age_days=cfg["data_settings"].get("fundamentals_max_age_days"),
+                             validation=_validation_settings(cfg), rules=signal_rules(cfg), force=force)
 
+    for name, rec in payload["timings"].items():
+        logger.info("Stage %-20s wall=%.3fs cpu=%.3fs rows_in=%s rows_out=%s db_rows=%s",
+                    name, rec["wall_s"], rec["cpu_s"], rec["rows_in"], rec["rows_out"], rec["db_rows"])
+    if metrics_file:
+        write_prometheus(metrics_file, payload["timings"], labels={"ticker": ticker})
+        logger.info("Metrics written to %s", metrics_file)
+    if profile:
+        timer.dump_profile(profile)
     logger.info("Finished. JSON exported to %s", output)
 
 
+def _run_pool(executor: str, cfg: Dict[str, Any], db_path: str, symbols: List[str], workers: int,
+              cache: Optional[ResponseCache], output_dir: Optional[str], options: Dict[str, Any]):
+    """Run _batch_job for every symbol on a thread or process pool; returns (results, seconds)."""
+    from .fetch_pool import ConcurrentFetcher
+    from .storage import open_store
+
+    global _WORKER_ENGINE, _WORKER_FETCHER
+    if executor == "process":
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(cfg, workers, cache),
+        )
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers)
+        _WORKER_ENGINE = open_store(cfg, db_path)
+        _WORKER_FETCHER = ConcurrentFetcher.from_config(cfg, cache=cache)
+
+    results: List[Dict[str, Any]] = []
+    start = time.perf_counter()
+    try:
+        with pool:
+            futures = [pool.submit(_batch_job, sym, db_path, output_dir, options) for sym in symbols]
+            for fut in as_completed(futures):
+                results.append(fut.result())
+    finally:
+        if _WORKER_FETCHER is not None:
+            _WORKER_FETCHER.close()
+            _WORKER_FETCHER = None
+    return results, time.perf_counter() - start
+
+
+@app.command()
+def batch(
+    tickers: str = typer.Option("-", help="File with one ticker per line, or '-' to read stdin"),
+    workers: int = typer.Option(4, min=1, help="Number of parallel workers (fetch threads for 'pipeline')"),
+    executor: str = typer.Option("thread", help="Worker pool type: 'thread', 'process' or 'pipeline' "
+                                                "(fetch/process/write stages with one batching DB writer)"),
+    output_dir: Optional[str] = typer.Option(None, help="Directory for per-ticker JSON exports (skipped if unset)"),
+    initdb: bool = typer.Option(True, help="Initialize DB tables if needed"),
+    incremental: bool = typer.Option(False, help="Only fetch and save bars newer than the latest stored date"),
+    offline: bool = typer.Option(False, help="Serve all market data from the on-disk cache, never the network"),
+    use_cache: Optional[bool] = typer.Option(None, "--cache/--no-cache",
+                                             help="Reuse cached market data within its TTL (default: cache.enabled)"),
+    metrics_file: Optional[str] = typer.Option(None, help="Write stage timings summed over all tickers as a Prometheus textfile"),
+    force: bool = typer.Option(False, help="Recompute even when the inputs are unchanged since the last run"),
+):
+    """
+    Run the full pipeline for many tickers over a worker pool and print an
+    aggregate summary with throughput. The 'pipeline' executor overlaps the
+    stages instead: fetch threads, processing threads and one writer thread
+    that saves many tickers per transaction (src/pipeline.py).
+    """
+    cfg = _with_cache(get_config(), use_cache)
+    setup_logging(cfg)
+
+    if executor not in ("thread", "process", "pipeline"):
+        raise typer.BadParameter("executor must be 'thread', 'process' or 'pipeline'")
+    from .storage import init_store, open_store
+
+    symbols = read_tickers(tickers)
+    if not symbols:
+        logger.warning("No tickers to process")
+        raise typer.Exit(code=0)
+
+    db_path = cfg["database"]["path"]
+    if initdb:
+        init_store(open_store(cfg, db_path))
+        logger.info("Database initialized")
+    if output_dir:
+        pathlib.Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+    cache = ResponseCache.from_config(cfg, offline=True) if offline else None
+    options = {"incremental": incremental, "indicators": indicator_specs(cfg),
+               "compact": cfg["data_settings"].get("compact_frames", False),
+               "fundamentals_max_age_days": cfg["data_settings"].get("fundamentals_max_age_days"),
+               "validation": _validation_settings(cfg), "rules": signal_rules(cfg), "force": force}
+    workers = min(workers, len(symbols))
+    logger.info("Starting batch of %d tickers with %d %s workers", len(symbols), workers, executor)
+    writer_timings: Dict[str, Any] = {}
+    if executor == "pipeline":
+        from .fetch_pool import ConcurrentFetcher
+        from .pipeline import Pipeline
+
+        fetcher = ConcurrentFetcher.from_config(cfg, cache=cache)
+        pipeline = Pipeline.from_config(cfg, open_store(cfg, db_path), fetcher=fetcher, cache=cache,
+                                        fetch_workers=workers, output_dir=output_dir, **options)
+        start = time.perf_counter()
+        try:
+            results = pipeline.run(symbols)
+        finally:
+            fetcher.close()
+        elapsed = time.perf_counter() - start
+        writer_timings = pipeline.writer_timer.as_dict()
+    else:
+        results, elapsed = _run_pool(executor, cfg, db_path, symbols, workers, cache, output_dir, options)
+
+    ok = [r for r in results if r["ok"]]
+    failed = [r for r in results if not r["ok"]]
+    typer.echo(f"Processed {len(results)} tickers in {elapsed:.2f}s "
+               f"({len(results) / elapsed if elapsed > 0 else 0.0:.2f} tickers/sec)")
+    typer.echo(f"  succeeded: {len(ok)}  failed: {len(failed)}  "
+               f"unchanged: {sum(1 for r in ok if r.get('unchanged'))}  "
+               f"rows: {sum(r['rows'] for r in ok)}  signals: {sum(r['signals'] for r in ok)}")
+    for r in sorted(failed, key=lambda r: r["ticker"]):
+        typer.echo(f"  FAILED {r['ticker']}: {r['error']}")
+    if metrics_file:
+        write_prometheus(metrics_file, merge_timings([*(r["timings"] for r in ok), writer_timings]))
+    if failed:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def scan(
+    ticker: Optional[List[str]] = typer.Option(None, help="Ticker(s) to scan; repeat the option, default all"),
+    start: Optional[datetime] = typer.Option(None, formats=["%Y-%m-%d"], help="First event date to record"),
+    end: Optional[datetime] = typer.Option(None, formats=["%Y-%m-%d"], help="Last event date to record"),
+    replace: bool = typer.Option(False, help="Delete existing crosses in the scanned scope first"),
+):
+    """
+    Re-scan stored daily_metrics for golden/death crosses inside SQLite
+    (window functions) and write them to signal_events.
+    """
+    cfg = get_config()
+    setup_logging(cfg)
+    if cfg["database"].get("backend", "sqlite") != "sqlite":
+        raise typer.BadParameter("scan runs inside SQLite and needs database.backend: sqlite")
+    from .database import connect, has_schema, init_db, get_engine, scan_crossovers
+
+    db_cfg = cfg["database"]
+    if int(db_cfg.get("shards") or 1) > 1:
+        from .sharding import ShardedStore
+
+        start_time = time.perf_counter()
+        inserted = ShardedStore(db_cfg["path"], int(db_cfg["shards"]), db_cfg.get("pragmas", {})).scan_crossovers(
+            tickers=ticker or None,
+            start=start.date() if start else None,
+            end=end.date() if end else None,
+            replace=replace,
+        )
+        typer.echo(f"Inserted {inserted} signal events in {time.perf_counter() - start_time:.2f}s")
+        return
+    conn = connect(db_cfg["path"], db_cfg.get("pragmas", {}))
+    if not has_schema(conn):
+        init_db(get_engine(db_cfg["path"], db_cfg.get("pragmas", {})))
+    start_time = time.perf_counter()
+    inserted = scan_crossovers(
+        conn,
+        tickers=ticker or None,
+        start=start.date() if start else None,
+        end=end.date() if end else None,
+        replace=replace,
+    )
+    conn.close()
+    typer.echo(f"Inserted {inserted} signal events in {time.perf_counter() - start_time:.2f}s")
+
+
+@app.command()
+def screen(
+    filters: Optional[List[str]] = typer.Argument(None, help="Filters ANDed together, e.g. 'pct_from_high >= -5' 'price_to_book < 3'"),
+    columns: Optional[str] = typer.Option(None, help="Comma-separated snapshot columns to show"),
+    sort: Optional[str] = typer.Option(None, help="Column to sort by (default ticker)"),
+    descending: bool = typer.Option(False, help="Sort in descending order"),
+    limit: Optional[int] = typer.Option(None, min=1, help="Maximum number of tickers to print"),
+    fmt: str = typer.Option("table", "--format", help="'table', 'csv' or 'json' (one object per line)"),
+    rebuild: bool = typer.Option(False, help="Rebuild the latest_metrics snapshot from daily_metrics first"),
+):
+    """
+    Screen every stored ticker by its latest metrics (the latest_metrics
+    snapshot table), e.g. screen 'pct_from_high >= -5' 'price_to_book < 3'.
+    """
+    cfg = get_config()
+    setup_logging(cfg)
+    db_cfg = cfg["database"]
+    if db_cfg.get("backend", "sqlite") != "sqlite":
+        raise typer.BadParameter("screen reads the SQLite latest_metrics table and needs database.backend: sqlite")
+    from .database import connect, get_engine, has_table, init_db, refresh_latest_metrics
+    from .screener import build_query, format_rows, screen as run_screen
+
+    options = {"columns": [c.strip() for c in columns.split(",") if c.strip()] if columns else None,
+               "sort": sort, "descending": descending, "limit": limit}
+    try:
+        build_query(filters or [], **options)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    start_time = time.perf_counter()
+    shards = int(db_cfg.get("shards") or 1)
+    if shards > 1:
+        from .sharding import ShardedStore
+
+        cols, rows = ShardedStore(db_cfg["path"], shards, db_cfg.get("pragmas", {})).screen(
+            filters or [], rebuild=rebuild, **options)
+    else:
+        conn = connect(db_cfg["path"], db_cfg.get("pragmas", {}))
+        try:
+            # init_db builds the snapshot of databases written before it existed
+            if not has_table(conn, "latest_metrics"):
+                init_db(get_engine(db_cfg["path"], db_cfg.get("pragmas", {})))
+            elif rebuild:
+                refresh_latest_metrics(conn)
+            cols, rows = run_screen(conn, filters or [], **options)
+        finally:
+            conn.close()
+    elapsed = time.perf_counter() - start_time
+    try:
+        typer.echo(format_rows(cols, rows, fmt))
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    logger.info("Screen matched %d tickers in %.1f ms", len(rows), elapsed * 1000)
+
+
+@app.command()
+def rollup(
+    timeframe: str = typer.Option("weekly", help="'weekly' or 'monthly' bars"),
+    ticker: Optional[List[str]] = typer.Option(None, help="Ticker(s) to read; repeat the option, default all"),
+    start: Optional[datetime] = typer.Option(None, formats=["%Y-%m-%d"], help="First period start to read"),
+    end: Optional[datetime] = typer.Option(None, formats=["%Y-%m-%d"], help="Last period start to read"),
+    output: Optional[str] = typer.Option(None, help="Write the bars to this CSV file instead of printing them"),
+    rebuild: bool = typer.Option(False, help="Rebuild the weekly and monthly tables from daily_metrics first"),
+):
+    """
+    Print (or save) weekly/monthly OHLCV bars with their SMA10/SMA40 and
+    period change, read from the rollup tables kept current by every save.
+    """
+    cfg = get_config()
+    setup_logging(cfg)
+    db_cfg = cfg["database"]
+    if db_cfg.get("backend", "sqlite") != "sqlite":
+        raise typer.BadParameter("rollup reads the SQLite rollup tables and needs database.backend: sqlite")
+    from .database import ROLLUPS, init_db, load_rollups, refresh_rollups
+    from .storage import ShardedStore, open_store
+
+    if timeframe not in ROLLUPS:
+        raise typer.BadParameter(f"timeframe must be one of {tuple(ROLLUPS)}")
+    start_time = time.perf_counter()
+    store = open_store(cfg)
+    window = {"tickers": ticker or None, "start": start.date() if start else None, "end": end.date() if end else None}
+    # init_db builds missing rollup tables from the stored daily rows
+    if isinstance(store, ShardedStore):
+        store.init()
+        if rebuild:
+            store.refresh_rollups()
+        bars = store.load_rollups(timeframe, **window)
+    else:
+        init_db(store)
+        if rebuild:
+            refresh_rollups(store)
+        bars = load_rollups(store, timeframe, **window)
+    logger.info("Read %d %s bars in %.3fs", len(bars), timeframe, time.perf_counter() - start_time)
+    if output:
+        bars.to_csv(output, index=False, date_format="%Y-%m-%d")
+        typer.echo(f"Wrote {len(bars)} {timeframe} bars to {output}")
+    else:
+        typer.echo(bars.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+
+
+@app.command()
+def backtest(
+    ticker: Optional[List[str]] = typer.Option(None, help="Ticker(s) to test; repeat the option, default all stored"),
+    fast: str = typer.Option("10:100:10", help="Fast SMA windows: 'start:stop:step' or a comma list"),
+    slow: str = typer.Option("50,100,150,200,250", help="Slow SMA windows: 'start:stop:step' or a comma list"),
+    start: Optional[datetime] = typer.Option(None, formats=["%Y-%m-%d"], help="First bar to use"),
+    end: Optional[datetime] = typer.Option(None, formats=["%Y-%m-%d"], help="Last bar to use"),
+    cost_bps: float = typer.Option(0.0, min=0.0, help="Cost per position change in basis points"),
+    full_windows: bool = typer.Option(False, help="Only trade once both SMAs have a full window"),
+    output: Optional[str] = typer.Option(None, help="CSV file for per (fast, slow, ticker) results"),
+    top: int = typer.Option(10, min=1, help="Number of window pairs to print"),
+):
+    """
+    Backtest the golden/death cross strategy for every (fast, slow) SMA
+    window pair over the stored closes and print the best pairs.
+    """
+    cfg = get_config()
+    setup_logging(cfg)
+    from .backtest import load_closes, parse_windows, summarize, sweep, window_pairs
+    from .storage import open_store
+
+    try:
+        fast_windows, slow_windows = parse_windows(fast), parse_windows(slow)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    if not window_pairs(fast_windows, slow_windows):
+        raise typer.BadParameter("no (fast, slow) pair with fast < slow")
+
+    started = time.perf_counter()
+    closes = load_closes(open_store(cfg), tickers=ticker or None,
+                         start=start.date() if start else None, end=end.date() if end else None)
+    if closes.empty:
+        logger.warning("No stored closes to backtest")
+        raise typer.Exit(code=0)
+    results = sweep(closes, fast_windows, slow_windows, full_windows=full_windows, cost_bps=cost_bps)
+    if output:
+        results.to_csv(output, index=False)
+        logger.info("Results written to %s", output)
+    summary = summarize(results)
+    typer.echo(f"Backtested {len(summary)} window pairs over {closes.shape[1]} tickers x {len(closes)} bars "
+               f"in {time.perf_counter() - started:.2f}s")
+    typer.echo(summary.head(top).to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+
+
+@app.command()
+def export(
+    output: str = typer.Option(..., help="Output file (.ndjson, or .arrow/.ipc/.feather for Arrow IPC); '-' is stdout"),
+    dataset: str = typer.Option("metrics", help="'metrics' (daily metric time series) or 'signals'"),
+    fmt: Optional[str] = typer.Option(None, "--format", help="'ndjson' or 'arrow'; inferred from the file suffix by default"),
+    columns: Optional[str] = typer.Option(None, help="Comma-separated columns to export (ticker and date are always included)"),
+    ticker: Optional[List[str]] = typer.Option(None, help="Ticker(s) to export; repeat the option, default all"),
+    start: Optional[datetime] = typer.Option(None, formats=["%Y-%m-%d"], help="First date to export"),
+    end: Optional[datetime] = typer.Option(None, formats=["%Y-%m-%d"], help="Last date to export"),
+    chunk_rows: int = typer.Option(100_000, min=1, help="Rows read and written per chunk"),
+):
+    """
+    Stream stored metrics or signals for many tickers into one NDJSON or
+    Arrow IPC file, chunk by chunk.
+    """
+    cfg = get_config()
+    setup_logging(cfg)
+    from .export import export as export_rows, select_columns
+    from .storage import open_store
+
+    try:
+        cols = select_columns(dataset, [c.strip() for c in columns.split(",") if c.strip()] if columns else None)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    started = time.perf_counter()
+    rows = export_rows(output, open_store(cfg), dataset=dataset, fmt=fmt, chunk_rows=chunk_rows,
+                       columns=cols, tickers=ticker or None,
+                       start=start.date() if start else None, end=end.date() if end else None)
+    if output != "-":
+        typer.echo(f"Exported {rows} rows to {output} in {time.perf_counter() - started:.2f}s")
+
+
+@app.command()
+def serve(
+    tickers: str = typer.Option(..., help="Watchlist file with one ticker per line, or '-' to read stdin"),
+    workers: Optional[int] = typer.Option(None, min=1, help="Concurrent refreshes (default: scheduler.workers)"),
+    health_port: Optional[int] = typer.Option(None, help="Serve health/queue stats as JSON on this local port"),
+    initdb: bool = typer.Option(True, help="Initialize DB tables if needed"),
+    refresh_now: bool = typer.Option(True, help="Refresh every ticker at startup instead of waiting for the next close"),
+    use_cache: Optional[bool] = typer.Option(None, "--cache/--no-cache",
+                                             help="Reuse cached market data within its TTL (default: cache.enabled)"),
+):
+    """
+    Run as a daemon: keep the watchlist refreshed after each exchange
+    session close, reusing one DB engine, fetcher and in-memory price
+    history for every job. Stop with Ctrl-C / SIGTERM.
+    """
+    import signal
+    cfg = _with_cache(get_config(), use_cache)
+    setup_logging(cfg)
+    from .fetch_pool import ConcurrentFetcher
+    from .indicators import required_lookback
+    from .scheduler import DEFAULT_SCHEDULER_SETTINGS, PriceHistory, Scheduler, serve_health
+    from .storage import init_store, open_store
+
+    symbols = read_tickers(tickers)
+    if not symbols:
+        logger.warning("No tickers to watch")
+        raise typer.Exit(code=0)
+    engine = open_store(cfg)
+    if initdb:
+        init_store(engine)
+    indicators = indicator_specs(cfg)
+    section = cfg.get("scheduler", {})
+    history = PriceHistory(required_lookback(indicators),
+                           section.get("history_tickers", DEFAULT_SCHEDULER_SETTINGS["history_tickers"]))
+    fetcher = ConcurrentFetcher.from_config(cfg)
+    options = {"incremental": True, "indicators": indicators,
+               "compact": cfg["data_settings"].get("compact_frames", False),
+               "fundamentals_max_age_days": cfg["data_settings"].get("fundamentals_max_age_days"),
+               "validation": _validation_settings(cfg), "rules": signal_rules(cfg)}
+
+    def job(ticker: str) -> Dict[str, Any]:
+        return analyze_ticker(ticker, engine=engine, fetcher=fetcher, history=history, **options)
+
+    overrides = {"workers": workers} if workers else {}
+    scheduler = Scheduler.from_config(cfg, job, **overrides)
+    for sym in symbols:
+        scheduler.add(sym, due=None if refresh_now else scheduler.next_refresh(sym))
+    server = serve_health(scheduler, health_port) if health_port is not None else None
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: scheduler.stop())
+    try:
+        scheduler.serve_forever()
+    finally:
+        fetcher.close()
+        if server is not None:
+            server.shutdown()
+    typer.echo(json.dumps(scheduler.stats()))
+
+
+@app.command()
+def compact(
+    output: Optional[str] = typer.Option(None, help="Merge all shards into this SQLite file instead of vacuuming them"),
+):
+    """
+    Maintain the SQLite storage: VACUUM/ANALYZE every shard (or the single
+    database file), or with --output merge the shards into one consolidated file.
+    """
+    cfg = get_config()
+    setup_logging(cfg)
+    db_cfg = cfg["database"]
+    if db_cfg.get("backend", "sqlite") != "sqlite":
+        raise typer.BadParameter("compact needs database.backend: sqlite")
+    from .sharding import ShardedStore, vacuum
+
+    start_time = time.perf_counter()
+    shards = int(db_cfg.get("shards") or 1)
+    if shards > 1:
+        result = ShardedStore(db_cfg["path"], shards, db_cfg.get("pragmas", {})).compact(output)
+    elif output:
+        raise typer.BadParameter("--output merges shards; database.shards is not set above 1")
+    else:
+        path = pathlib.Path(db_cfg["path"]).expanduser()
+        before = path.stat().st_size if path.exists() else 0
+        if path.exists():
+            vacuum(path, db_cfg.get("pragmas", {}))
+        result = {"shards": 0, "bytes_before": before, "bytes_after": path.stat().st_size if path.exists() else 0}
+    typer.echo(f"{json.dumps(result)} in {time.perf_counter() - start_time:.2f}s")
+
+
 if __name__ == "__main__":
     app()
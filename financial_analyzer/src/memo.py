@@ -0,0 +1,77 @@
+# src/memo.py
+"""
+Content fingerprints for memoizing per-ticker runs.
+A fingerprint hashes everything a ticker's stored results depend on: the
+fetched (validated) prices, the effective fundamentals (stored quarters
+overlaid with fetched ones, as process_data sees them), the indicator,
+signal-rule, validation and compact-frame settings, and the code version
+(the source of the modules that compute results, plus pandas/NumPy
+versions). When it equals the fingerprint stored with the ticker, processing,
+signal detection and the database rewrite are skipped.
+"""
+from __future__ import annotations
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional
+import hashlib
+import json
+import logging
+import pathlib
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# modules whose code determines the stored metrics and signals
+CODE_MODULES = ("processor.py", "indicators.py", "signals.py", "validation.py")
+PRICE_COLUMNS = ["date", "open", "high", "low", "close", "adj_close", "volume"]
+
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    """Hash of CODE_MODULES' source and the pandas/NumPy versions."""
+    import numpy as np
+    import pandas as pd
+
+    h = hashlib.blake2b(digest_size=16)
+    src = pathlib.Path(__file__).parent
+    for name in CODE_MODULES:
+        h.update(name.encode())
+        h.update((src / name).read_bytes())
+    h.update(f"pandas={pd.__version__};numpy={np.__version__}".encode())
+    return h.hexdigest()
+
+
+def _fundamentals_key(stored: Optional["pd.DataFrame"], fetched: Iterable[dict]) -> list:
+    """Quarters by as_of (fetched ones win, like process_data's last-per-as_of), values as floats."""
+    from .database import FUNDAMENTAL_COLUMNS
+
+    quarters: Dict[str, list] = {}
+    if stored is not None and len(stored):
+        for row in stored[["as_of", *FUNDAMENTAL_COLUMNS]].itertuples(index=False):
+            quarters[row[0].strftime("%Y-%m-%d")] = [None if v != v else float(v) for v in row[1:]]
+    for rec in fetched:
+        as_of = str(rec.get("as_of") or "")[:10]
+        if as_of:
+            quarters[as_of] = [None if rec.get(c) is None else float(rec[c]) for c in FUNDAMENTAL_COLUMNS]
+    return sorted(quarters.items())
+
+
+def fingerprint(
+    prices: "pd.DataFrame",
+    fundamentals: Iterable[dict] = (),
+    stored_fundamentals: Optional["pd.DataFrame"] = None,
+    settings: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Hex digest of a ticker's inputs; equal digests mean identical results."""
+    import pandas as pd
+
+    h = hashlib.blake2b(digest_size=20)
+    h.update(code_version().encode())
+    h.update(json.dumps(settings or {}, sort_keys=True, default=str).encode())
+    cols = [c for c in PRICE_COLUMNS if c in prices.columns]
+    h.update(json.dumps([cols, [str(prices[c].dtype) for c in cols], len(prices)]).encode())
+    if len(prices):
+        h.update(pd.util.hash_pandas_object(prices[cols], index=False).to_numpy().tobytes())
+    h.update(json.dumps(_fundamentals_key(stored_fundamentals, fundamentals)).encode())
+    return h.hexdigest()
@@ -0,0 +1,497 @@
+# src/pipeline.py
+"""
+Pipeline stages for one ticker and a pipelined batch executor.
+
+analyze_ticker runs the stages back to back: fetch (DB lookups, download,
+validation), memo (skip the rest when the inputs' fingerprint matches the
+stored one, see memo.py), process (indicators and signals) and save.
+Pipeline runs the same stages for a whole batch as concurrent stages
+connected by bounded queues:
+
+    tickers -> [fetch threads] -> queue -> [process threads] -> queue -> [writer]
+
+The single writer thread drains processed tickers and persists them in
+large transactions (all metrics of up to `batch_tickers` tickers /
+`batch_rows` rows in one upsert, their signal events in another), so writes
+overlap the next fetches instead of adding to them. Full queues block the
+stage before them, which bounds memory to a few frames per thread plus one
+write batch; stop() lets in-flight tickers drain and flushes everything.
+On a sharded store the writer hands each batch's metrics to one process per
+shard (sharding.bulk_save_daily_metrics), so backfills scale with cores.
+"""
+from __future__ import annotations
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import json
+import logging
+import pathlib
+import queue
+import threading
+import time
+from .instrumentation import StageTimer, frame_bytes
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PIPELINE_SETTINGS: Dict[str, Any] = {
+    "process_workers": 1,
+    "queue_size": 16,
+    "batch_tickers": 64,
+    "batch_rows": 250_000,
+    "shard_writers": True,
+}
+
+_DONE = object()
+
+
+class TickerRun:
+    """One ticker moving through the stages: its timer and what each stage hands on."""
+
+    def __init__(self, ticker: str, timer: Optional[StageTimer] = None):
+        self.ticker = ticker
+        self.timer = timer or StageTimer()
+        self.started = time.perf_counter()
+        self.latest = None
+        self.stored = None
+        self.fresh = False
+        self.raw: Dict[str, Any] = {}
+        self.source = "unknown"
+        self.report = None
+        self.processed = None
+        self.events: List[Dict[str, Any]] = []
+        self.written = 0
+        self.fingerprint: Optional[str] = None
+        self.unchanged = False
+
+
+def fetch_stage(
+    run: TickerRun,
+    engine,
+    incremental: bool = False,
+    indicators: Optional[Dict[str, str]] = None,
+    cache=None,
+    fetcher=None,
+    fundamentals_max_age_days: Optional[float] = 7,
+    history=None,
+    validation: Optional[Dict[str, Any]] = None,
+) -> TickerRun:
+    """Look up what is stored, fetch what is missing and validate the prices."""
+    import pandas as pd
+    from .data_fetcher import fetch_stock_data
+    from .indicators import required_lookback
+    from .processor import lookback_start
+    from .storage import get_latest_date, load_fundamentals
+
+    ticker, timer = run.ticker, run.timer
+    warm = history.get(ticker) if history is not None and incremental else None
+    if warm is not None and len(warm):
+        # everything up to the last cached bar has been processed and saved
+        run.latest = warm["date"].iloc[-1].date()
+        start = run.latest + timedelta(days=1)
+    else:
+        warm = None
+        if incremental:
+            with timer.stage("db_lookup"):
+                run.latest = get_latest_date(ticker, engine)
+        start = lookback_start(run.latest, required_lookback(indicators)) if run.latest is not None else None
+    with timer.stage("fundamentals_lookup") as rec:
+        stored = load_fundamentals(engine, [ticker])
+        rec["rows_out"] = len(stored)
+    run.stored = stored
+    run.fresh = bool(
+        fundamentals_max_age_days is not None and len(stored) > 0
+        and stored["checked_at"].max() >= pd.Timestamp.now("UTC").tz_localize(None) - pd.Timedelta(days=fundamentals_max_age_days)
+    )
+    # once stale, every quarter is re-read: the upsert keeps unchanged ones
+    # and versions restatements, which skipping stored quarters would miss
+    with timer.stage("fetch") as rec:
+        if fetcher is not None:
+            raw = fetcher.fetch(ticker, start=start, fundamentals=not run.fresh)
+        else:
+            raw = fetch_stock_data(ticker, start=start, cache=cache, fundamentals=not run.fresh)
+        rec["rows_out"] = len(raw["prices"])
+        rec["bytes"] = frame_bytes(raw["prices"])
+    if validation is not None:
+        from .validation import validate_prices
+
+        with timer.stage("validate", rows_in=len(raw["prices"])) as rec:
+            prices, run.report = validate_prices(raw["prices"], **validation)
+            raw = {**raw, "prices": prices}
+            rec["rows_out"] = len(prices)
+    if warm is not None:
+        raw = {**raw, "prices": history.extend(ticker, raw["prices"])}
+    run.source = raw.get("source_info", {}).get("used", "unknown")
+    if run.fresh:
+        run.source = stored["source"].iloc[-1] or run.source
+    run.raw = raw
+    return run
+
+
+def memo_settings(
+    indicators: Optional[Dict[str, str]] = None,
+    compact: bool = False,
+    rules=None,
+    validation: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """The settings that shape stored results, with defaults spelled out, for memo.fingerprint."""
+    from .indicators import normalize_specs
+    from .signals import DEFAULT_RULES
+
+    return {"indicators": normalize_specs(indicators), "compact": bool(compact),
+            "rules": dict(rules.specs) if rules is not None else DEFAULT_RULES, "validation": validation}
+
+
+def memo_stage(
+    run: TickerRun,
+    engine,
+    settings: Dict[str, Any],
+    force: bool = False,
+    output: Optional[str] = None,
+    incremental: bool = False,
+) -> bool:
+    """
+    Fingerprint the fetched inputs; True (run.unchanged) when they match the
+    fingerprint stored by the ticker's last run, so nothing needs redoing.
+    A missing `output` file counts as a result still to produce.
+    `force` always recomputes (the new fingerprint is still stored).
+    Incremental runs fetch only the new bars, whose fingerprint says nothing
+    about the stored results: they always process and keep the stored one.
+    """
+    from .memo import fingerprint
+    from .storage import get_fingerprint
+
+    if incremental:
+        run.fingerprint, run.unchanged = None, False
+        return False
+    with run.timer.stage("fingerprint", rows_in=len(run.raw["prices"])):
+        run.fingerprint = fingerprint(run.raw["prices"], run.raw["fundamentals"], run.stored, settings)
+        run.unchanged = (not force and run.fingerprint == get_fingerprint(run.ticker, engine)
+                         and (output is None or pathlib.Path(output).exists()))
+    if run.unchanged:
+        logger.info("Inputs of %s unchanged since its last run: skipping processing and save", run.ticker)
+    return run.unchanged
+
+
+def save_fundamentals_stage(run: TickerRun, engine) -> int:
+    """Upsert the fetched quarters (nothing when stored ones were fresh enough)."""
+    from .storage import save_fundamentals
+
+    if run.fresh:
+        return 0
+    with run.timer.stage("fundamentals_save") as rec:
+        rec["db_rows"] = save_fundamentals(run.ticker, run.raw["fundamentals"], engine, source=run.source)
+    return rec["db_rows"]
+
+
+def process_stage(
+    run: TickerRun,
+    indicators: Optional[Dict[str, str]] = None,
+    compact: bool = False,
+    rules=None,
+) -> TickerRun:
+    """Compute indicators and signal events; incremental runs keep only new bars."""
+    import pandas as pd
+    from .database import FUNDAMENTAL_COLUMNS
+    from .processor import process_data
+    from .signals import RuleSet
+
+    ticker, timer, raw, stored = run.ticker, run.timer, run.raw, run.stored
+    if stored is not None and len(stored):
+        # stored quarters first: process_data keeps the last row per as_of
+        old = stored[["as_of", *FUNDAMENTAL_COLUMNS]].assign(as_of=stored["as_of"].dt.strftime("%Y-%m-%d"))
+        raw = {**raw, "fundamentals": old.to_dict("records") + list(raw["fundamentals"])}
+    with timer.stage("process", rows_in=len(raw["prices"])) as rec:
+        processed = process_data(raw, indicators=indicators, compact_frame=compact)
+        # process_data returns a fresh frame: make dates naive in place, once
+        if processed["date"].dt.tz is not None:
+            processed["date"] = processed["date"].dt.tz_localize(None)
+        rec["rows_out"] = len(processed)
+    logger.info("Detecting signals for %s...", ticker)
+    with timer.stage("signals", rows_in=len(processed)) as rec:
+        events = (rules or RuleSet()).events(processed, by=None)
+        rec["rows_out"] = len(events)
+
+    latest = run.latest
+    if latest is not None:
+        # keep only bars (and signals) after what is already stored
+        processed = processed[processed["date"] >= pd.Timestamp(latest) + pd.Timedelta(days=1)]
+        events = [e for e in events if e["date"][:10] > latest.isoformat()]
+        logger.info("Incremental refresh for %s: %d new rows after %s", ticker, len(processed), latest)
+    counts: Dict[str, int] = {}
+    for e in events:
+        counts[e["signal_type"]] = counts.get(e["signal_type"], 0) + 1
+    logger.info("Signals detected for %s: %s", ticker, ", ".join(f"{n} {k}" for k, n in counts.items()) or "none")
+    run.processed, run.events = processed, events
+    return run
+
+
+def save_stage(run: TickerRun, engine) -> int:
+    """Upsert the processed rows and signal events of one ticker, then its fingerprint."""
+    from .storage import save_daily_metrics, save_fingerprints, save_signal_events
+
+    with run.timer.stage("save", rows_in=len(run.processed) + len(run.events)) as rec:
+        written = 0
+        if len(run.processed):
+            written += save_daily_metrics(run.processed, engine)
+        written += save_signal_events(run.ticker, run.events, engine)
+        rec["db_rows"] = written
+        # only after the results are stored: a failed save is redone next run
+        if run.fingerprint is not None:
+            save_fingerprints({run.ticker: run.fingerprint}, engine)
+    run.written = written
+    return written
+
+
+def payload(run: TickerRun, incremental: bool = False, output: Optional[str] = None) -> Dict[str, Any]:
+    """
+    The JSON summary of a finished run; written to `output` when given,
+    except for unchanged runs, which keep the file of the run they match.
+    """
+    from .database import utc_now
+
+    out = {
+        "ticker": run.ticker,
+        "generated_at": utc_now().isoformat(),
+        "price_rows_count": _rows(run),
+        "fundamentals_used": run.source,
+        "signals": run.events,
+        "timings": run.timer.as_dict(),
+    }
+    if run.unchanged:
+        out["unchanged"] = True
+    if run.report is not None and not run.report.ok:
+        out["validation"] = run.report.to_dict()
+    if incremental:
+        out["incremental_since"] = run.latest.isoformat() if run.latest is not None else None
+    if output and not run.unchanged:
+        with open(output, "w", encoding="utf8") as f:
+            json.dump(out, f, indent=2)
+    return out
+
+
+class Pipeline:
+    """
+    Pipelined batch executor over one store (engine, ShardedStore or
+    ParquetStore). `options` are the analyze_ticker keywords (incremental,
+    indicators, compact, fundamentals_max_age_days, validation, rules, force).
+    run() returns one result per ticker in the shape of main._batch_job's;
+    `writer_timer` records the writer's batched "write" stage.
+    """
+
+    def __init__(
+        self,
+        engine,
+        fetcher=None,
+        cache=None,
+        fetch_workers: int = 4,
+        process_workers: int = DEFAULT_PIPELINE_SETTINGS["process_workers"],
+        queue_size: int = DEFAULT_PIPELINE_SETTINGS["queue_size"],
+        batch_tickers: int = DEFAULT_PIPELINE_SETTINGS["batch_tickers"],
+        batch_rows: int = DEFAULT_PIPELINE_SETTINGS["batch_rows"],
+        shard_writers: bool = DEFAULT_PIPELINE_SETTINGS["shard_writers"],
+        output_dir: Optional[str] = None,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+        **options: Any,
+    ):
+        self.engine = engine
+        self.fetcher = fetcher
+        self.cache = cache
+        self.fetch_workers = max(1, fetch_workers)
+        self.process_workers = max(1, process_workers)
+        self.batch_tickers = max(1, batch_tickers)
+        self.batch_rows = max(1, batch_rows)
+        self.shard_writers = shard_writers
+        self.output_dir = output_dir
+        self.on_result = on_result
+        self.options = options
+        self.memo = memo_settings(options.get("indicators"), options.get("compact", False),
+                                  options.get("rules"), options.get("validation"))
+        self.writer_timer = StageTimer()
+        self._tickers: "queue.Queue[str]" = queue.Queue()
+        self._to_process: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+        self._to_write: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.results: List[Dict[str, Any]] = []
+        self._shard_pool = None
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any], engine, **kwargs) -> "Pipeline":
+        """Build from the `pipeline` section of config.yaml; kwargs win."""
+        section = cfg.get("pipeline") or {}
+        settings = {k: section.get(k, v) for k, v in DEFAULT_PIPELINE_SETTINGS.items()}
+        return cls(engine, **{**settings, **kwargs})
+
+    def stop(self):
+        """Take no new tickers; those already fetched are still processed and written."""
+        self._stop.set()
+
+    # -- stages -------------------------------------------------------------
+    def _finish(self, run: TickerRun, error: Optional[str] = None):
+        seconds = time.perf_counter() - run.started
+        if error is not None:
+            result = {"ticker": run.ticker, "ok": False, "error": error, "seconds": seconds}
+        else:
+            result = {"ticker": run.ticker, "ok": True, "rows": _rows(run), "signals": len(run.events),
+                      "seconds": seconds, "timings": run.timer.as_dict(), "unchanged": run.unchanged}
+        with self._lock:
+            self.results.append(result)
+        if self.on_result is not None:
+            self.on_result(result)
+
+    def _fetch_loop(self):
+        opts = self.options
+        while not self._stop.is_set():
+            try:
+                ticker = self._tickers.get_nowait()
+            except queue.Empty:
+                return
+            run = TickerRun(ticker)
+            try:
+                fetch_stage(run, self.engine, incremental=opts.get("incremental", False),
+                            indicators=opts.get("indicators"), cache=self.cache, fetcher=self.fetcher,
+                            fundamentals_max_age_days=opts.get("fundamentals_max_age_days", 7),
+                            validation=opts.get("validation"))
+                memo_stage(run, self.engine, self.memo, force=opts.get("force", False), output=self._output(ticker),
+                           incremental=opts.get("incremental", False))
+            except Exception as e:
+                logger.exception("Fetch failed for %s", ticker)
+                self._finish(run, f"{type(e).__name__}: {e}")
+                continue
+            self._to_process.put(run)  # blocks while processing is behind
+
+    def _process_loop(self):
+        opts = self.options
+        while True:
+            run = self._to_process.get()
+            if run is _DONE:
+                return
+            try:
+                if not run.unchanged:
+                    process_stage(run, indicators=opts.get("indicators"), compact=opts.get("compact", False),
+                                  rules=opts.get("rules"))
+            except Exception as e:
+                logger.exception("Processing failed for %s", run.ticker)
+                self._finish(run, f"{type(e).__name__}: {e}")
+                continue
+            # the raw download is no longer needed; keep queued items small
+            run.raw = {"fundamentals": run.raw.get("fundamentals", [])}
+            run.stored = None
+            self._to_write.put(run)  # blocks while the writer is behind
+
+    def _drain(self):
+        done = False
+        while not done:
+            item = self._to_write.get()
+            if item is _DONE:
+                return
+            batch, rows = [item], _rows(item)
+            # take whatever else is already waiting, up to the batch limits
+            while len(batch) < self.batch_tickers and rows < self.batch_rows:
+                try:
+                    item = self._to_write.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    done = True
+                    break
+                batch.append(item)
+                rows += _rows(item)
+            self._flush(batch)
+
+    def _flush(self, batch: List[TickerRun]):
+        import pandas as pd
+        from .storage import save_fingerprints, save_signal_events
+
+        frames = [r.processed for r in batch if _rows(r)]
+        events = [{"ticker": r.ticker, **e} for r in batch for e in r.events]
+        try:
+            with self.writer_timer.stage("write", rows_in=sum(len(f) for f in frames) + len(events)) as rec:
+                written = sum(save_fundamentals_stage(r, self.engine) for r in batch)
+                if frames:
+                    written += self._save_metrics(pd.concat(frames, ignore_index=True))
+                written += save_signal_events(None, events, self.engine)
+                rec["db_rows"] = written
+                save_fingerprints({r.ticker: r.fingerprint for r in batch if r.fingerprint and not r.unchanged},
+                                  self.engine)
+        except Exception as e:
+            logger.exception("Write failed for %d tickers", len(batch))
+            for r in batch:
+                self._finish(r, f"{type(e).__name__}: {e}")
+            return
+        logger.debug("Wrote %d tickers (%d rows) in one batch", len(batch), written)
+        for r in batch:
+            r.written = _rows(r) + len(r.events)
+            if self.output_dir:
+                payload(r, self.options.get("incremental", False), self._output(r.ticker))
+            self._finish(r)
+
+    def _output(self, ticker: str) -> Optional[str]:
+        if not self.output_dir:
+            return None
+        return str(pathlib.Path(self.output_dir) / f"{ticker.lower()}_analysis.json")
+
+    def _save_metrics(self, df) -> int:
+        from .storage import save_daily_metrics
+
+        if self._shard_pool is not None:
+            from .sharding import bulk_save_daily_metrics
+            return bulk_save_daily_metrics(df, self.engine, pool=self._shard_pool)
+        return save_daily_metrics(df, self.engine)
+
+    def _start_shard_pool(self):
+        from .sharding import ShardedStore
+
+        if self.shard_writers and isinstance(self.engine, ShardedStore):
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # workers start on first submit, from the writer thread: forking a
+            # process that runs other threads is unsafe, so spawn them instead
+            self._shard_pool = ProcessPoolExecutor(max_workers=self.engine.shards,
+                                                   mp_context=multiprocessing.get_context("spawn"))
+
+    def run(self, tickers: Iterable[str]) -> List[Dict[str, Any]]:
+        """Push every ticker through the stages; returns when all results are written."""
+        self._start_shard_pool()
+        try:
+            return self._run(tickers)
+        finally:
+            if self._shard_pool is not None:
+                self._shard_pool.shutdown()
+                self._shard_pool = None
+
+    def _run(self, tickers: Iterable[str]) -> List[Dict[str, Any]]:
+        for t in dict.fromkeys(tickers):
+            self._tickers.put(t)
+        fetchers = [threading.Thread(target=self._fetch_loop, name=f"fetch-{i}", daemon=True)
+                    for i in range(self.fetch_workers)]
+        processors = [threading.Thread(target=self._process_loop, name=f"process-{i}", daemon=True)
+                      for i in range(self.process_workers)]
+        writer = threading.Thread(target=self._drain, name="writer", daemon=True)
+        for t in fetchers + processors + [writer]:
+            t.start()
+        try:
+            for t in fetchers:
+                _join(t)
+        except KeyboardInterrupt:
+            logger.warning("Interrupted: flushing tickers already fetched")
+            self.stop()
+            for t in fetchers:
+                _join(t)
+        # shut down in stage order, so every queued item is drained first
+        for _ in processors:
+            self._to_process.put(_DONE)
+        for t in processors:
+            _join(t)
+        self._to_write.put(_DONE)
+        _join(writer)
+        return self.results
+
+
+def _rows(run: TickerRun) -> int:
+    return 0 if run.processed is None else int(len(run.processed))
+
+
+def _join(thread: threading.Thread):
+    # join in slices so Ctrl-C reaches the main thread
+    while thread.is_alive():
+        thread.join(0.2)
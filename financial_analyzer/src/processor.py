@@ -6,32 +6,104 @@ Key things:
   - Compute 50/200-day SMA.
   - Compute 52-week high and % below high.
   - Compute BVPS, P/B, simple EV.
+Indicators come from the registry in indicators.py and are all computed
+as column kernels in one pass after the fundamentals merge.
 """
 from __future__ import annotations
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, Optional, Tuple
 import pandas as pd
 import numpy as np
 import logging
 from decimal import Decimal
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from .indicators import DEFAULT_INDICATORS, IndicatorSpecs, compute_indicators, normalize_specs, required_lookback
+from .instrumentation import stage
+from .database import FUNDAMENTAL_COLUMNS, utc_now
 
 logger = logging.getLogger(__name__)
 
+# Longest window among the default indicators (52-week high); incremental
+# refreshes must re-fetch at least this many bars before the first new one.
+LOOKBACK_BARS = required_lookback(DEFAULT_INDICATORS)
 
-def process_data(raw_data: Dict[str, Any]) -> pd.DataFrame:
+
+# Column order of processed frames (extra indicators go before generated_at)
+OUTPUT_COLUMNS = [
+    "ticker",
+    "date",
+    "open",
+    "high",
+    "low",
+    "close",
+    "adj_close",
+    "volume",
+    "sma50",
+    "sma200",
+    "52w_high",
+    "pct_from_52w_high",
+    "bvps",
+    "price_to_book",
+    "enterprise_value",
+    *FUNDAMENTAL_COLUMNS,
+]
+
+
+# Columns kept in float64 by compact(): none today, float32 carries ~7
+# significant digits, enough for prices, ratios and balance-sheet totals.
+COMPACT_FLOAT_DTYPE = "float32"
+
+
+def compact(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compact representation of a processed frame, converted in place:
+    categorical ticker, float32 floats, nullable Int64 volume, and the
+    per-row `generated_at` constant moved to df.attrs (with the ticker
+    list). Returns df for chaining.
+    """
+    if "ticker" in df.columns:
+        if not isinstance(df["ticker"].dtype, pd.CategoricalDtype):
+            df["ticker"] = df["ticker"].astype("category")
+        df.attrs["tickers"] = [str(t) for t in df["ticker"].cat.categories]
+    if "generated_at" in df.columns:
+        df.attrs["generated_at"] = df["generated_at"].iat[0] if len(df) else utc_now().isoformat()
+        del df["generated_at"]
+    if "volume" in df.columns:
+        df["volume"] = df["volume"].round().astype("Int64")
+    floats = [c for c in df.columns if df[c].dtype.kind == "f" and df[c].dtype != COMPACT_FLOAT_DTYPE]
+    if floats:
+        df[floats] = df[floats].astype(COMPACT_FLOAT_DTYPE)
+    return df
+
+
+def lookback_start(latest: date, bars: int = LOOKBACK_BARS) -> date:
+    """
+    Calendar date far enough before `latest` to cover `bars` trading days
+    (5 sessions a week plus a margin for exchange holidays).
+    """
+    return latest - timedelta(days=int(bars * 7 / 5) + 21)
+
+
+def process_data(
+    raw_data: Dict[str, Any],
+    indicators: Optional[IndicatorSpecs] = None,
+    compact_frame: bool = False,
+) -> pd.DataFrame:
     """
     Given the raw_data from fetch_stock_data, return a DataFrame with metrics.
     The returned DataFrame has a 'date' column (datetime) and index is default.
+    `indicators` selects the registry indicators to compute ({column: spec} or
+    a list of specs); defaults to DEFAULT_INDICATORS. With `compact_frame`
+    the result goes through compact() (indicators are still computed in float64).
     """
     ticker = raw_data["ticker"]
-    prices_df: pd.DataFrame = raw_data["prices"].copy()
+    prices_df: pd.DataFrame = raw_data["prices"]
     fundamentals = raw_data.get("fundamentals", [])
 
     # Ensure date column and datetimes
     if "date" not in prices_df.columns:
         raise ValueError("prices must contain 'date' column")
-    prices_df["date"] = pd.to_datetime(prices_df["date"])
-    prices_df = prices_df.sort_values("date").reset_index(drop=True)
+    # the sort makes the one private copy we then mutate; raw_data is untouched
+    prices_df = prices_df.assign(date=pd.to_datetime(prices_df["date"])).sort_values("date", ignore_index=True)
 
     # Standardize price column names: lower-case we already did in fetcher
     for col in ("open", "high", "low", "close", "adj_close", "volume"):
@@ -42,14 +114,6 @@ def process_data(raw_data: Dict[str, Any]) -> pd.DataFrame:
             else:
                 prices_df[col] = np.nan
 
-    # Compute SMAs (rolling). Use min_periods to avoid early values
-    prices_df["sma50"] = prices_df["close"].rolling(window=50, min_periods=1).mean()
-    prices_df["sma200"] = prices_df["close"].rolling(window=200, min_periods=1).mean()
-
-    # 52-week (approx 252 trading days) high and percent from high
-    prices_df["52w_high"] = prices_df["close"].rolling(window=252, min_periods=1).max()
-    prices_df["pct_from_52w_high"] = (prices_df["close"] / prices_df["52w_high"] - 1.0) * 100.0
-
     # Create fundamentals DataFrame (quarterly snapshots)
     if fundamentals:
         fdf = pd.DataFrame(fundamentals)
@@ -61,80 +125,124 @@ def process_data(raw_data: Dict[str, Any]) -> pd.DataFrame:
                 fdf[col] = pd.to_numeric(fdf[col], errors="coerce")
         # forward-fill: expand quarterly snapshots to daily by merging with nearest prior as_of
         fdf = fdf.sort_values("as_of").drop_duplicates("as_of", keep="last")
-        # merge_asof requires both frames sorted by date
-        merge_left = prices_df[["date"]].copy().sort_values("date")
+        # merge_asof requires both frames sorted by date (prices_df already is)
+        merge_left = prices_df[["date"]]
         fdf_for_merge = fdf[["as_of", "total_stockholder_equity", "total_debt", "cash_and_cash_equivalents", "shares_outstanding", "market_cap"]].rename(columns={"as_of": "as_of_date"})
         fdf_for_merge = fdf_for_merge.rename(columns={"as_of_date": "as_of"})
         fdf_for_merge = fdf_for_merge.sort_values("as_of")
         # pd.merge_asof expects columns named appropriately
-        merge_left["date"] = merge_left["date"].dt.tz_convert("America/New_York")
+        merge_left = merge_left.assign(date=merge_left["date"].dt.tz_convert("America/New_York"))
         fdf_for_merge["as_of"] = pd.to_datetime(fdf_for_merge["as_of"]).dt.tz_localize("America/New_York")
 
-        merged = pd.merge_asof(
-            merge_left,
-            fdf_for_merge.rename(columns={"as_of": "date"}),
-            on="date",
-            direction="backward"
-        )
-
-        # merged now aligned to daily dates; join back numeric fields
-        prices_df = prices_df.merge(merged, on="date", how="left")
-        # forward-fill remaining fundamental values
-        prices_df[["total_stockholder_equity", "total_debt", "cash_and_cash_equivalents", "shares_outstanding", "market_cap"]] = prices_df[
-            ["total_stockholder_equity", "total_debt", "cash_and_cash_equivalents", "shares_outstanding", "market_cap"]
-        ].ffill()
+        with stage("process.merge_asof", rows_in=len(merge_left)) as rec:
+            merged = pd.merge_asof(
+                merge_left,
+                fdf_for_merge.rename(columns={"as_of": "date"}),
+                on="date",
+                direction="backward"
+            )
+            rec["rows_out"] = len(merged)
+
+        # merged is row-aligned with prices_df (merge_asof keeps left order);
+        # attach the fields positionally and forward-fill remaining gaps
+        prices_df[FUNDAMENTAL_COLUMNS] = merged[FUNDAMENTAL_COLUMNS].ffill().to_numpy()
     else:
         # no fundamentals; create columns with NaN
         for col in ["total_stockholder_equity", "total_debt", "cash_and_cash_equivalents", "shares_outstanding", "market_cap"]:
             prices_df[col] = np.nan
 
-    # Fundamental ratios:
-    # Book Value per Share (BVPS) = total_stockholder_equity / shares_outstanding
-    prices_df["bvps"] = prices_df.apply(
-        lambda row: (row["total_stockholder_equity"] / row["shares_outstanding"]) if pd.notna(row["total_stockholder_equity"]) and pd.notna(row["shares_outstanding"]) and row["shares_outstanding"] != 0 else np.nan,
-        axis=1,
-    )
-    # Price-to-Book = close / bvps
-    prices_df["price_to_book"] = prices_df.apply(
-        lambda r: (r["close"] / r["bvps"]) if pd.notna(r["bvps"]) and r["bvps"] != 0 else np.nan, axis=1
-    )
-
-    # Enterprise Value (simplified): market_cap + total_debt - cash
-    prices_df["enterprise_value"] = prices_df.apply(
-        lambda r: r["market_cap"] + r.get("total_debt", 0) - r.get("cash_and_cash_equivalents", 0)
-        if pd.notna(r.get("market_cap")) else np.nan,
-        axis=1,
-    )
+    # Indicators (SMAs, 52-week high, ratios, ...) as vectorized column kernels
+    specs = normalize_specs(indicators)
+    with stage("process.indicators", rows_in=len(prices_df)):
+        prices_df = compute_indicators(prices_df, specs)
 
     # Add ticker
     prices_df["ticker"] = ticker
     prices_df["generated_at"] = datetime.utcnow().isoformat()
 
     # final cleanup: keep a subset of useful columns
-    keep_cols = [
-        "ticker",
-        "date",
-        "open",
-        "high",
-        "low",
-        "close",
-        "adj_close",
-        "volume",
-        "sma50",
-        "sma200",
-        "52w_high",
-        "pct_from_52w_high",
-        "bvps",
-        "price_to_book",
-        "enterprise_value",
-        "total_stockholder_equity",
-        "total_debt",
-        "cash_and_cash_equivalents",
-        "shares_outstanding",
-        "market_cap",
-        "generated_at",
-    ]
-    # Some columns may be missing; select intersection
+    keep_cols = list(OUTPUT_COLUMNS)
+    keep_cols += [c for c in specs if c not in keep_cols]
+    keep_cols.append("generated_at")
+    # Some columns may be missing; select intersection (already a new frame)
     keep_cols = [c for c in keep_cols if c in prices_df.columns]
-    out = prices_df[keep_cols].copy()
-    return out
+    out = prices_df[keep_cols]
+    return compact(out) if compact_frame else out
+
+
+def _naive_dates(s: pd.Series) -> pd.Series:
+    """Datetimes as tz-naive local wall-clock times (exchange-local dates)."""
+    if not pd.api.types.is_datetime64_any_dtype(s):
+        s = pd.to_datetime(s)
+    return s.dt.tz_localize(None) if s.dt.tz is not None else s
+
+
+def build_panel(raws: Iterable[Dict[str, Any]]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Stack fetch_stock_data results into long (ticker, date) prices and
+    (ticker, as_of) fundamentals frames for process_panel. Dates are made
+    tz-naive per ticker first, so mixed exchanges concatenate cleanly.
+    """
+    price_frames, fund_frames = [], []
+    for raw in raws:
+        p = raw["prices"]
+        price_frames.append(p.assign(ticker=raw["ticker"], date=_naive_dates(p["date"])))
+        if raw.get("fundamentals"):
+            fund_frames.append(pd.DataFrame(raw["fundamentals"]).assign(ticker=raw["ticker"]))
+    prices = pd.concat(price_frames, ignore_index=True) if price_frames else pd.DataFrame(columns=["ticker", "date"])
+    fundamentals = pd.concat(fund_frames, ignore_index=True) if fund_frames else pd.DataFrame(columns=["ticker", "as_of"])
+    return prices, fundamentals
+
+
+def process_panel(
+    prices: pd.DataFrame,
+    fundamentals: Optional[pd.DataFrame] = None,
+    indicators: Optional[IndicatorSpecs] = None,
+    compact_frame: bool = False,
+) -> pd.DataFrame:
+    """
+    Panel version of process_data for many tickers at once.
+    `prices` is a long frame with 'ticker', 'date' and OHLCV columns and
+    `fundamentals` a long frame with 'ticker', 'as_of' and the fundamental
+    fields. Rolling windows are grouped by ticker and fundamentals are aligned
+    with a single merge_asof(by="ticker"), so the cost is a handful of
+    vectorized passes instead of one process_data call per ticker.
+    Dates are treated as tz-naive exchange-local dates. Returns one frame
+    sorted by (ticker, date) with process_data's columns, ready for
+    save_daily_metrics.
+    """
+    if "ticker" not in prices.columns or "date" not in prices.columns:
+        raise ValueError("prices must contain 'ticker' and 'date' columns")
+    df = prices.assign(date=_naive_dates(prices["date"]))
+    df = df.sort_values(["ticker", "date"], kind="stable").reset_index(drop=True)
+    for col in ("open", "high", "low", "close", "adj_close", "volume"):
+        if col not in df.columns:
+            df[col] = np.nan
+
+    if fundamentals is not None and len(fundamentals):
+        fdf = fundamentals.assign(as_of=_naive_dates(pd.to_datetime(fundamentals["as_of"], errors="coerce")))
+        fdf = fdf.reindex(columns=["ticker", "as_of", *FUNDAMENTAL_COLUMNS])
+        fdf[FUNDAMENTAL_COLUMNS] = fdf[FUNDAMENTAL_COLUMNS].apply(pd.to_numeric, errors="coerce")
+        fdf = fdf.dropna(subset=["as_of"]).sort_values("as_of", kind="stable")
+        fdf = fdf.drop_duplicates(["ticker", "as_of"], keep="last")
+
+        # merge_asof needs the left side sorted by date across all tickers
+        left = df[["ticker", "date"]].assign(_row=np.arange(len(df))).sort_values("date", kind="stable")
+        merged = pd.merge_asof(left, fdf, left_on="date", right_on="as_of", by="ticker", direction="backward")
+        merged = merged.sort_values("_row")
+        fields = merged[FUNDAMENTAL_COLUMNS].set_axis(df.index)
+        # forward-fill fields missing from the latest snapshot, within each ticker
+        df[FUNDAMENTAL_COLUMNS] = fields.groupby(df["ticker"], sort=False).ffill()
+    else:
+        for col in FUNDAMENTAL_COLUMNS:
+            df[col] = np.nan
+
+    specs = normalize_specs(indicators)
+    df = compute_indicators(df, specs, by="ticker")
+    df["generated_at"] = utc_now().isoformat()
+
+    keep_cols = list(OUTPUT_COLUMNS)
+    keep_cols += [c for c in specs if c not in keep_cols]
+    keep_cols.append("generated_at")
+    out = df[[c for c in keep_cols if c in df.columns]]
+    return compact(out) if compact_frame else out
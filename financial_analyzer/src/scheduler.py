@@ -0,0 +1,393 @@
+# src/scheduler.py
+"""
+Long-running refresh scheduler behind the `serve` command.
+A Scheduler holds the watchlist and plans one refresh per ticker after the
+close of its exchange session (`.NS`/`.BO` on the NSE, everything else on
+US hours), optionally also every few minutes while the session is open.
+Due refreshes move from a timer heap into a priority queue and are handed
+to a bounded worker pool; on-demand requests jump the queue and failures
+are retried with backoff. The clock is injectable (FakeClock in tests) and
+the work itself is any `job(ticker)` callable, so the daemon is testable
+with a stub fetcher and no real time passing.
+
+PriceHistory keeps the tail of each ticker's fetched prices in memory, so
+with a warm history analyze_ticker only asks for bars after the last one
+it has already seen.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, time as dtime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# queue priorities: lower runs first among due jobs
+URGENT, RETRY, SCHEDULED = 0, 1, 2
+
+DEFAULT_SCHEDULER_SETTINGS: Dict[str, Any] = {
+    "workers": 4,
+    "refresh_delay_minutes": 20,
+    "intraday_interval_minutes": None,
+    "retry_delay_seconds": 60,
+    "retry_delay_cap_seconds": 3600,
+    "history_tickers": 5000,
+}
+
+
+class Session:
+    """Regular trading hours of one exchange, in its local time zone (weekdays, no holiday calendar)."""
+
+    def __init__(self, name: str, tz: str, open: str, close: str, suffixes: Iterable[str] = ()):
+        self.name = name
+        self.tz = ZoneInfo(tz)
+        self.open = dtime.fromisoformat(open)
+        self.close = dtime.fromisoformat(close)
+        self.suffixes = tuple(s.upper() for s in suffixes)
+
+    def _local(self, day, at: dtime) -> datetime:
+        return datetime.combine(day, at, tzinfo=self.tz)
+
+    def is_open(self, now: datetime) -> bool:
+        local = now.astimezone(self.tz)
+        return local.weekday() < 5 and self.open <= local.time() < self.close
+
+    def next_close(self, now: datetime, delay: timedelta = timedelta(0)) -> datetime:
+        """First weekday close (+ delay) strictly after `now`, in UTC."""
+        day = now.astimezone(self.tz).date()
+        while True:
+            at = self._local(day, self.close) + delay
+            if day.weekday() < 5 and at > now:
+                return at.astimezone(timezone.utc)
+            day += timedelta(days=1)
+
+
+DEFAULT_SESSIONS: Dict[str, Session] = {
+    "NSE": Session("NSE", "Asia/Kolkata", "09:15", "15:30", suffixes=(".NS", ".BO")),
+    "US": Session("US", "America/New_York", "09:30", "16:00"),
+}
+
+
+def sessions_from_config(cfg: Optional[Dict[str, Any]]) -> Dict[str, Session]:
+    """DEFAULT_SESSIONS overridden/extended by `scheduler.sessions` ({name: {tz, open, close, suffixes}})."""
+    sessions = dict(DEFAULT_SESSIONS)
+    for name, spec in (cfg or {}).items():
+        sessions[name] = Session(name, spec["tz"], spec["open"], spec["close"], spec.get("suffixes", ()))
+    return sessions
+
+
+def session_for(ticker: str, sessions: Dict[str, Session], default: str = "US") -> Session:
+    """Session whose suffix matches the ticker (e.g. '.NS'), else the default one."""
+    upper = ticker.upper()
+    for session in sessions.values():
+        if session.suffixes and upper.endswith(session.suffixes):
+            return session
+    return sessions[default]
+
+
+class SystemClock:
+    def now(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+    def wait(self, event: threading.Event, seconds: float) -> bool:
+        return event.wait(max(0.0, seconds))
+
+
+class FakeClock:
+    """Manually advanced clock; wait() jumps time forward instead of sleeping."""
+
+    def __init__(self, start: datetime):
+        self._now = start.astimezone(timezone.utc)
+        self._lock = threading.Lock()
+
+    def now(self) -> datetime:
+        with self._lock:
+            return self._now
+
+    def advance(self, seconds: float = 0.0, **delta):
+        with self._lock:
+            self._now += timedelta(seconds=seconds, **delta)
+
+    def wait(self, event: threading.Event, seconds: float) -> bool:
+        if not event.is_set():
+            self.advance(max(0.0, seconds))
+        return event.is_set()
+
+
+class PriceHistory:
+    """
+    Thread-safe LRU of recent raw price frames (fetch_prices shape, 'date'
+    column), each trimmed to the last `keep_bars` rows.
+    """
+
+    def __init__(self, keep_bars: int, max_tickers: int = DEFAULT_SCHEDULER_SETTINGS["history_tickers"]):
+        self.keep_bars = keep_bars
+        self.max_tickers = max_tickers
+        self._frames: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def get(self, ticker: str):
+        with self._lock:
+            frame = self._frames.get(ticker)
+            if frame is not None:
+                self._frames.move_to_end(ticker)
+            return frame
+
+    def extend(self, ticker: str, prices):
+        """Cached bars followed by the newer `prices` (later rows win on equal dates)."""
+        import pandas as pd
+
+        cached = self.get(ticker)
+        if cached is None or len(prices) == 0:
+            return prices if cached is None else cached
+        merged = pd.concat([cached, prices], ignore_index=True)
+        return merged.drop_duplicates("date", keep="last").reset_index(drop=True)
+
+    def put(self, ticker: str, prices):
+        frame = prices.iloc[-self.keep_bars:].reset_index(drop=True)
+        with self._lock:
+            self._frames[ticker] = frame
+            self._frames.move_to_end(ticker)
+            while len(self._frames) > self.max_tickers:
+                self._frames.popitem(last=False)
+
+
+class Scheduler:
+    """
+    Plans and dispatches refreshes for a watchlist.
+
+    Drive it with serve_forever() in the daemon, or call tick() by hand with
+    a FakeClock in tests. `job(ticker)` does the work (e.g. analyze_ticker
+    with a shared engine/fetcher) and may return a dict; exceptions count
+    as failures and are retried after `retry_delay_seconds`, doubling up to
+    `retry_delay_cap_seconds`.
+    """
+
+    def __init__(
+        self,
+        job: Callable[[str], Any],
+        tickers: Iterable[str] = (),
+        workers: int = DEFAULT_SCHEDULER_SETTINGS["workers"],
+        clock=None,
+        sessions: Optional[Dict[str, Session]] = None,
+        refresh_delay_minutes: float = DEFAULT_SCHEDULER_SETTINGS["refresh_delay_minutes"],
+        intraday_interval_minutes: Optional[float] = DEFAULT_SCHEDULER_SETTINGS["intraday_interval_minutes"],
+        retry_delay_seconds: float = DEFAULT_SCHEDULER_SETTINGS["retry_delay_seconds"],
+        retry_delay_cap_seconds: float = DEFAULT_SCHEDULER_SETTINGS["retry_delay_cap_seconds"],
+    ):
+        self.job = job
+        self.workers = workers
+        self.clock = clock or SystemClock()
+        self.sessions = sessions or DEFAULT_SESSIONS
+        self.refresh_delay = timedelta(minutes=refresh_delay_minutes)
+        self.intraday_interval = timedelta(minutes=intraday_interval_minutes) if intraday_interval_minutes else None
+        self.retry_delay = (retry_delay_seconds, retry_delay_cap_seconds)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="refresh")
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._idle = threading.Condition(self._lock)
+        self._seq = itertools.count()
+        # timer heap (due, priority, seq, ticker) -> ready heap (priority, due, seq, ticker);
+        # _pending[ticker] is the seq of the live entry, older ones are skipped
+        self._timers: List[Tuple[datetime, int, int, str]] = []
+        self._ready: List[Tuple[int, datetime, int, str]] = []
+        self._pending: Dict[str, int] = {}
+        self._next_due: Dict[str, datetime] = {}
+        self._running: Dict[str, datetime] = {}
+        self._failures: Dict[str, int] = {}
+        self.watchlist: Dict[str, Session] = {}
+        self.started_at = self.clock.now()
+        self.counters = {"completed": 0, "failed": 0, "busy_s": 0.0}
+        self.last_error: Optional[Dict[str, str]] = None
+        for t in tickers:
+            self.add(t)
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any], job: Callable[[str], Any], tickers: Iterable[str] = (), **kwargs) -> "Scheduler":
+        """Build from the `scheduler` section of config.yaml; kwargs win."""
+        section = cfg.get("scheduler", {})
+        settings = {k: section.get(k, v) for k, v in DEFAULT_SCHEDULER_SETTINGS.items() if k != "history_tickers"}
+        settings["sessions"] = sessions_from_config(section.get("sessions"))
+        return cls(job, tickers, **{**settings, **kwargs})
+
+    # -- planning -----------------------------------------------------------
+    def _push(self, ticker: str, due: datetime, priority: int):
+        seq = next(self._seq)
+        self._pending[ticker] = seq
+        self._next_due[ticker] = due
+        heapq.heappush(self._timers, (due, priority, seq, ticker))
+        self._wakeup.set()
+
+    def next_refresh(self, ticker: str, now: Optional[datetime] = None) -> datetime:
+        """After the session close, or sooner while the session is open and intraday refresh is on."""
+        now = now or self.clock.now()
+        session = self.watchlist.get(ticker) or session_for(ticker, self.sessions)
+        due = session.next_close(now, self.refresh_delay)
+        if self.intraday_interval is not None and session.is_open(now):
+            due = min(due, now + self.intraday_interval)
+        return due
+
+    def add(self, ticker: str, due: Optional[datetime] = None):
+        """Put a ticker on the watchlist; its first refresh is due now (or at `due`)."""
+        with self._lock:
+            if ticker in self.watchlist:
+                return
+            self.watchlist[ticker] = session_for(ticker, self.sessions)
+            self._push(ticker, due or self.clock.now(), SCHEDULED)
+
+    def remove(self, ticker: str):
+        with self._lock:
+            self.watchlist.pop(ticker, None)
+            self._pending.pop(ticker, None)
+            self._next_due.pop(ticker, None)
+
+    def request(self, ticker: str):
+        """Refresh now, ahead of every scheduled job (adds unknown tickers to the watchlist)."""
+        with self._lock:
+            self.watchlist.setdefault(ticker, session_for(ticker, self.sessions))
+            if ticker not in self._running:
+                self._push(ticker, self.clock.now(), URGENT)
+
+    # -- dispatch -----------------------------------------------------------
+    def tick(self) -> int:
+        """Queue every due refresh and start as many as the pool has room for."""
+        now = self.clock.now()
+        started = []
+        with self._lock:
+            while self._timers and self._timers[0][0] <= now:
+                due, priority, seq, ticker = heapq.heappop(self._timers)
+                if self._pending.get(ticker) == seq:
+                    heapq.heappush(self._ready, (priority, due, seq, ticker))
+            while self._ready and len(self._running) < self.workers:
+                _, _, seq, ticker = heapq.heappop(self._ready)
+                if self._pending.get(ticker) != seq:
+                    continue
+                del self._pending[ticker]
+                self._next_due.pop(ticker, None)
+                self._running[ticker] = now
+                started.append(ticker)
+        for ticker in started:
+            fut = self._pool.submit(self._run, ticker)
+            fut.add_done_callback(lambda f, t=ticker: self._done(t, f))
+        return len(started)
+
+    def _run(self, ticker: str) -> float:
+        start = time.perf_counter()
+        self.job(ticker)
+        return time.perf_counter() - start
+
+    def _done(self, ticker: str, fut: Future):
+        now = self.clock.now()
+        with self._lock:
+            self._running.pop(ticker, None)
+            error = fut.exception()
+            if error is None:
+                self.counters["completed"] += 1
+                self.counters["busy_s"] += fut.result()
+                self._failures.pop(ticker, None)
+            else:
+                self.counters["failed"] += 1
+                self.last_error = {"ticker": ticker, "error": f"{type(error).__name__}: {error}", "at": now.isoformat()}
+                logger.error("Refresh failed for %s: %s", ticker, self.last_error["error"])
+            if ticker in self.watchlist and ticker not in self._pending:
+                if error is None:
+                    self._push(ticker, self.next_refresh(ticker, now), SCHEDULED)
+                else:
+                    n = self._failures[ticker] = self._failures.get(ticker, 0) + 1
+                    base, cap = self.retry_delay
+                    self._push(ticker, now + timedelta(seconds=min(cap, base * 2 ** (n - 1))), RETRY)
+            self._wakeup.set()
+            self._idle.notify_all()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until no refresh is running (tests and shutdown)."""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._running, timeout)
+
+    def serve_forever(self, max_wait: float = 60.0):
+        """Dispatch until stop(), sleeping until the next due time or a completion."""
+        logger.info("Scheduler serving %d tickers with %d workers", len(self.watchlist), self.workers)
+        while not self._stop.is_set():
+            self._wakeup.clear()
+            self.tick()
+            with self._lock:
+                next_due = self._timers[0][0] if self._timers else None
+                # with a full pool only a completion (which sets _wakeup) can start more work
+                waiting = bool(self._ready)
+            wait = max_wait
+            if next_due is not None and not waiting:
+                wait = min(max_wait, (next_due - self.clock.now()).total_seconds())
+            self.clock.wait(self._wakeup, wait)
+        self.shutdown()
+
+    def stop(self):
+        """Make serve_forever() return (safe from signal handlers and other threads)."""
+        self._stop.set()
+        self._wakeup.set()
+
+    def shutdown(self, wait: bool = True):
+        self._wakeup.set()
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    # -- health ---------------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        """Health and queue-depth snapshot (JSON-ready)."""
+        now = self.clock.now()
+        with self._lock:
+            live = set(self._pending)
+            ready = sum(1 for _, _, seq, t in self._ready if self._pending.get(t) == seq)
+            done = self.counters["completed"]
+            upcoming = sorted((d, t) for t, d in self._next_due.items() if t in live)
+            per_session: Dict[str, int] = {}
+            for session in self.watchlist.values():
+                per_session[session.name] = per_session.get(session.name, 0) + 1
+            return {
+                "status": "ok",
+                "now": now.isoformat(),
+                "uptime_s": round((now - self.started_at).total_seconds(), 3),
+                "watchlist": len(self.watchlist),
+                "sessions": per_session,
+                "queue_depth": ready,
+                "scheduled": len(live) - ready,
+                "in_flight": len(self._running),
+                "workers": self.workers,
+                "completed": done,
+                "failed": self.counters["failed"],
+                "avg_job_s": round(self.counters["busy_s"] / done, 6) if done else None,
+                "next_due": upcoming[0][0].isoformat() if upcoming else None,
+                "next_ticker": upcoming[0][1] if upcoming else None,
+                "last_error": self.last_error,
+            }
+
+
+def serve_health(scheduler: Scheduler, port: int, host: str = "127.0.0.1"):
+    """Serve scheduler.stats() as JSON on GET (any path) from a daemon thread; returns the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps(scheduler.stats()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            logger.debug("health: " + fmt, *args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="health", daemon=True).start()
+    logger.info("Health endpoint on http://%s:%d/health", host, server.server_port)
+    return server
@@ -0,0 +1,137 @@
+# src/screener.py
+"""
+Cross-sectional screens over the latest_metrics snapshot.
+Filters are small comparison expressions, e.g. "pct_from_high >= -5",
+"price_to_book < 3" or "sma50 > sma200", combined with AND and compiled into
+one parameterized SELECT against the indexed snapshot table (one row per
+ticker), so a screen over the whole universe is a single indexed query on a
+plain sqlite3 connection: no pandas, no SQLAlchemy.
+"""
+from __future__ import annotations
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+import logging
+import re
+import sqlite3
+from .database import LATEST_METRIC_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# processed-frame / indicator names accepted for the snapshot columns
+ALIASES = {"52w_high": "high_52w", "pct_from_52w_high": "pct_from_high"}
+DEFAULT_COLUMNS = ["ticker", "date", "close", "volume", "sma50", "sma200", "high_52w", "pct_from_high", "price_to_book"]
+OPERATORS = {"<": "<", "<=": "<=", ">": ">", ">=": ">=", "=": "=", "==": "=", "!=": "!="}
+
+_FILTER = re.compile(r"^\s*(\w+)\s*(<=|>=|==|!=|<|>|=)\s*(.+?)\s*$")
+
+
+def column(name: str) -> str:
+    """Snapshot column for `name` (aliases allowed); ValueError when unknown."""
+    name = ALIASES.get(name.strip(), name.strip())
+    if name not in LATEST_METRIC_COLUMNS:
+        raise ValueError(f"Unknown screen column {name!r}; available: {LATEST_METRIC_COLUMNS}")
+    return name
+
+
+def parse_filter(expr: str) -> Tuple[str, str, Any]:
+    """
+    "column op value" -> (column, SQL operator, value). The value is another
+    column (returned as a 1-tuple), a number, or a (quoted) string such as a date.
+    """
+    m = _FILTER.match(expr)
+    if not m:
+        raise ValueError(f"Invalid filter {expr!r}; expected '<column> <op> <value>', e.g. 'price_to_book < 3'")
+    name, op, raw = m.groups()
+    if ALIASES.get(raw, raw) in LATEST_METRIC_COLUMNS:
+        value: Any = (column(raw),)
+    else:
+        try:
+            value = float(raw)
+        except ValueError:
+            value = raw.strip("'\"")
+    return column(name), OPERATORS[op], value
+
+
+def build_query(
+    filters: Iterable[str],
+    columns: Optional[Sequence[str]] = None,
+    sort: Optional[str] = None,
+    descending: bool = False,
+    limit: Optional[int] = None,
+) -> Tuple[List[str], str, List[Any]]:
+    """(selected columns, SQL, params) of a screen; ticker is always selected."""
+    selected = [column(c) for c in (columns or DEFAULT_COLUMNS)] + ([column(sort)] if sort else [])
+    cols = ["ticker"] + [c for c in dict.fromkeys(selected) if c != "ticker"]
+    clauses, params = [], []
+    for expr in filters:
+        name, op, value = parse_filter(expr)
+        if isinstance(value, tuple):
+            clauses.append(f"{name} {op} {value[0]}")
+        else:
+            clauses.append(f"{name} {op} ?")
+            params.append(value)
+    sql = f"SELECT {', '.join(cols)} FROM latest_metrics"
+    if clauses:
+        sql += f" WHERE {' AND '.join(clauses)}"
+    # NULLs last either way, then by ticker for a stable order
+    order = column(sort) if sort else "ticker"
+    sql += f" ORDER BY {order} IS NULL, {order} {'DESC' if descending else 'ASC'}, ticker"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    return cols, sql, params
+
+
+def screen(
+    conn: sqlite3.Connection,
+    filters: Iterable[str] = (),
+    columns: Optional[Sequence[str]] = None,
+    sort: Optional[str] = None,
+    descending: bool = False,
+    limit: Optional[int] = None,
+) -> Tuple[List[str], List[tuple]]:
+    """Run a screen on a sqlite3 connection; returns (column names, rows)."""
+    cols, sql, params = build_query(filters, columns, sort, descending, limit)
+    return cols, conn.execute(sql, params).fetchall()
+
+
+def merge(
+    results: Iterable[Tuple[List[str], List[tuple]]],
+    sort: Optional[str] = None,
+    descending: bool = False,
+    limit: Optional[int] = None,
+) -> Tuple[List[str], List[tuple]]:
+    """Combine screens of several shards with the same ordering and limit."""
+    cols: List[str] = []
+    rows: List[tuple] = []
+    for cols, part in results:
+        rows.extend(part)
+    if not cols:
+        return cols, rows
+    i = cols.index(column(sort)) if sort else 0
+    rows.sort(key=lambda r: r[0])
+    present = [r for r in rows if r[i] is not None]
+    present.sort(key=lambda r: r[i], reverse=descending)
+    rows = present + [r for r in rows if r[i] is None]
+    return cols, rows[:limit] if limit is not None else rows
+
+
+def format_rows(cols: List[str], rows: List[tuple], fmt: str = "table") -> str:
+    """Render a screen as an aligned text table, CSV or JSON lines."""
+    if fmt == "json":
+        import json
+
+        return "\n".join(json.dumps(dict(zip(cols, r))) for r in rows)
+    if fmt == "csv":
+        import csv
+        import io
+
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator="\n")
+        writer.writerow(cols)
+        writer.writerows(rows)
+        return buf.getvalue().rstrip("\n")
+    if fmt != "table":
+        raise ValueError(f"Unknown output format {fmt!r}; expected 'table', 'csv' or 'json'")
+    cells = [cols] + [["" if v is None else f"{v:.2f}" if isinstance(v, float) else str(v) for v in r] for r in rows]
+    widths = [max(len(row[j]) for row in cells) for j in range(len(cols))]
+    return "\n".join("  ".join(v.rjust(w) for v, w in zip(row, widths)) for row in cells)
@@ -0,0 +1,323 @@
+# src/sharding.py
+"""
+SQLite sharded by ticker.
+With `database.shards: N` (N > 1) rows are spread over N SQLite files by a
+stable hash of the ticker (crc32 % N), named after `database.path`, e.g.
+financial_data.shard03-of-08.db. Every ticker lives in exactly one shard,
+so writers for different shards never contend for SQLite's single write
+lock: a panel save writes each shard from its own thread, and
+bulk_save_daily_metrics() gives every shard its own process for backfills.
+
+ShardedStore is also the read facade: per-ticker calls go to the owning
+shard, universe-wide reads fan out over all shards and concatenate.
+compact() merges the shards into one consolidated file or vacuums them.
+"""
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Sequence
+import logging
+import multiprocessing
+import pathlib
+import sqlite3
+import threading
+import zlib
+from . import database
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# tables copied by compact(); `id` columns are left to the target's autoincrement
+_MERGE_TABLES = ("tickers", "daily_metrics", "signal_events", "fundamentals", "latest_metrics",
+                 "weekly_metrics", "monthly_metrics")
+
+
+def shard_index(ticker: str, shards: int) -> int:
+    """Stable shard of a ticker (same in every process, unlike hash())."""
+    return zlib.crc32(ticker.encode("utf8")) % shards
+
+
+def shard_paths(db_path: str | pathlib.Path, shards: int) -> List[pathlib.Path]:
+    p = pathlib.Path(db_path).expanduser()
+    return [p.with_name(f"{p.stem}.shard{i:02d}-of-{shards:02d}{p.suffix}") for i in range(shards)]
+
+
+class ShardedStore:
+    """N SQLite files behind the storage.py backend interface."""
+
+    def __init__(self, db_path: str | pathlib.Path, shards: int, pragmas: Optional[Dict[str, Any]] = None):
+        if shards < 2:
+            raise ValueError("a sharded store needs at least 2 shards")
+        self.db_path = pathlib.Path(db_path).expanduser()
+        self.shards = shards
+        self.paths = shard_paths(db_path, shards)
+        self.pragmas = pragmas or {}
+        self._engines: List[Any] = [None] * shards
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"ShardedStore({str(self.db_path)!r}, shards={self.shards})"
+
+    def shard_of(self, ticker: str) -> int:
+        return shard_index(ticker, self.shards)
+
+    def engine(self, shard: int):
+        """SQLAlchemy engine of one shard, created on first use."""
+        with self._lock:
+            if self._engines[shard] is None:
+                self._engines[shard] = database.get_engine(str(self.paths[shard]), self.pragmas)
+            return self._engines[shard]
+
+    def engine_for(self, ticker: str):
+        return self.engine(self.shard_of(ticker))
+
+    def connect(self, shard: int) -> sqlite3.Connection:
+        return database.connect(str(self.paths[shard]), self.pragmas)
+
+    def group(self, tickers: Optional[Iterable[str]]) -> Dict[int, Optional[List[str]]]:
+        """Shard -> its tickers (all shards with None when `tickers` is None)."""
+        if tickers is None:
+            return {i: None for i in range(self.shards)}
+        out: Dict[int, Optional[List[str]]] = {}
+        for t in tickers:
+            out.setdefault(self.shard_of(t), []).append(t)
+        # an empty selection still runs one (empty) query for a typed result
+        return out or {0: []}
+
+    def fan_out(self, fn: Callable[[int, Optional[List[str]]], Any], tickers: Optional[Iterable[str]] = None) -> List[Any]:
+        """Run fn(shard, shard_tickers) for every shard holding `tickers`, one thread per shard."""
+        groups = self.group(tickers)
+        if len(groups) == 1:
+            (shard, names), = groups.items()
+            return [fn(shard, names)]
+        with ThreadPoolExecutor(max_workers=len(groups), thread_name_prefix="shard") as pool:
+            futures = [pool.submit(fn, shard, names) for shard, names in sorted(groups.items())]
+            return [f.result() for f in futures]
+
+    def init(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        for i in range(self.shards):
+            database.init_db(self.engine(i))
+
+    # -- writes -------------------------------------------------------------
+    def _split(self, df: "pd.DataFrame") -> Dict[int, "pd.DataFrame"]:
+        codes = df["ticker"].astype(str)
+        shard = codes.map({t: self.shard_of(t) for t in codes.unique()})
+        return {int(i): part for i, part in df.groupby(shard.to_numpy(), sort=True)}
+
+    def save_daily_metrics(self, df: "pd.DataFrame") -> int:
+        """Upsert rows into their shards, one writer thread per touched shard."""
+        if df.empty:
+            return database.save_daily_metrics(df)
+        parts = self._split(df)
+        if len(parts) == 1:
+            (shard, part), = parts.items()
+            return database.save_daily_metrics(part, engine=self.engine(shard))
+        with ThreadPoolExecutor(max_workers=len(parts), thread_name_prefix="shard-writer") as pool:
+            futures = [pool.submit(database.save_daily_metrics, part, self.engine(shard)) for shard, part in parts.items()]
+            return sum(f.result() for f in futures)
+
+    def save_signal_events(self, ticker: str, events: Iterable[dict]) -> int:
+        return database.save_signal_events(ticker, events, engine=self.engine_for(ticker))
+
+    def save_fundamentals(self, ticker: str, records: Iterable[dict], source: Optional[str] = None) -> int:
+        return database.save_fundamentals(ticker, records, engine=self.engine_for(ticker), source=source)
+
+    def save_fingerprints(self, fingerprints: Dict[str, str]) -> int:
+        parts: Dict[int, Dict[str, str]] = {}
+        for t, fp in fingerprints.items():
+            parts.setdefault(self.shard_of(t), {})[t] = fp
+        return sum(database.save_fingerprints(part, self.engine(shard)) for shard, part in parts.items())
+
+    # -- reads --------------------------------------------------------------
+    def get_latest_date(self, ticker: str) -> Optional[date]:
+        return database.get_latest_date(ticker, engine=self.engine_for(ticker))
+
+    def get_fingerprint(self, ticker: str) -> Optional[str]:
+        return database.get_fingerprint(ticker, engine=self.engine_for(ticker))
+
+    def load_fundamentals(self, tickers: Optional[Iterable[str]] = None) -> "pd.DataFrame":
+        import pandas as pd
+
+        frames = self.fan_out(lambda shard, names: database.load_fundamentals(self.engine(shard), names), tickers)
+        return pd.concat(frames, ignore_index=True).sort_values(["ticker", "as_of"], ignore_index=True)
+
+    def read_daily_metrics(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        tickers: Optional[Iterable[str]] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> "pd.DataFrame":
+        """Daily metrics of all shards (only `columns`, plus ticker), sorted by ticker and date."""
+        import pandas as pd
+
+        cols = ["ticker"] + [c for c in (columns or database.DAILY_METRIC_COLUMNS) if c != "ticker"]
+
+        def read(shard, names):
+            clauses, params = [], {}
+            if names is not None:
+                params.update({f"t{i}": t for i, t in enumerate(names)})
+                clauses.append(f"ticker IN ({', '.join(f':t{i}' for i in range(len(names)))})")
+            if start is not None:
+                params["start"] = start.isoformat()
+                clauses.append("date >= :start")
+            if end is not None:
+                params["end"] = end.isoformat()
+                clauses.append("date <= :end")
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+            sql = f"SELECT {', '.join(cols)} FROM daily_metrics {where} ORDER BY ticker, date"
+            with self.engine(shard).connect() as conn:
+                return pd.read_sql_query(sql, conn.connection.driver_connection, params=params)
+
+        df = pd.concat(self.fan_out(read, tickers), ignore_index=True)
+        if "date" in df.columns:
+            df["date"] = pd.to_datetime(df["date"])
+        return df.sort_values([c for c in ("ticker", "date") if c in df.columns], ignore_index=True)
+
+    def scan_crossovers(self, tickers: Optional[Iterable[str]] = None, **kwargs) -> int:
+        """
+        database.scan_crossovers on every shard in parallel over plain sqlite3
+        connections (no SQLAlchemy import); returns the total inserted.
+        """
+        def scan(shard, names):
+            if not self.paths[shard].exists():
+                return 0
+            conn = self.connect(shard)
+            try:
+                return database.scan_crossovers(conn, tickers=names, **kwargs) if database.has_schema(conn) else 0
+            finally:
+                conn.close()
+
+        return sum(self.fan_out(scan, tickers))
+
+    def screen(self, filters: Iterable[str] = (), rebuild: bool = False, **kwargs):
+        """screener.screen over every shard's latest_metrics, merged in the same order and limit."""
+        from . import screener
+
+        def run(shard, _names):
+            if not self.paths[shard].exists():
+                return screener.build_query(filters, kwargs.get("columns"), kwargs.get("sort"))[0], []
+            conn = self.connect(shard)
+            try:
+                if not database.has_table(conn, "latest_metrics"):
+                    database.init_db(self.engine(shard))  # builds the snapshot
+                elif rebuild:
+                    database.refresh_latest_metrics(conn)
+                return screener.screen(conn, filters, **kwargs)
+            finally:
+                conn.close()
+
+        return screener.merge(self.fan_out(run), kwargs.get("sort"), kwargs.get("descending", False), kwargs.get("limit"))
+
+    def load_rollups(self, timeframe: str = "weekly", tickers: Optional[Iterable[str]] = None, **kwargs) -> "pd.DataFrame":
+        """database.load_rollups of every shard holding `tickers`, concatenated in (ticker, period) order."""
+        import pandas as pd
+
+        def read(shard, names):
+            if names is None and not self.paths[shard].exists():
+                names = []
+            return database.load_rollups(self.engine(shard), timeframe, names, **kwargs)
+
+        frames = self.fan_out(read, tickers)
+        return pd.concat(frames, ignore_index=True).sort_values(["ticker", "period"], ignore_index=True)
+
+    def refresh_rollups(self, timeframes: Optional[Iterable[str]] = None):
+        timeframes = list(timeframes or database.ROLLUPS)
+        self.fan_out(lambda shard, _names: database.refresh_rollups(self.engine(shard), timeframes))
+
+    # -- maintenance ----------------------------------------------------------
+    def compact(self, output: Optional[str | pathlib.Path] = None) -> Dict[str, Any]:
+        """
+        With `output`: merge every shard into that single SQLite file (created
+        with the full schema; existing rows are replaced on key conflicts).
+        Without: checkpoint the WAL, VACUUM and ANALYZE each shard.
+        """
+        existing = [p for p in self.paths if p.exists()]
+        if output is None:
+            before = sum(p.stat().st_size for p in existing)
+            for path in existing:
+                vacuum(path, self.pragmas)
+            after = sum(p.stat().st_size for p in existing)
+            return {"shards": len(existing), "bytes_before": before, "bytes_after": after}
+
+        target = pathlib.Path(output).expanduser()
+        if target.resolve() in {p.resolve() for p in self.paths}:
+            raise ValueError("compact output must not be one of the shard files")
+        database.init_db(database.get_engine(str(target), self.pragmas))
+        rows = 0
+        conn = database.connect(str(target), self.pragmas)
+        try:
+            for path in existing:
+                rows += _merge_into(conn, path)
+            conn.execute("ANALYZE")
+        finally:
+            conn.close()
+        logger.info("Merged %d shards (%d rows) into %s", len(existing), rows, target)
+        return {"shards": len(existing), "rows": rows, "output": str(target)}
+
+
+def _columns(conn: sqlite3.Connection, schema: str, table: str) -> List[str]:
+    return [r[1] for r in conn.execute(f"PRAGMA {schema}.table_info({table})") if r[1] != "id"]
+
+
+def _merge_into(conn: sqlite3.Connection, path: pathlib.Path) -> int:
+    """Copy every pipeline table of the shard file at `path` into `conn` in one transaction."""
+    conn.execute("ATTACH DATABASE ? AS shard", (str(path),))
+    rows = 0
+    try:
+        with conn:
+            present = {r[0] for r in conn.execute("SELECT name FROM shard.sqlite_master WHERE type = 'table'")}
+            for table in _MERGE_TABLES:
+                if table not in present:
+                    continue
+                cols = [c for c in _columns(conn, "shard", table) if c in set(_columns(conn, "main", table))]
+                names = ", ".join(f'"{c}"' for c in cols)
+                rows += conn.execute(
+                    f"INSERT OR REPLACE INTO main.{table} ({names}) SELECT {names} FROM shard.{table}"
+                ).rowcount
+    finally:
+        conn.execute("DETACH DATABASE shard")
+    return rows
+
+
+def vacuum(path: str | pathlib.Path, pragmas: Optional[Dict[str, Any]] = None):
+    """Fold the WAL into the file, rebuild it without free pages and refresh planner stats."""
+    conn = database.connect(str(path), pragmas)
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+
+
+def _save_shard(path: str, pragmas: Dict[str, Any], df: "pd.DataFrame") -> int:
+    return database.save_daily_metrics(df, engine=database.get_engine(path, pragmas))
+
+
+def bulk_save_daily_metrics(
+    df: "pd.DataFrame",
+    store: ShardedStore,
+    processes: Optional[int] = None,
+    pool: Optional[ProcessPoolExecutor] = None,
+) -> int:
+    """
+    Backfill path: upsert a large panel with one writer process per shard
+    (at most `processes` at a time), so row encoding and B-tree inserts run
+    on separate cores instead of behind one GIL and one write lock.
+    A long-lived `pool` (e.g. the batch pipeline's writer processes) is
+    reused instead of starting processes per call.
+    """
+    parts = store._split(df)
+    if not parts:
+        return 0
+    if pool is not None:
+        futures = [pool.submit(_save_shard, str(store.paths[i]), store.pragmas, part) for i, part in parts.items()]
+        return sum(f.result() for f in futures)
+    # spawn, not fork: callers may be running other threads
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(processes or len(parts), len(parts)), mp_context=context) as own:
+        return bulk_save_daily_metrics(df, store, pool=own)
@@ -1,41 +1,297 @@
 # src/signals.py
 """
-Detect trading signals: golden crossover (50-day SMA crosses above 200-day SMA)
-and death cross (50 drops below 200).
+Detect trading signals with declarative rules.
+
+A rule is a small boolean expression over processed-frame columns, e.g.
+
+    golden_cross:   "cross_above(sma50, sma200)"
+    new_52w_high:   "cross_above(close, high_52w[1])"
+    cheap:          {when: "price_to_book < 1", edge: true}
+    sma50_turns_up: "cross_above(sma50 - sma50[1], 0)"
+    cheap_golden:   "golden_cross and price_to_book < 3"
+
+Expressions allow columns (high_52w / pct_from_high name the 52w_high /
+pct_from_52w_high columns), numbers, + - * /, comparisons, and/or/not,
+`col[n]` (the value n bars earlier), prev(x, n), abs(x), cross_above(a, b),
+cross_below(a, b), and the names of earlier rules. A rule fires on every bar
+where it is true, or with `edge` only on bars where it turns true.
+
+A RuleSet compiles all rules once and evaluates them together over a frame
+or a long (ticker, date) panel: every column and shared sub-expression is
+materialized as one NumPy array and reused by all rules, and lags never
+cross from one ticker into the next.
 """
 from __future__ import annotations
-from typing import List
-import pandas as pd
+from typing import Any, Dict, List, Mapping, Optional, Union
+import ast
 import logging
-from datetime import date
+import numpy as np
+import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+RuleSpec = Union[str, Mapping[str, Any]]
+
+# reproduces the signals the pipeline has always stored
+DEFAULT_RULES: Dict[str, RuleSpec] = {
+    "golden_cross": "cross_above(sma50, sma200)",
+    "death_cross": "cross_below(sma50, sma200)",
+}
+# identifiers for processed-frame columns whose names are not valid ones
+ALIASES = {"high_52w": "52w_high", "pct_from_high": "pct_from_52w_high"}
+FUNCTIONS = {"cross_above": (2,), "cross_below": (2,), "prev": (1, 2), "abs": (1,)}  # name -> arities
+
+_NODES = (ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+          ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Compare, ast.Lt, ast.LtE, ast.Gt,
+          ast.GtE, ast.Eq, ast.NotEq, ast.Call, ast.Name, ast.Load, ast.Constant, ast.Subscript)
+_COMPARE = {ast.Lt: np.less, ast.LtE: np.less_equal, ast.Gt: np.greater, ast.GtE: np.greater_equal,
+            ast.Eq: np.equal, ast.NotEq: np.not_equal}
+_ARITH = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+
+
+def _lag(node: ast.AST, rule: str) -> int:
+    if not (isinstance(node, ast.Constant) and type(node.value) is int and node.value >= 0):
+        raise ValueError(f"Rule {rule!r}: lags must be non-negative integers")
+    return node.value
+
+
+class Rule:
+    """One compiled rule: the parsed expression plus the columns it reports in `meta`."""
+
+    def __init__(self, name: str, when: str, edge: bool = False, meta: Optional[List[str]] = None):
+        self.name = name
+        self.when = when
+        self.edge = edge
+        try:
+            self.tree = ast.parse(str(when).strip(), mode="eval").body
+        except SyntaxError as e:
+            raise ValueError(f"Invalid rule {name!r}: {when!r} ({e.msg})") from None
+        self.names: List[str] = []
+        for node in ast.walk(self.tree):
+            if not isinstance(node, _NODES):
+                raise ValueError(f"Rule {name!r}: unsupported syntax {type(node).__name__} in {when!r}")
+            if isinstance(node, ast.Call):
+                arity = FUNCTIONS.get(getattr(node.func, "id", None))
+                if arity is None or node.keywords or len(node.args) not in arity:
+                    raise ValueError(f"Rule {name!r}: unknown function or arguments in {ast.unparse(node)!r}; "
+                                     f"available: {sorted(FUNCTIONS)}")
+                if node.func.id == "prev" and len(node.args) == 2:
+                    _lag(node.args[1], name)
+            elif isinstance(node, ast.Subscript):
+                if not isinstance(node.value, ast.Name):
+                    raise ValueError(f"Rule {name!r}: only columns can be indexed, use prev() for expressions")
+                _lag(node.slice, name)
+            elif isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+                raise ValueError(f"Rule {name!r}: only numeric constants are supported")
+            elif isinstance(node, ast.Name) and node.id not in FUNCTIONS:
+                self.names.append(ALIASES.get(node.id, node.id))
+        self.meta = meta
+
+    def __repr__(self) -> str:
+        return f"Rule({self.name!r}, {self.when!r}, edge={self.edge})"
+
+
+class _Evaluator:
+    """Evaluates rule expressions over one frame, caching every sub-expression."""
+
+    def __init__(self, df: pd.DataFrame, by: Optional[str]):
+        self.df = df
+        self.n = len(df)
+        # panel rows are contiguous per ticker (sorted by ticker, date)
+        self.codes = pd.factorize(df[by], sort=False)[0] if by is not None and by in df.columns else None
+        self.cache: Dict[str, Any] = {}
+        self.masks: Dict[str, np.ndarray] = {}
+
+    def column(self, name: str) -> Any:
+        if name not in self.df.columns:
+            raise KeyError(name)
+        return self.df[name].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def shift(self, values: Any, n: int) -> Any:
+        """`values` n bars earlier within each ticker (NaN / False where there is none)."""
+        if n == 0 or np.ndim(values) == 0:
+            return values
+        boolean = values.dtype == bool
+        out = np.zeros(self.n, dtype=bool) if boolean else np.full(self.n, np.nan)
+        if n < self.n:
+            out[n:] = values[:-n]
+            if self.codes is not None:
+                out[n:][self.codes[n:] != self.codes[:-n]] = False if boolean else np.nan
+        return out
+
+    def boolean(self, values: Any) -> np.ndarray:
+        return np.broadcast_to(np.asarray(values, dtype=bool), (self.n,))
+
+    def cross(self, a: Any, b: Any, above: bool) -> np.ndarray:
+        # NaN compares False, so a cross needs both bars defined
+        if above:
+            return self.boolean((a > b) & (self.shift(a, 1) <= self.shift(b, 1)))
+        return self.boolean((a < b) & (self.shift(a, 1) >= self.shift(b, 1)))
+
+    def __call__(self, node: ast.AST) -> Any:
+        if isinstance(node, ast.Name) and node.id in self.masks:
+            return self.masks[node.id]
+        key = ast.dump(node)
+        if key not in self.cache:
+            self.cache[key] = self._eval(node)
+        return self.cache[key]
+
+    def _eval(self, node: ast.AST) -> Any:
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.Name):
+            return self.column(ALIASES.get(node.id, node.id))
+        if isinstance(node, ast.Subscript):
+            return self.shift(self(node.value), node.slice.value)
+        if isinstance(node, ast.BoolOp):
+            reduce = np.logical_and.reduce if isinstance(node.op, ast.And) else np.logical_or.reduce
+            return reduce([self.boolean(self(v)) for v in node.values])
+        if isinstance(node, ast.UnaryOp):
+            value = self(node.operand)
+            if isinstance(node.op, ast.Not):
+                return ~self.boolean(value)
+            return -value if isinstance(node.op, ast.USub) else value
+        if isinstance(node, ast.BinOp):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return _ARITH[type(node.op)](self(node.left), self(node.right))
+        if isinstance(node, ast.Compare):
+            values = [self(node.left)] + [self(c) for c in node.comparators]
+            return np.logical_and.reduce([self.boolean(_COMPARE[type(op)](values[i], values[i + 1]))
+                                          for i, op in enumerate(node.ops)])
+        # ast.Call, validated by Rule
+        fn, args = node.func.id, [self(a) for a in node.args]
+        if fn == "prev":
+            return self.shift(args[0], node.args[1].value if len(args) == 2 else 1)
+        if fn == "abs":
+            return np.abs(args[0])
+        return self.cross(args[0], args[1], above=fn == "cross_above")
+
+
+def _values(s: pd.Series, rows: np.ndarray) -> List[Any]:
+    """Python values of `s` at positional `rows`, missing ones as None."""
+    values = s.to_numpy()[rows]
+    if values.dtype.kind == "f":
+        out = values.astype(object)
+        out[np.isnan(values)] = None
+        return out.tolist()
+    return [None if v is None or v is pd.NA or v != v else v.item() if isinstance(v, np.generic) else v
+            for v in values.tolist()]
+
+
+class RuleSet:
+    """
+    Compiled signal rules in declaration order. `specs` maps rule name to an
+    expression or {when, edge, meta}; a falsy spec disables the rule. `meta`
+    lists the columns reported with each event (default: every column the
+    rule references).
+    """
+
+    def __init__(self, specs: Optional[Mapping[str, RuleSpec]] = None):
+        self.specs = dict(DEFAULT_RULES if specs is None else specs)
+        self.rules: List[Rule] = []
+        for name, spec in self.specs.items():
+            if not spec:
+                continue
+            if isinstance(spec, str):
+                spec = {"when": spec}
+            if not isinstance(spec, Mapping):
+                raise ValueError(f"Rule {name!r} must be an expression or a mapping with 'when'; got {spec!r}")
+            unknown = set(spec) - {"when", "edge", "meta"}
+            if unknown or "when" not in spec:
+                raise ValueError(f"Rule {name!r} needs 'when' (and optionally 'edge', 'meta'); got {sorted(spec)}")
+            rule = Rule(name, spec["when"], edge=bool(spec.get("edge", False)), meta=spec.get("meta"))
+            if rule.meta is None:
+                known = {r.name for r in self.rules}
+                rule.meta = [c for c in dict.fromkeys(rule.names) if c not in known]
+            else:
+                rule.meta = [ALIASES.get(c, c) for c in rule.meta]
+            self.rules.append(rule)
+
+    def __reduce__(self):
+        # rebuilt from the specs in pool workers
+        return RuleSet, (self.specs,)
+
+    @property
+    def names(self) -> List[str]:
+        return [r.name for r in self.rules]
+
+    @property
+    def columns(self) -> List[str]:
+        """Frame columns any rule reads or reports."""
+        rules = set(self.names)
+        return [c for c in dict.fromkeys(c for r in self.rules for c in r.names + r.meta) if c not in rules]
+
+    def masks(self, df: pd.DataFrame, by: Optional[str] = "ticker") -> Dict[str, np.ndarray]:
+        """
+        One boolean array per rule, aligned with the rows of `df`. A panel
+        (with a `by` column) must be sorted by (ticker, date). Rules over
+        missing columns never fire (logged once per call).
+        """
+        ev = _Evaluator(df, by)
+        for rule in self.rules:
+            try:
+                mask = ev.boolean(ev(rule.tree))
+            except KeyError as e:
+                logger.warning("Signal rule %s skipped: column %s not present", rule.name, e)
+                mask = np.zeros(len(df), dtype=bool)
+            if rule.edge:
+                mask = mask & ~ev.shift(mask, 1)
+            ev.masks[rule.name] = mask
+        return ev.masks
+
+    def events(self, df: pd.DataFrame, by: Optional[str] = "ticker") -> List[Dict[str, Any]]:
+        """
+        Signal events of every rule as {date, signal_type, meta} dicts (plus
+        `ticker` for panels), ordered by ticker, date and rule. `date` is the
+        bar's day as an ISO timestamp; `meta` holds the rule's meta columns at
+        that bar (NaN -> None).
+        """
+        masks = self.masks(df, by)
+        rows, kinds, metas = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)], []
+        for k, rule in enumerate(self.rules):
+            hits = np.flatnonzero(masks[rule.name])
+            cols = {c: _values(df[c], hits) for c in rule.meta if c in df.columns}
+            metas += [dict(zip(cols, v)) for v in zip(*cols.values())] if cols else [{} for _ in hits]
+            rows.append(hits)
+            kinds.append(np.full(len(hits), k))
+        rows, kinds = np.concatenate(rows), np.concatenate(kinds)
+        # by ticker (panel rows are grouped by it), date, then rule
+        order = np.lexsort((kinds, rows))
+        rows = rows[order]
+        days = pd.to_datetime(df["date"].iloc[rows]).dt.tz_localize(None).to_numpy().astype("datetime64[D]")
+        dates = [d + "T00:00:00" for d in np.datetime_as_string(days).tolist()]
+        names = [self.rules[k].name for k in kinds[order].tolist()]
+        events = [{"date": d, "signal_type": t, "meta": metas[i]} for d, t, i in zip(dates, names, order.tolist())]
+        if by is not None and by in df.columns:
+            tickers = df[by].to_numpy()[rows].tolist()
+            events = [{"ticker": str(t), **e} for t, e in zip(tickers, events)]
+        return events
+
+
+def rules_from_config(cfg: Dict[str, Any]) -> RuleSet:
+    """DEFAULT_RULES extended (or overridden, null disables) by the `signals` config section."""
+    return RuleSet({**DEFAULT_RULES, **(cfg.get("signals") or {})})
+
+
+def _dates(df: pd.DataFrame, mask: np.ndarray) -> List[str]:
+    return df.loc[mask, "date"].dt.date.astype(str).tolist()
+
 
 def detect_golden_crossover(df: pd.DataFrame, sma50_col: str = "sma50", sma200_col: str = "sma200") -> List[str]:
     """
-    Return list of ISO dates where golden crossover occurred.
-    Uses vectorized approach:
+    Return list of ISO dates where golden crossover occurred:
       golden = (sma50 > sma200) & (sma50.shift(1) <= sma200.shift(1))
     """
     if sma50_col not in df.columns or sma200_col not in df.columns:
         logger.warning("SMA columns not present for signal detection")
         return []
-
-    s50 = df[sma50_col]
-    s200 = df[sma200_col]
-
-    cond = (s50 > s200) & (s50.shift(1) <= s200.shift(1))
-    dates = df.loc[cond, "date"].dt.date.astype(str).tolist()
-    return dates
+    rules = RuleSet({"golden_cross": f"cross_above({sma50_col}, {sma200_col})"})
+    return _dates(df, rules.masks(df, by=None)["golden_cross"])
 
 
 def detect_death_cross(df: pd.DataFrame, sma50_col: str = "sma50", sma200_col: str = "sma200") -> List[str]:
     """Return list of ISO dates for death cross events."""
     if sma50_col not in df.columns or sma200_col not in df.columns:
         return []
-    s50 = df[sma50_col]
-    s200 = df[sma200_col]
-    cond = (s50 < s200) & (s50.shift(1) >= s200.shift(1))
-    dates = df.loc[cond, "date"].dt.date.astype(str).tolist()
-    return dates
+    rules = RuleSet({"death_cross": f"cross_below({sma50_col}, {sma200_col})"})
+    return _dates(df, rules.masks(df, by=None)["death_cross"])
@@ -0,0 +1,430 @@
+# src/storage.py
+"""
+Pluggable storage backends for daily metrics and signal events.
+`database.backend` in config.yaml selects the backend:
+  - "sqlite" (default): the SQLAlchemy tables in database.py, spread over
+    several files by ticker when `database.shards` > 1 (sharding.py)
+  - "parquet": a columnar dataset partitioned by ticker/year under
+    `database.parquet_dir`, read with column pruning and memory mapping.
+The module-level save/get functions keep the database.py contract and
+dispatch on the store object, so the pipeline takes an engine, a
+ShardedStore or a ParquetStore. pyarrow is optional and only imported by the parquet backend.
+"""
+from __future__ import annotations
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from urllib.parse import quote
+import json
+import logging
+import os
+import pathlib
+import tempfile
+import threading
+import pandas as pd
+from . import database
+from .sharding import ShardedStore
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("sqlite", "parquet")
+DEFAULT_PARQUET_DIR = "financial_data.parquet"
+
+# Columns stored in each daily_metrics partition (ticker/year live in the path)
+PARQUET_METRIC_COLUMNS = [c for c in database.DAILY_METRIC_COLUMNS if c != "ticker"]
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.fs as pafs
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("The parquet storage backend requires pyarrow: install the 'columnar' extra "
+                          "(uv sync --extra columnar, or pip install 'financial-analyzer[columnar]')") from e
+    return pa, ds, pafs, pq
+
+
+def _metric_schema(pa):
+    fields = [("date", pa.date32())]
+    for c in PARQUET_METRIC_COLUMNS[1:]:
+        fields.append((c, pa.int64() if c == "volume" else pa.float64()))
+    return pa.schema(fields)
+
+
+def _signal_schema(pa):
+    return pa.schema([("date", pa.date32()), ("signal_type", pa.string()), ("meta", pa.string())])
+
+
+def _fundamentals_schema(pa):
+    fields = [("as_of", pa.date32())]
+    fields += [(c, pa.float64()) for c in database.FUNDAMENTAL_COLUMNS]
+    fields += [("source", pa.string()), ("fetched_at", pa.timestamp("us")),
+               ("checked_at", pa.timestamp("us")), ("version", pa.int64())]
+    return pa.schema(fields)
+
+
+class ParquetStore:
+    """
+    Hive-partitioned Parquet dataset:
+      <root>/daily_metrics/ticker=<T>/year=<Y>/part-0.parquet
+      <root>/signal_events/ticker=<T>/part-0.parquet
+      <root>/fundamentals/ticker=<T>/part-0.parquet
+      <root>/tickers/<T>.json   {fingerprint, processed_at}
+    Writes rewrite only the touched partitions (existing rows merged in, new
+    ones winning on the key) via temp file + rename, so re-runs are idempotent
+    and readers never see a half-written file.
+    """
+
+    def __init__(self, root: str | pathlib.Path = DEFAULT_PARQUET_DIR):
+        self.root = pathlib.Path(root).expanduser()
+        self._lock = threading.Lock()
+        _pyarrow()  # fail fast when pyarrow is missing
+
+    # -- layout -------------------------------------------------------------
+    @property
+    def metrics_dir(self) -> pathlib.Path:
+        return self.root / "daily_metrics"
+
+    @property
+    def signals_dir(self) -> pathlib.Path:
+        return self.root / "signal_events"
+
+    @staticmethod
+    def _part(ticker: str) -> str:
+        # partition values are URI-decoded on read
+        return f"ticker={quote(ticker, safe='')}"
+
+    @property
+    def fundamentals_dir(self) -> pathlib.Path:
+        return self.root / "fundamentals"
+
+    def _metric_path(self, ticker: str, year: int) -> pathlib.Path:
+        return self.metrics_dir / self._part(ticker) / f"year={year}" / "part-0.parquet"
+
+    def _signal_path(self, ticker: str) -> pathlib.Path:
+        return self.signals_dir / self._part(ticker) / "part-0.parquet"
+
+    def init(self):
+        for d in (self.metrics_dir, self.signals_dir, self.fundamentals_dir):
+            d.mkdir(parents=True, exist_ok=True)
+
+    # -- writes -------------------------------------------------------------
+    def _write(self, path: pathlib.Path, frame: pd.DataFrame, schema):
+        pa, _, _, pq = _pyarrow()
+        table = pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".", suffix=".tmp")
+        os.close(fd)
+        try:
+            pq.write_table(table, tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _merge(self, path: pathlib.Path, new: pd.DataFrame, key: List[str], schema) -> pd.DataFrame:
+        if path.exists():
+            _, _, _, pq = _pyarrow()
+            old = pq.read_table(path, schema=schema).to_pandas()
+            new = pd.concat([old, new], ignore_index=True)
+        return new.drop_duplicates(key, keep="last").sort_values(key).reset_index(drop=True)
+
+    def save_daily_metrics(self, df: pd.DataFrame) -> int:
+        """Upsert rows on (ticker, date), rewriting one file per touched ticker/year."""
+        cols = [c for c in database.DAILY_METRIC_COLUMNS if c in df.columns]
+        if df.empty or "ticker" not in cols or "date" not in cols:
+            logger.warning("No daily metrics to save")
+            return 0
+        pa = _pyarrow()[0]
+        schema = _metric_schema(pa)
+        frame = df[cols].copy()
+        frame["date"] = pd.to_datetime(frame["date"]).dt.date
+        frame = frame.reindex(columns=["ticker"] + PARQUET_METRIC_COLUMNS)
+        frame["volume"] = frame["volume"].astype("Int64")
+        years = pd.to_datetime(frame["date"]).dt.year
+        with self._lock:
+            for (ticker, year), part in frame.groupby([frame["ticker"], years], sort=False, observed=True):
+                path = self._metric_path(ticker, int(year))
+                merged = self._merge(path, part.drop(columns="ticker"), ["date"], schema)
+                self._write(path, merged, schema)
+        logger.debug("Saved %d daily metric rows to %s", len(frame), self.metrics_dir)
+        return len(frame)
+
+    def save_signal_events(self, ticker: str, events: Iterable[dict]) -> int:
+        """Upsert events on (ticker, date, signal_type)."""
+        rows = []
+        for ev in events:
+            if not isinstance(ev, dict):
+                continue
+            d = ev.get("date")
+            if isinstance(d, datetime) or (d is not None and not isinstance(d, date)):
+                d = pd.to_datetime(d).date()
+            rows.append({"date": d, "signal_type": ev.get("signal_type"), "meta": json.dumps(ev.get("meta") or {}, default=str)})
+        if not rows:
+            return 0
+        schema = _signal_schema(_pyarrow()[0])
+        path = self._signal_path(ticker)
+        with self._lock:
+            merged = self._merge(path, pd.DataFrame(rows), ["date", "signal_type"], schema)
+            self._write(path, merged, schema)
+        return len(rows)
+
+    def save_fundamentals(
+        self,
+        ticker: str,
+        records: Iterable[dict],
+        source: Optional[str] = None,
+        fetched_at: Optional[datetime] = None,
+    ) -> int:
+        """Same semantics as database.save_fundamentals (versioned upsert, checked_at stamp)."""
+        stamp = fetched_at or database.utc_now()
+        cols = ["ticker", "as_of", *database.FUNDAMENTAL_COLUMNS, "source", "fetched_at"]
+        new = pd.DataFrame(database.fundamental_rows(ticker, records, source, stamp), columns=cols).drop(columns="ticker")
+        new["as_of"] = pd.to_datetime(new["as_of"]).dt.date
+        new["fetched_at"] = pd.to_datetime(new["fetched_at"])
+        new = new.drop_duplicates("as_of", keep="last")
+        new["version"] = 1
+        schema = _fundamentals_schema(_pyarrow()[0])
+        path = self.fundamentals_dir / self._part(ticker) / "part-0.parquet"
+        with self._lock:
+            if path.exists():
+                _, _, _, pq = _pyarrow()
+                old = pq.read_table(path, schema=schema).to_pandas().set_index("as_of")
+            else:
+                old = pd.DataFrame(columns=list(schema.names)).set_index("as_of")
+            new = new.set_index("as_of")
+            common = new.index.intersection(old.index)
+            vals = database.FUNDAMENTAL_COLUMNS
+            a, b = new.loc[common, vals], old.loc[common, vals].astype(float)
+            unchanged = ((a == b) | (a.isna() & b.isna())).all(axis=1)
+            changed = common[~unchanged.to_numpy()]
+            new.loc[changed, "version"] = old.loc[changed, "version"].to_numpy() + 1
+            new = new.drop(index=common[unchanged.to_numpy()])
+            merged = pd.concat([old.drop(index=new.index.intersection(old.index)), new]).sort_index()
+            merged["checked_at"] = pd.Timestamp(stamp)
+            self._write(path, merged.reset_index(), schema)
+        return len(new)
+
+    @property
+    def tickers_dir(self) -> pathlib.Path:
+        return self.root / "tickers"
+
+    def _ticker_path(self, ticker: str) -> pathlib.Path:
+        return self.tickers_dir / f"{quote(ticker, safe='')}.json"
+
+    def save_fingerprints(self, fingerprints: Dict[str, str], processed_at: Optional[datetime] = None) -> int:
+        """
+        Same as database.save_fingerprints, one small JSON file per ticker
+        (temp file + rename): a save touches only its own tickers, so
+        concurrent writers, also in other processes, never lose updates.
+        """
+        if not fingerprints:
+            return 0
+        stamp = (processed_at or database.utc_now()).isoformat(sep=" ")
+        self.tickers_dir.mkdir(parents=True, exist_ok=True)
+        for t, fp in fingerprints.items():
+            fd, tmp = tempfile.mkstemp(dir=self.tickers_dir, prefix=".", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf8") as f:
+                json.dump({"fingerprint": fp, "processed_at": stamp}, f)
+            os.replace(tmp, self._ticker_path(t))
+        return len(fingerprints)
+
+    def get_fingerprint(self, ticker: str) -> Optional[str]:
+        try:
+            return json.loads(self._ticker_path(ticker).read_text(encoding="utf8")).get("fingerprint")
+        except FileNotFoundError:
+            return None
+
+    def load_fundamentals(self, tickers: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Stored fundamentals as a long (ticker, as_of, ...) frame, like database.load_fundamentals."""
+        pa, ds, _, _ = _pyarrow()
+        schema = _fundamentals_schema(pa)
+        if self.fundamentals_dir.exists():
+            dataset = self._dataset(self.fundamentals_dir, [("ticker", pa.string())])
+            expr = ds.field("ticker").isin(list(tickers)) if tickers is not None else None
+            table = dataset.to_table(columns=["ticker", *schema.names], filter=expr)
+        else:
+            table = schema.insert(0, pa.field("ticker", pa.string())).empty_table()
+        df = table.sort_by([("ticker", "ascending"), ("as_of", "ascending")]).to_pandas()
+        df["as_of"] = pd.to_datetime(df["as_of"])
+        return df
+
+    # -- reads --------------------------------------------------------------
+    def _dataset(self, directory: pathlib.Path, fields: Sequence[tuple]):
+        pa, ds, pafs, _ = _pyarrow()
+        # use_mmap: column chunks are memory-mapped instead of read into buffers
+        return ds.dataset(
+            str(directory),
+            format="parquet",
+            filesystem=pafs.LocalFileSystem(use_mmap=True),
+            partitioning=ds.partitioning(pa.schema(list(fields)), flavor="hive"),
+        )
+
+    def _metrics_query(self, columns, tickers, start, end):
+        """(dataset, columns, filter) for a daily-metrics read, or None before any write."""
+        pa, ds, _, _ = _pyarrow()
+        if not self.metrics_dir.exists():
+            return None
+        dataset = self._dataset(self.metrics_dir, [("ticker", pa.string()), ("year", pa.int32())])
+        expr = None
+
+        def _and(e):
+            nonlocal expr
+            expr = e if expr is None else expr & e
+
+        if tickers is not None:
+            _and(ds.field("ticker").isin(list(tickers)))
+        if start is not None:
+            _and((ds.field("year") >= start.year) & (ds.field("date") >= pa.scalar(start, pa.date32())))
+        if end is not None:
+            _and((ds.field("year") <= end.year) & (ds.field("date") <= pa.scalar(end, pa.date32())))
+        cols = ["ticker"] + [c for c in (columns or PARQUET_METRIC_COLUMNS) if c != "ticker"]
+        return dataset, cols, expr
+
+    def _empty_metrics(self, columns: Optional[Sequence[str]] = None):
+        pa, _, _, _ = _pyarrow()
+        schema = _metric_schema(pa).insert(0, pa.field("ticker", pa.string()))
+        if columns is not None:
+            schema = pa.schema([schema.field(c) for c in ["ticker", *(c for c in columns if c != "ticker")]])
+        return schema.empty_table()
+
+    def scan(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        tickers: Optional[Iterable[str]] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ):
+        """
+        Daily metrics as a pyarrow Table. Only `columns` are read (default all,
+        'ticker' is always included); ticker and date filters prune whole
+        partitions before any data is touched.
+        """
+        query = self._metrics_query(columns, tickers, start, end)
+        if query is None:
+            return self._empty_metrics(columns)
+        dataset, cols, expr = query
+        table = dataset.to_table(columns=cols, filter=expr)
+        return table.sort_by([(c, "ascending") for c in ("ticker", "date") if c in cols])
+
+    def iter_batches(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        tickers: Optional[Iterable[str]] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        batch_size: int = 65_536,
+    ):
+        """
+        Like scan() but yields pyarrow RecordBatches one at a time, in
+        partition (ticker, year) order, so a full export never holds more
+        than one batch in memory.
+        """
+        query = self._metrics_query(columns, tickers, start, end)
+        if query is None:
+            return
+        dataset, cols, expr = query
+        yield from dataset.scanner(columns=cols, filter=expr, batch_size=batch_size).to_batches()
+
+    def read_daily_metrics(self, columns: Optional[Sequence[str]] = None, **filters) -> pd.DataFrame:
+        """scan() converted to pandas without consolidating blocks (fewer copies)."""
+        df = self.scan(columns, **filters).to_pandas(split_blocks=True, self_destruct=True)
+        if "date" in df.columns:
+            df["date"] = pd.to_datetime(df["date"])
+        return df
+
+    def read_signal_events(self, tickers: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        pa, ds, _, _ = _pyarrow()
+        if not self.signals_dir.exists():
+            return pd.DataFrame(columns=["ticker", "date", "signal_type", "meta"])
+        dataset = self._dataset(self.signals_dir, [("ticker", pa.string())])
+        expr = ds.field("ticker").isin(list(tickers)) if tickers is not None else None
+        table = dataset.to_table(columns=["ticker", "date", "signal_type", "meta"], filter=expr)
+        return table.sort_by([("ticker", "ascending"), ("date", "ascending")]).to_pandas()
+
+    def get_latest_date(self, ticker: str) -> Optional[date]:
+        """Most recent stored date for ticker (reads only its newest year partition)."""
+        tdir = self.metrics_dir / self._part(ticker)
+        years = sorted(int(p.name.split("=", 1)[1]) for p in tdir.glob("year=*") if p.is_dir()) if tdir.exists() else []
+        if not years:
+            return None
+        _, _, _, pq = _pyarrow()
+        dates = pq.read_table(self._metric_path(ticker, years[-1]), columns=["date"], memory_map=True).column("date")
+        return dates.to_pandas().max() if len(dates) else None
+
+
+def open_store(cfg: Dict[str, Any], db_path: Optional[str] = None):
+    """
+    Engine (sqlite), ShardedStore (sqlite with `database.shards` > 1) or
+    ParquetStore for the configured `database.backend`.
+    """
+    db_cfg = cfg.get("database", {})
+    backend = db_cfg.get("backend", "sqlite")
+    if backend == "sqlite":
+        path = db_path or db_cfg.get("path")
+        if int(db_cfg.get("shards") or 1) > 1:
+            return ShardedStore(path, int(db_cfg["shards"]), db_cfg.get("pragmas", {}))
+        return database.get_engine(path, db_cfg.get("pragmas", {}))
+    if backend == "parquet":
+        return ParquetStore(db_cfg.get("parquet_dir", DEFAULT_PARQUET_DIR))
+    raise ValueError(f"Unknown database.backend {backend!r}; expected one of {BACKENDS}")
+
+
+# stores with their own methods; anything else is a SQLAlchemy engine (or None)
+_STORES = (ParquetStore, ShardedStore)
+
+
+def init_store(store):
+    if isinstance(store, _STORES):
+        store.init()
+    else:
+        database.init_db(store)
+
+
+def save_daily_metrics(df: pd.DataFrame, store=None) -> int:
+    if isinstance(store, _STORES):
+        return store.save_daily_metrics(df)
+    return database.save_daily_metrics(df, engine=store)
+
+
+def save_signal_events(ticker: Optional[str], events: Iterable[dict], store=None) -> int:
+    if isinstance(store, _STORES):
+        if ticker is not None:
+            return store.save_signal_events(ticker, events)
+        # events of several tickers: the stores write them per ticker
+        grouped: Dict[str, List[dict]] = {}
+        for ev in events:
+            grouped.setdefault(ev["ticker"], []).append(ev)
+        return sum(store.save_signal_events(t, evs) for t, evs in grouped.items())
+    return database.save_signal_events(ticker, events, engine=store)
+
+
+def get_latest_date(ticker: str, store=None) -> Optional[date]:
+    if isinstance(store, _STORES):
+        return store.get_latest_date(ticker)
+    return database.get_latest_date(ticker, engine=store)
+
+
+def save_fundamentals(ticker: str, records: Iterable[dict], store=None, source: Optional[str] = None) -> int:
+    if isinstance(store, _STORES):
+        return store.save_fundamentals(ticker, records, source=source)
+    return database.save_fundamentals(ticker, records, engine=store, source=source)
+
+
+def get_fingerprint(ticker: str, store=None) -> Optional[str]:
+    if isinstance(store, _STORES):
+        return store.get_fingerprint(ticker)
+    return database.get_fingerprint(ticker, engine=store)
+
+
+def save_fingerprints(fingerprints: Dict[str, str], store=None) -> int:
+    if isinstance(store, _STORES):
+        return store.save_fingerprints(fingerprints)
+    return database.save_fingerprints(fingerprints, engine=store)
+
+
+def load_fundamentals(store=None, tickers: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    if isinstance(store, _STORES):
+        return store.load_fundamentals(tickers)
+    return database.load_fundamentals(store, tickers)
@@ -0,0 +1,258 @@
+# src/streaming.py
+"""
+Streaming indicator engine with O(1) per-bar updates.
+Keeps per-ticker state (ring buffers with running sums for the SMAs and a
+monotonic deque for the rolling high) so each new bar updates sma50/sma200/
+52w_high/pct_from_52w_high and emits golden/death cross events immediately.
+
+The running sums replay pandas' rolling-mean algorithm (Kahan-compensated
+add/remove, same-value run detection), so replayed history reproduces
+processor.process_data and signals.py bit for bit.
+"""
+from __future__ import annotations
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import math
+import logging
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+EventCallback = Callable[[Dict[str, Any]], None]
+
+
+class RollingMean:
+    """Fixed-window mean with min_periods=1, matching pandas' roll_mean."""
+
+    __slots__ = ("window", "buf", "nobs", "sum_x", "comp_add", "comp_remove", "neg_ct", "same_ct", "prev_value")
+
+    def __init__(self, window: int):
+        self.window = window
+        self.buf: deque = deque()
+        self.nobs = 0
+        self.sum_x = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.neg_ct = 0
+        self.same_ct = 0
+        self.prev_value: Optional[float] = None
+
+    def push(self, val: float) -> float:
+        if self.prev_value is None:
+            self.prev_value = val
+        if len(self.buf) == self.window:
+            self._remove(self.buf.popleft())
+        self.buf.append(val)
+        self._add(val)
+        return self.value()
+
+    def _add(self, val: float):
+        if math.isnan(val):
+            return
+        self.nobs += 1
+        y = val - self.comp_add
+        t = self.sum_x + y
+        self.comp_add = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct += 1
+        self.same_ct = self.same_ct + 1 if val == self.prev_value else 1
+        self.prev_value = val
+
+    def _remove(self, val: float):
+        if math.isnan(val):
+            return
+        self.nobs -= 1
+        y = -val - self.comp_remove
+        t = self.sum_x + y
+        self.comp_remove = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct -= 1
+
+    def value(self) -> float:
+        if self.nobs <= 0:
+            return math.nan
+        result = self.sum_x / self.nobs
+        if self.same_ct >= self.nobs:
+            result = self.prev_value
+        elif self.neg_ct == 0 and result < 0:
+            result = 0.0
+        elif self.neg_ct == self.nobs and result > 0:
+            result = 0.0
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: (list(getattr(self, k)) if k == "buf" else getattr(self, k)) for k in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "RollingMean":
+        obj = cls(d["window"])
+        for k in cls.__slots__:
+            setattr(obj, k, deque(d[k]) if k == "buf" else d[k])
+        return obj
+
+
+class RollingMax:
+    """Fixed-window max (NaN-skipping, min_periods=1) via a monotonic deque."""
+
+    __slots__ = ("window", "count", "dq")
+
+    def __init__(self, window: int):
+        self.window = window
+        self.count = 0
+        self.dq: deque = deque()  # (bar index, value), values decreasing
+
+    def push(self, val: float) -> float:
+        i = self.count
+        self.count += 1
+        while self.dq and self.dq[0][0] <= i - self.window:
+            self.dq.popleft()
+        if not math.isnan(val):
+            while self.dq and self.dq[-1][1] <= val:
+                self.dq.pop()
+            self.dq.append((i, val))
+        return self.dq[0][1] if self.dq else math.nan
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"window": self.window, "count": self.count, "dq": [list(x) for x in self.dq]}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "RollingMax":
+        obj = cls(d["window"])
+        obj.count = d["count"]
+        obj.dq = deque(tuple(x) for x in d["dq"])
+        return obj
+
+
+class TickerState:
+    """Indicator state for one ticker."""
+
+    def __init__(self, fast: int = 50, slow: int = 200, high_window: int = 252):
+        self.fast = RollingMean(fast)
+        self.slow = RollingMean(slow)
+        self.high = RollingMax(high_window)
+        self.last_date: Optional[pd.Timestamp] = None
+        self.prev_fast = math.nan
+        self.prev_slow = math.nan
+
+    def update(self, when: pd.Timestamp, close: float) -> Tuple[Dict[str, Any], Optional[str]]:
+        s_fast = self.fast.push(close)
+        s_slow = self.slow.push(close)
+        high = self.high.push(close)
+        # NaN comparisons are False, exactly like the shifted-series test in signals.py
+        signal = None
+        if s_fast > s_slow and self.prev_fast <= self.prev_slow:
+            signal = "golden_cross"
+        elif s_fast < s_slow and self.prev_fast >= self.prev_slow:
+            signal = "death_cross"
+        self.prev_fast, self.prev_slow = s_fast, s_slow
+        self.last_date = when
+        row = {
+            "date": when,
+            "close": close,
+            f"sma{self.fast.window}": s_fast,
+            f"sma{self.slow.window}": s_slow,
+            "52w_high": high,
+            "pct_from_52w_high": (close / high - 1.0) * 100.0,
+        }
+        return row, signal
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "fast": self.fast.to_dict(),
+            "slow": self.slow.to_dict(),
+            "high": self.high.to_dict(),
+            "last_date": self.last_date.isoformat() if self.last_date is not None else None,
+            "prev_fast": self.prev_fast,
+            "prev_slow": self.prev_slow,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "TickerState":
+        obj = cls.__new__(cls)
+        obj.fast = RollingMean.from_dict(d["fast"])
+        obj.slow = RollingMean.from_dict(d["slow"])
+        obj.high = RollingMax.from_dict(d["high"])
+        obj.last_date = pd.Timestamp(d["last_date"]) if d["last_date"] else None
+        obj.prev_fast = d["prev_fast"]
+        obj.prev_slow = d["prev_slow"]
+        return obj
+
+
+class StreamingEngine:
+    """
+    Per-ticker streaming indicators for many symbols in one process.
+    Feed bars with update() or update_batch(); cross events are passed to
+    `on_event` as they occur and also returned. Bars at or before a ticker's
+    last seen date are ignored. snapshot()/restore() round-trip all state
+    through a JSON-serializable dict.
+    """
+
+    def __init__(self, fast: int = 50, slow: int = 200, high_window: int = 252,
+                 on_event: Optional[EventCallback] = None):
+        self.fast = fast
+        self.slow = slow
+        self.high_window = high_window
+        self.on_event = on_event
+        self.states: Dict[str, TickerState] = {}
+
+    def update(self, ticker: str, when, close: float) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Ingest one bar; returns (indicator row or None if stale, events)."""
+        when = pd.Timestamp(when)
+        state = self.states.get(ticker)
+        if state is None:
+            state = self.states[ticker] = TickerState(self.fast, self.slow, self.high_window)
+        elif state.last_date is not None and when <= state.last_date:
+            logger.debug("Ignoring stale bar %s %s (last %s)", ticker, when, state.last_date)
+            return None, []
+        row, signal = state.update(when, float(close))
+        row["ticker"] = ticker
+        events = []
+        if signal is not None:
+            ev = {
+                "ticker": ticker,
+                "date": when.date().isoformat(),
+                "signal_type": signal,
+                "meta": {f"sma{self.fast}": row[f"sma{self.fast}"], f"sma{self.slow}": row[f"sma{self.slow}"]},
+            }
+            events.append(ev)
+            if self.on_event is not None:
+                self.on_event(ev)
+        return row, events
+
+    def update_batch(self, bars: pd.DataFrame) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+        """
+        Ingest a micro-batch (columns ticker, date, close), processed in date
+        order. Returns the indicator rows and all events raised.
+        """
+        rows: List[Dict[str, Any]] = []
+        events: List[Dict[str, Any]] = []
+        ordered = bars.sort_values(["date", "ticker"], kind="stable")
+        for ticker, when, close in zip(ordered["ticker"], ordered["date"], ordered["close"]):
+            row, evs = self.update(ticker, when, close)
+            if row is not None:
+                rows.append(row)
+                events.extend(evs)
+        return pd.DataFrame(rows), events
+
+    def seed(self, ticker: str, history: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Replay a ticker's history (date/close columns) to warm its state."""
+        events: List[Dict[str, Any]] = []
+        for when, close in zip(history["date"], history["close"]):
+            events.extend(self.update(ticker, when, close)[1])
+        return events
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "fast": self.fast,
+            "slow": self.slow,
+            "high_window": self.high_window,
+            "states": {t: s.to_dict() for t, s in self.states.items()},
+        }
+
+    @classmethod
+    def restore(cls, snapshot: Dict[str, Any], on_event: Optional[EventCallback] = None) -> "StreamingEngine":
+        engine = cls(snapshot["fast"], snapshot["slow"], snapshot["high_window"], on_event=on_event)
+        engine.states = {t: TickerState.from_dict(d) for t, d in snapshot["states"].items()}
+        return engine
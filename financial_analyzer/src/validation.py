@@ -0,0 +1,241 @@
+# src/validation.py
+"""
+Columnar validation of price frames.
+models.PriceRow checks one row at a time through pydantic and Decimal,
+which is far too slow for millions of bars. validate_prices() runs the same
+kind of checks (and a few frame-level ones) as NumPy array operations over
+whole frames, single-ticker or long (ticker, date) panels:
+
+  - ohlc_bounds      low <= open/close <= high violated
+  - negative_volume  volume < 0
+  - duplicate_date   a later row has the same (ticker, date); the last one wins
+  - out_of_order     date earlier than the previous row's
+  - nan_run          a missing open/high/low/close (runs are reported by length)
+  - calendar_gap     more than `max_missing_sessions` weekday sessions (minus
+                     `holidays`) missing before this bar
+
+Policies: "warn" logs the report and passes the frame through unchanged,
+"drop" removes invalid rows, "repair" fixes what can be fixed (sorts,
+de-duplicates, widens high/low to cover open/close, blanks negative volume,
+forward-fills NaN runs up to `max_fill_bars`) and drops the rest, "fail"
+raises PriceValidationError. Calendar gaps are only reported (and fail
+under "fail"): there is no row to drop or repair.
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CHECKS = ["ohlc_bounds", "negative_volume", "duplicate_date", "out_of_order", "nan_run", "calendar_gap"]
+POLICIES = ("off", "warn", "drop", "repair", "fail")
+PRICE_COLUMNS = ["open", "high", "low", "close"]
+
+DEFAULT_VALIDATION_SETTINGS: Dict[str, Any] = {
+    "policy": "warn",
+    "max_missing_sessions": 3,
+    "max_fill_bars": 5,
+    "holidays": [],
+}
+
+
+class ValidationReport:
+    """Counts and sample offending rows per check for one validated frame."""
+
+    def __init__(self, rows: int, policy: str, counts: Dict[str, int], samples: Dict[str, List[dict]],
+                 longest_nan_run: int = 0, rows_out: Optional[int] = None):
+        self.rows = rows
+        self.policy = policy
+        self.counts = counts
+        self.samples = samples
+        self.longest_nan_run = longest_nan_run
+        self.rows_out = rows if rows_out is None else rows_out
+
+    @property
+    def ok(self) -> bool:
+        return not any(self.counts.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"rows": self.rows, "rows_out": self.rows_out, "policy": self.policy,
+                "counts": {k: v for k, v in self.counts.items() if v},
+                "longest_nan_run": self.longest_nan_run,
+                "samples": {k: v for k, v in self.samples.items() if v}}
+
+    def __str__(self) -> str:
+        issues = ", ".join(f"{v} {k}" for k, v in self.counts.items() if v) or "no issues"
+        return f"{self.rows} rows ({issues}); {self.rows_out} rows kept under {self.policy!r}"
+
+
+class PriceValidationError(ValueError):
+    """Raised by the 'fail' policy; carries the ValidationReport."""
+
+    def __init__(self, report: ValidationReport):
+        super().__init__(f"Invalid price data: {report}")
+        self.report = report
+
+
+def settings_from_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """The `validation` config section merged over DEFAULT_VALIDATION_SETTINGS."""
+    settings = {**DEFAULT_VALIDATION_SETTINGS, **(cfg.get("validation") or {})}
+    if settings["policy"] not in POLICIES:
+        raise ValueError(f"Unknown validation policy {settings['policy']!r}; expected one of {POLICIES}")
+    return settings
+
+
+def _day_numbers(dates: pd.Series) -> np.ndarray:
+    """Dates as datetime64[D] (tz-aware ones by their local calendar day)."""
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates)
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    return dates.to_numpy().astype("datetime64[D]")
+
+
+def _group_codes(df: pd.DataFrame, by: Optional[str]) -> np.ndarray:
+    if by is None or by not in df.columns:
+        return np.zeros(len(df), dtype=np.int64)
+    return pd.factorize(df[by], sort=False)[0].astype(np.int64)
+
+
+def _runs(flags: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """Length of the run of True each row belongs to (0 for False rows); runs restart at `starts`."""
+    n = len(flags)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    new_run = flags & (starts | np.r_[True, ~flags[:-1]])
+    run_id = np.cumsum(new_run) - 1
+    lengths = np.bincount(run_id[flags], minlength=int(new_run.sum()))
+    out = np.zeros(n, dtype=np.int64)
+    out[flags] = lengths[run_id[flags]]
+    return out
+
+
+def check_prices(
+    df: pd.DataFrame,
+    by: Optional[str] = "ticker",
+    max_missing_sessions: int = 3,
+    holidays: Iterable[Any] = (),
+) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """
+    Boolean masks (aligned with the rows of `df`) for every check in CHECKS,
+    plus the NaN run length of each row. Rows are grouped by the `by` column
+    when present (a long panel), otherwise the frame is one series.
+    """
+    n = len(df)
+    cols = {c: df[c].to_numpy(dtype=np.float64, na_value=np.nan) if c in df.columns else np.full(n, np.nan)
+            for c in PRICE_COLUMNS + ["volume"]}
+    o, h, lo, c = (cols[k] for k in PRICE_COLUMNS)
+    masks: Dict[str, np.ndarray] = {}
+    # NaN compares False, so missing prices never count as a bounds violation
+    masks["ohlc_bounds"] = (lo > h) | (lo > o) | (lo > c) | (o > h) | (c > h)
+    masks["negative_volume"] = cols["volume"] < 0
+
+    days = _day_numbers(df["date"])
+    codes = _group_codes(df, by)
+    masks["duplicate_date"] = pd.DataFrame({"g": codes, "d": days}).duplicated(keep="last").to_numpy()
+
+    # original row order within each group
+    order = np.argsort(codes, kind="stable")
+    same = codes[order][1:] == codes[order][:-1]
+    out_of_order = np.zeros(n, dtype=bool)
+    out_of_order[order[1:]] = same & (days[order][1:] < days[order][:-1])
+    masks["out_of_order"] = out_of_order
+
+    # date order within each group for runs and gaps
+    order = np.lexsort((days, codes))
+    sc, sd = codes[order], days[order]
+    starts = np.r_[True, sc[1:] != sc[:-1]] if n else np.zeros(0, dtype=bool)
+    missing = np.isnan(o) | np.isnan(h) | np.isnan(lo) | np.isnan(c)
+    run_len = np.zeros(n, dtype=np.int64)
+    run_len[order] = _runs(missing[order], starts)
+    masks["nan_run"] = missing
+
+    gap = np.zeros(n, dtype=bool)
+    if n > 1:
+        holidays = np.asarray([np.datetime64(pd.Timestamp(d).date(), "D") for d in holidays], dtype="datetime64[D]")
+        known = ~np.isnat(sd[:-1]) & ~np.isnat(sd[1:])
+        skipped = np.zeros(n - 1, dtype=np.int64)
+        skipped[known] = np.busday_count(sd[:-1][known] + np.timedelta64(1, "D"), sd[1:][known], holidays=holidays)
+        gap[order[1:]] = ~starts[1:] & (skipped > max_missing_sessions)
+    masks["calendar_gap"] = gap
+    return masks, run_len
+
+
+def _samples(df: pd.DataFrame, mask: np.ndarray, size: int) -> List[dict]:
+    if size <= 0 or not mask.any():
+        return []
+    rows = df.iloc[np.flatnonzero(mask)[:size]]
+    keep = [c for c in ["ticker", "date", *PRICE_COLUMNS, "volume"] if c in rows.columns]
+    rows = rows[keep].assign(row=rows.index)
+    if "date" in keep:
+        rows["date"] = rows["date"].astype(str)
+    return rows.astype(object).where(rows.notna(), None).to_dict("records")
+
+
+def _repair(df: pd.DataFrame, masks: Dict[str, np.ndarray], run_len: np.ndarray,
+            by: Optional[str], max_fill_bars: int) -> pd.DataFrame:
+    fixable = masks["nan_run"] & (run_len <= max_fill_bars)
+    out = df.loc[~masks["duplicate_date"] & (~masks["nan_run"] | fixable)]
+    keys = [by, "date"] if by in out.columns else ["date"]
+    out = out.sort_values(keys, kind="stable", ignore_index=True)
+    cols = [c for c in PRICE_COLUMNS if c in out.columns]
+    if "close" in out.columns:
+        group = out[by] if by in out.columns else np.zeros(len(out))
+        out["close"] = out["close"].groupby(group, sort=False).ffill()
+        for col in cols:
+            out[col] = out[col].fillna(out["close"])
+        # runs at the start of a series have no earlier close to carry forward
+        out = out[out["close"].notna()].reset_index(drop=True)
+    if {"open", "high", "low", "close"} <= set(out.columns):
+        body_hi = np.fmax(out["open"].to_numpy(np.float64), out["close"].to_numpy(np.float64))
+        body_lo = np.fmin(out["open"].to_numpy(np.float64), out["close"].to_numpy(np.float64))
+        out["high"] = np.fmax(np.fmax(out["high"].to_numpy(np.float64), out["low"].to_numpy(np.float64)), body_hi)
+        out["low"] = np.fmin(np.fmin(out["low"].to_numpy(np.float64), out["high"].to_numpy(np.float64)), body_lo)
+    if "volume" in out.columns:
+        negative = out["volume"] < 0
+        if negative.any():
+            out["volume"] = out["volume"].astype("float64").mask(negative)
+    return out
+
+
+def validate_prices(
+    df: pd.DataFrame,
+    policy: str = "warn",
+    by: Optional[str] = "ticker",
+    max_missing_sessions: int = 3,
+    max_fill_bars: int = 5,
+    holidays: Iterable[Any] = (),
+    sample_size: int = 5,
+) -> Tuple[pd.DataFrame, ValidationReport]:
+    """
+    Check a price frame ('date' plus open/high/low/close/volume, optionally
+    a `by` ticker column) and apply `policy`. Returns the (possibly new)
+    frame and a ValidationReport with per-check counts and up to
+    `sample_size` offending rows each (original index in 'row').
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown validation policy {policy!r}; expected one of {POLICIES}")
+    if policy == "off":
+        return df, ValidationReport(len(df), policy, {}, {})
+    if "date" not in df.columns:
+        raise ValueError("prices must contain 'date' column")
+    masks, run_len = check_prices(df, by, max_missing_sessions, holidays)
+    counts = {k: int(masks[k].sum()) for k in CHECKS}
+    samples = {k: _samples(df, masks[k], sample_size) for k in CHECKS}
+    report = ValidationReport(len(df), policy, counts, samples, int(run_len.max(initial=0)))
+    if report.ok:
+        return df, report
+
+    if policy == "fail":
+        raise PriceValidationError(report)
+    if policy == "drop":
+        bad = masks["ohlc_bounds"] | masks["negative_volume"] | masks["duplicate_date"] | masks["nan_run"]
+        keys = [by, "date"] if by in df.columns else ["date"]
+        df = df.loc[~bad].sort_values(keys, kind="stable", ignore_index=True)
+    elif policy == "repair":
+        df = _repair(df, masks, run_len, by, max_fill_bars)
+    report.rows_out = len(df)
+    logger.warning("Price validation: %s", report)
+    return df, report
@@ -1,7 +1,10 @@
 # tests/conftest.py
+import functools
 import pytest
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
+from src import data_fetcher
 
 @pytest.fixture
 def simple_price_df():
@@ -20,3 +23,37 @@ def simple_price_df():
         price = close
     df = pd.DataFrame(rows)
     return df
+
+
+def _price_fetcher(n_bars):
+    dates = pd.date_range("2020-01-01", periods=n_bars, freq="B", tz="America/New_York")
+    close = 100 + np.cumsum(np.sin(np.arange(n_bars) / 20.0))
+    prices = pd.DataFrame({"date": dates, "open": close, "high": close + 1, "low": close - 1,
+                           "close": close, "adj_close": close, "volume": 1000})
+
+    def fetch(ticker, period=None, start=None, cache=None, **kwargs):
+        df = prices if start is None else prices[prices["date"].dt.date >= start]
+        return {"ticker": ticker, "prices": df.reset_index(drop=True), "fundamentals": [], "source_info": {"used": "none"}}
+    return fetch
+
+
+@pytest.fixture
+def fake_fetcher(monkeypatch):
+    """
+    Replace data_fetcher.fetch_stock_data for the test. fake_fetcher(n) serves
+    the same n smooth business-day bars for every ticker, without fundamentals;
+    fake_fetcher(stub) sends the yfinance calls to a benchmarks.synthetic
+    SyntheticYFinance instead. An optional wrap(fetch, ticker, **kwargs) sits
+    in front of that source (to fail, alter or record calls). Returns the source.
+    """
+    real = data_fetcher.fetch_stock_data
+
+    def install(source, wrap=None):
+        if isinstance(source, int):
+            fetch = _price_fetcher(source)
+        else:
+            def fetch(ticker, **kwargs):
+                return real(ticker, ticker_factory=source, use_cache=False, **kwargs)
+        monkeypatch.setattr(data_fetcher, "fetch_stock_data", fetch if wrap is None else functools.partial(wrap, fetch))
+        return fetch
+    return install
@@ -0,0 +1,82 @@
+# tests/test_backtest.py
+import numpy as np
+import pandas as pd
+from src.backtest import close_matrix, parse_windows, summarize, sweep
+from src.signals import detect_death_cross, detect_golden_crossover
+from benchmarks.synthetic import synthetic_history
+
+
+def _reference(close: pd.Series, fast: int, slow: int, cost: float = 0.0) -> dict:
+    """Bar-by-bar loop over the signals.py crosses."""
+    df = pd.DataFrame({
+        "date": close.index,
+        "f": close.rolling(fast, min_periods=1).mean().to_numpy(),
+        "s": close.rolling(slow, min_periods=1).mean().to_numpy(),
+    })
+    golden = set(detect_golden_crossover(df, "f", "s"))
+    death = set(detect_death_cross(df, "f", "s"))
+    equity, peak, max_dd, pos, trades, wins, entry_equity = 1.0, 1.0, 0.0, False, 0, 0, 1.0
+    prices = close.to_numpy()
+    for i, day in enumerate(df["date"].dt.date.astype(str)):
+        if pos:
+            equity *= prices[i] / prices[i - 1]
+        if day in golden and not pos:
+            entry_equity, pos, trades = equity, True, trades + 1
+            equity *= 1 - cost
+        elif day in death and pos:
+            equity *= 1 - cost
+            pos, wins = False, wins + (equity > entry_equity)
+        peak = max(peak, equity)
+        max_dd = max(max_dd, 1 - equity / peak)
+    if pos:
+        wins += equity > entry_equity
+    return {"total_return": equity - 1, "trades": trades, "max_drawdown": max_dd,
+            "hit_rate": wins / trades if trades else np.nan}
+
+
+def test_sweep_matches_per_ticker_reference():
+    closes = pd.DataFrame({t: synthetic_history(t, 600)["Close"] for t in ["AAA", "BBB", "CCC"]})
+    closes.index = closes.index.tz_localize(None)
+    closes.iloc[:150, 1] = np.nan  # a later listing
+
+    results = sweep(closes, [5, 20, 50], [30, 200], cost_bps=10)
+    assert len(results) == 5 * 3  # 20/30 ... (50, 30) is skipped
+    for row in results.itertuples():
+        ref = _reference(closes[row.ticker].dropna(), row.fast, row.slow, cost=0.001)
+        assert row.trades == ref["trades"]
+        assert np.isclose(row.total_return, ref["total_return"])
+        assert np.isclose(row.max_drawdown, ref["max_drawdown"])
+        assert np.isclose(row.hit_rate, ref["hit_rate"], equal_nan=True)
+
+
+def test_close_matrix_and_summary():
+    long = pd.DataFrame({
+        "ticker": ["AAA"] * 3 + ["BBB"] * 2,
+        "date": pd.to_datetime(["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-02", "2024-01-03"]),
+        "close": [1.0, 2.0, 3.0, 5.0, 4.0],
+    })
+    wide = close_matrix(long)
+    assert list(wide.columns) == ["AAA", "BBB"] and np.isnan(wide.iloc[0, 1])
+
+    # choppy uptrends: the slower pair trades less and rides the trend, so it ranks first
+    choppy = pd.DataFrame({"AAA": [1.0, 3, 2, 4, 3, 5, 4, 6, 5, 7], "BBB": [2.0, 1, 2, 3, 2, 1, 2, 3, 4, 3]},
+                          index=pd.bdate_range("2024-01-01", periods=10))
+    summary = summarize(sweep(choppy, [1], [2, 3]))
+    assert list(summary[["fast", "slow"]].itertuples(index=False, name=None)) == [(1, 3), (1, 2)]
+    assert summary["total_return"].iloc[0] > summary["total_return"].iloc[1]
+    assert (summary["tickers"] == 2).all()
+    assert parse_windows("10:30:10") == [10, 20, 30] and parse_windows("50,20") == [20, 50]
+
+
+def test_load_closes_from_sqlite(tmp_path):
+    from src.backtest import load_closes
+    from src.database import get_engine, init_db, save_daily_metrics
+
+    engine = get_engine(str(tmp_path / "t.db"))
+    init_db(engine)
+    dates = pd.date_range("2024-01-01", periods=4)
+    save_daily_metrics(pd.DataFrame({"ticker": ["AAA"] * 4 + ["BBB"] * 4, "date": list(dates) * 2,
+                                     "close": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0]}), engine=engine)
+    wide = load_closes(engine, tickers=["BBB"], start=dates[1].date())
+    assert list(wide.columns) == ["BBB"] and wide["BBB"].tolist() == [6.0, 7.0, 8.0]
+    assert load_closes(engine).shape == (4, 2)
@@ -0,0 +1,21 @@
+# tests/test_benchmarks.py
+import pandas as pd
+from benchmarks.run_suite import compare, run_scale
+from benchmarks.synthetic import synthetic_history
+
+
+def test_synthetic_history_is_deterministic():
+    a = synthetic_history("AAA", 300)
+    pd.testing.assert_frame_equal(a, synthetic_history("AAA", 300))
+    assert not a["Close"].equals(synthetic_history("BBB", 300)["Close"])
+    assert (a["High"] >= a[["Open", "Close"]].max(axis=1)).all()
+
+
+def test_run_scale_reports_every_stage_and_flags_regressions():
+    result = run_scale(2, years=1, trace_memory=False)
+    assert result["rows"] == 2 * 252
+    assert set(result["stages"]) == {"fetch", "process", "signals", "save", "export"}
+
+    slower = {"results": [{**result, "stages": {s: {"seconds": v["seconds"] * 2 + 1} for s, v in result["stages"].items()}}]}
+    assert compare({"results": [result]}, {"results": [result]}, 0.2) == []
+    assert len(compare(slower, {"results": [result]}, 0.2)) == 5
@@ -0,0 +1,99 @@
+# tests/test_cache.py
+import os
+import time
+import pandas as pd
+import pytest
+from src.cache import CachedTicker, CacheMiss, ResponseCache
+
+
+class CountingTicker:
+    calls = 0
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+
+    def history(self, **kwargs):
+        CountingTicker.calls += 1
+        return pd.DataFrame({"Close": [1.0, 2.0]})
+
+    @property
+    def info(self):
+        CountingTicker.calls += 1
+        return {"marketCap": 1}
+
+
+def test_cached_ticker_hits_disk_and_replays_offline(tmp_path):
+    CountingTicker.calls = 0
+    cache = ResponseCache(tmp_path)
+    t = CachedTicker("NVDA", cache, CountingTicker)
+    first = t.history(period="5y", auto_adjust=False)
+    second = CachedTicker("NVDA", ResponseCache(tmp_path), CountingTicker).history(period="5y", auto_adjust=False)
+    pd.testing.assert_frame_equal(first, second)
+    assert CountingTicker.calls == 1
+
+    offline = CachedTicker("NVDA", ResponseCache(tmp_path, ttl={"history": 0}, offline=True), CountingTicker)
+    offline.history(period="5y", auto_adjust=False)  # expired, but offline ignores TTL
+    with pytest.raises(CacheMiss):
+        offline.info
+    assert CountingTicker.calls == 1
+
+
+def test_ttl_expiry_and_lru_eviction(tmp_path):
+    cache = ResponseCache(tmp_path, ttl={"info": 0})
+    cache.get("A", "-", "info", lambda: 1)
+    time.sleep(0.01)
+    assert cache.get("A", "-", "info", lambda: 2) == 2
+
+    small = ResponseCache(tmp_path / "lru", max_bytes=10**9)
+    for i, name in enumerate("ABC"):
+        small.get(name, "-", "history", lambda: "x" * 1000)
+        p = small._path(name, "-", "history")
+        os.utime(p, (i, i))
+    small.max_bytes = 2500
+    small.evict()
+    assert not small._path("A", "-", "history").exists()
+    assert small._path("C", "-", "history").exists()
+
+
+def test_writes_track_size_and_only_sweep_when_over_budget(monkeypatch, tmp_path):
+    ResponseCache(tmp_path).get("OLD", "-", "info", lambda: "x" * 1000)
+    cache = ResponseCache(tmp_path, max_bytes=10**9)
+    assert cache._bytes > 1000  # picked up from the scan at open
+    scans = []
+    real = cache._entries
+    monkeypatch.setattr(cache, "_entries", lambda: scans.append(1) or real())
+    for name in "ABCDE":
+        cache.get(name, "-", "history", lambda: "x" * 1000)
+    cache.get("A", "-", "history", lambda: "y")  # hit: no write
+    assert not scans
+    assert cache._bytes == sum(p.stat().st_size for p in tmp_path.glob("*.pkl"))
+
+    cache.max_bytes = cache._bytes + 500
+    cache.get("F", "-", "history", lambda: "x" * 1000)
+    assert scans and cache._bytes <= cache.max_bytes
+    assert not cache._path("OLD", "-", "info").exists()
+
+
+def test_cache_is_off_unless_enabled(tmp_path):
+    section = {"cache": {"dir": str(tmp_path)}}
+    assert ResponseCache.from_config(section) is None
+    assert ResponseCache.from_config(section, offline=True) is not None
+
+
+def test_offline_incremental_fetch_cuts_the_cached_history(tmp_path):
+    from datetime import date
+    from benchmarks.synthetic import SyntheticYFinance
+    from src.data_fetcher import fetch_stock_data
+
+    stub = SyntheticYFinance(years=1)
+    full = fetch_stock_data("AAA", period="1y", cache=ResponseCache(tmp_path), ticker_factory=stub,
+                            fundamentals=False)["prices"]
+    calls = stub.calls
+    start = date(2025, 9, 1)
+    offline = ResponseCache(tmp_path, offline=True)
+    new = fetch_stock_data("AAA", period="1y", start=start, cache=offline, ticker_factory=stub,
+                           fundamentals=False)["prices"]
+    assert stub.calls == calls and len(new) > 0
+    pd.testing.assert_frame_equal(new, full[full["date"].dt.date >= start].reset_index(drop=True))
+    with pytest.raises(CacheMiss):
+        fetch_stock_data("AAA", period="2y", start=start, cache=offline, ticker_factory=stub, fundamentals=False)
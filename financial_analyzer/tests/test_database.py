@@ -0,0 +1,153 @@
+# tests/test_database.py
+from datetime import date
+import numpy as np
+import pandas as pd
+from src.database import get_engine, init_db, save_daily_metrics, save_signal_events
+
+
+def test_bulk_upsert_is_idempotent(tmp_path):
+    engine = get_engine(str(tmp_path / "t.db"))
+    init_db(engine)
+    df = pd.DataFrame({
+        "ticker": "TEST",
+        "date": pd.date_range("2023-01-02", periods=5),
+        "close": [1.0, 2.0, np.nan, 4.0, 5.0],
+        "volume": [10, 20, 30, 40, 50],
+    })
+    assert save_daily_metrics(df, engine=engine, chunksize=2) == 5
+    df["close"] = df["close"] * 10
+    save_daily_metrics(df, engine=engine, chunksize=2)
+
+    out = pd.read_sql("SELECT date, close, volume FROM daily_metrics ORDER BY date", engine)
+    assert len(out) == 5
+    assert out["date"].iloc[0] == "2023-01-02"
+    assert out["close"].isna().sum() == 1
+    assert out["close"].iloc[-1] == 50.0
+
+    events = [{"date": "2023-01-03T00:00:00", "signal_type": "golden_cross", "meta": {}}] * 2
+    assert save_signal_events("TEST", events, engine=engine) == 2
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM signal_events").scalar() == 1
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+
+
+def test_sql_crossover_scan_matches_pandas_signals(tmp_path):
+    from src.database import scan_crossovers
+    from src.signals import detect_death_cross, detect_golden_crossover
+
+    engine = get_engine(str(tmp_path / "t.db"))
+    init_db(engine)
+    x = np.arange(200)
+    frames = []
+    for name, phase in (("AAA", 0.0), ("BBB", 1.5)):
+        frames.append(pd.DataFrame({
+            "ticker": name,
+            "date": pd.date_range("2023-01-02", periods=200),
+            "sma50": np.sin(x / 10.0 + phase),
+            "sma200": 0.0,
+        }))
+    save_daily_metrics(pd.concat(frames, ignore_index=True), engine=engine)
+
+    inserted = scan_crossovers(engine)
+    expected = sum(len(detect_golden_crossover(f)) + len(detect_death_cross(f)) for f in frames)
+    assert inserted == expected > 0
+    assert scan_crossovers(engine) == 0  # idempotent
+
+    golden_aaa = detect_golden_crossover(frames[0])
+    stored = pd.read_sql(
+        "SELECT date FROM signal_events WHERE ticker='AAA' AND signal_type='golden_cross' ORDER BY date", engine
+    )["date"].tolist()
+    assert stored == golden_aaa
+
+    cutoff = pd.Timestamp(golden_aaa[-1]).date()
+    assert scan_crossovers(engine, tickers=["AAA"], start=cutoff, replace=True) >= 1
+
+    # same scan over a plain sqlite3 connection (the ORM-free CLI path)
+    from src.database import connect
+    conn = connect(str(tmp_path / "t.db"), {})
+    assert scan_crossovers(conn, tickers=["AAA"], start=cutoff, replace=True) >= 1
+    assert scan_crossovers(conn) == 0
+    conn.close()
+
+
+def test_fundamentals_upsert_versions_changes_only(tmp_path):
+    from src.database import load_fundamentals, save_fundamentals
+
+    engine = get_engine(str(tmp_path / "t.db"))
+    init_db(engine)
+    q = [{"as_of": "2024-03-31 00:00:00", "total_stockholder_equity": 10, "market_cap": 100},
+         {"as_of": "2024-06-30", "total_stockholder_equity": 11}]
+    assert save_fundamentals("AAA", q, engine=engine, source="quarterly_balance_sheet") == 2
+    assert save_fundamentals("AAA", q, engine=engine) == 0  # unchanged quarters are not rewritten
+    assert save_fundamentals("AAA", [{**q[1], "total_stockholder_equity": 12}], engine=engine) == 1
+    save_fundamentals("BBB", q[:1], engine=engine)
+
+    df = load_fundamentals(engine)
+    assert list(zip(df["ticker"], df["as_of"].dt.strftime("%Y-%m-%d"), df["version"])) == [
+        ("AAA", "2024-03-31", 1), ("AAA", "2024-06-30", 2), ("BBB", "2024-03-31", 1)]
+    assert df.loc[1, "total_stockholder_equity"] == 12
+    assert len(load_fundamentals(engine, ["BBB"])) == 1
+
+
+def test_latest_metrics_snapshot_follows_newest_rows(tmp_path):
+    import sqlite3
+    from src.database import refresh_latest_metrics
+    from src.indicators import pct_from_high, rolling_max
+
+    engine = get_engine(str(tmp_path / "t.db"))
+    init_db(engine)
+    dates = pd.bdate_range("2023-01-02", periods=300)
+    close = 100 + 10 * np.sin(np.arange(300) / 20)
+    df = pd.DataFrame({"ticker": "TEST", "date": dates, "close": close, "volume": 1})
+    save_daily_metrics(df.iloc[:280], engine=engine)
+    # a backfill of older bars leaves the snapshot alone, newer bars move it
+    save_daily_metrics(df.iloc[:10].assign(close=1.0), engine=engine)
+    conn = sqlite3.connect(tmp_path / "t.db")
+    assert conn.execute("SELECT date, close FROM latest_metrics").fetchall() == [("2024-01-26", close[279])]
+    save_daily_metrics(df.iloc[250:], engine=engine)
+
+    stored = pd.read_sql("SELECT close FROM daily_metrics ORDER BY date", conn)
+    row = conn.execute("SELECT ticker, date, high_52w, pct_from_high FROM latest_metrics").fetchall()
+    assert row[0][:2] == ("TEST", "2024-02-23")
+    assert np.isclose(row[0][2], rolling_max(stored).iloc[-1])
+    assert np.isclose(row[0][3], pct_from_high(stored).iloc[-1])
+
+    conn.execute("DELETE FROM latest_metrics")
+    conn.commit()
+    assert refresh_latest_metrics(conn) == 1
+    assert conn.execute("SELECT ticker, date, high_52w, pct_from_high FROM latest_metrics").fetchall() == row
+
+
+def test_rollups_match_resample_and_follow_new_days(tmp_path):
+    from src.database import load_rollups, refresh_rollups
+
+    engine = get_engine(str(tmp_path / "t.db"))
+    init_db(engine)
+    rng = np.random.default_rng(1)
+    dates = pd.bdate_range("2023-01-02", periods=400)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates))))
+    df = pd.DataFrame({"ticker": "TEST", "date": dates, "open": close * 1.001, "high": close * 1.01,
+                       "low": close * 0.99, "close": close, "volume": rng.integers(1, 1000, len(dates))})
+    save_daily_metrics(df.iloc[:390], engine=engine)
+    before = load_rollups(engine, "monthly")
+    # new days (one into an already open month) only rewrite the open periods
+    save_daily_metrics(df.iloc[390:], engine=engine)
+
+    daily = df.set_index("date")
+    for timeframe, rule, label in (("weekly", "W-SUN", pd.Timedelta(days=6)), ("monthly", "MS", pd.Timedelta(0))):
+        ref = daily.resample(rule).agg({"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"})
+        bars = load_rollups(engine, timeframe, ["TEST"])
+        assert (bars["period"] == ref.index - label).all()
+        for col in ("open", "high", "low", "close"):
+            assert np.allclose(bars[col], ref[col])
+        assert (bars["volume"].to_numpy() == ref["volume"].to_numpy()).all()
+        assert np.allclose(bars["sma10"], ref["close"].rolling(10, min_periods=1).mean())
+        assert np.allclose(bars["sma40"], ref["close"].rolling(40, min_periods=1).mean())
+        assert np.allclose(bars["pct_change"].iloc[1:], ref["close"].pct_change().iloc[1:])
+    after = load_rollups(engine, "monthly")
+    pd.testing.assert_frame_equal(after.iloc[:len(before) - 1], before.iloc[:-1])
+    assert after["last_date"].iloc[-1] == dates[-1]
+
+    refresh_rollups(engine)
+    pd.testing.assert_frame_equal(load_rollups(engine, "monthly"), after)
+    assert load_rollups(engine, "weekly", tickers=[], start=date(2024, 1, 1)).empty
@@ -0,0 +1,59 @@
+# tests/test_export.py
+import json
+import pandas as pd
+import pytest
+from datetime import date
+from src.database import get_engine, init_db, save_daily_metrics, save_signal_events
+from src.export import export, iter_chunks, select_columns
+
+
+def _metrics(ticker, n):
+    return pd.DataFrame({"ticker": ticker, "date": pd.bdate_range("2024-01-01", periods=n),
+                         "close": [float(i) for i in range(n)], "volume": 100, "sma50": 1.5, "sma200": None})
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = get_engine(str(tmp_path / "t.db"))
+    init_db(engine)
+    save_daily_metrics(pd.concat([_metrics("AAA", 30), _metrics("BBB", 20)]), engine=engine)
+    save_signal_events("AAA", [{"date": "2024-01-05", "signal_type": "golden_cross", "meta": {"k": 1}}], engine=engine)
+    return engine
+
+
+def test_ndjson_export_streams_chunks_with_filters(engine, tmp_path):
+    chunks = list(iter_chunks(engine, columns=["close"], chunk_rows=8))
+    assert [len(c) for c in chunks] == [8] * 6 + [2]
+    assert list(chunks[0].columns) == ["ticker", "date", "close"]
+
+    out = tmp_path / "m.ndjson"
+    rows = export(str(out), engine, columns=["sma200", "close"], tickers=["BBB"],
+                  start=date(2024, 1, 3), end=date(2024, 1, 10), chunk_rows=4)
+    lines = [json.loads(line) for line in out.read_text().splitlines()]
+    assert rows == len(lines) == 6
+    assert lines[0] == {"ticker": "BBB", "date": "2024-01-03", "sma200": None, "close": 2.0}
+
+    export(str(tmp_path / "s.ndjson"), engine, dataset="signals")
+    assert json.loads((tmp_path / "s.ndjson").read_text())["meta"] == {"k": 1}
+    with pytest.raises(ValueError):
+        select_columns("metrics", ["nope"])
+
+
+def test_arrow_export_matches_ndjson_and_parquet_source(engine, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    from src.storage import ParquetStore
+
+    out = tmp_path / "m.arrow"
+    assert export(str(out), engine, chunk_rows=7) == 50
+    table = pa.ipc.open_file(str(out)).read_all()
+    assert table.schema.field("date").type == pa.date32()
+    assert table.schema.field("volume").type == pa.int64()
+
+    store = ParquetStore(tmp_path / "pq")
+    store.save_daily_metrics(pd.concat([_metrics("AAA", 30), _metrics("BBB", 20)]))
+    export(str(tmp_path / "p.arrow"), store, chunk_rows=7)
+    from_parquet = pa.ipc.open_file(str(tmp_path / "p.arrow")).read_all().to_pandas()
+    pd.testing.assert_frame_equal(from_parquet, table.to_pandas())
+
+    assert export(str(tmp_path / "empty.arrow"), engine, tickers=["ZZZ"], columns=["close"]) == 0
+    assert pa.ipc.open_file(str(tmp_path / "empty.arrow")).schema.names == ["ticker", "date", "close"]
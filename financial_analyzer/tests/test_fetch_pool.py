@@ -0,0 +1,85 @@
+# tests/test_fetch_pool.py
+import threading
+import pandas as pd
+import pytest
+from src.fetch_pool import ConcurrentFetcher, TokenBucket
+
+
+class FakeTicker:
+    """Minimal yfinance stand-in: history blocks on `gate`, first `fail` calls raise."""
+    calls = 0
+    fail = 0
+    gate = None
+    lock = threading.Lock()
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def history(self, **kwargs):
+        with FakeTicker.lock:
+            FakeTicker.calls += 1
+            failing = FakeTicker.fail > 0
+            FakeTicker.fail -= 1
+        if failing:
+            raise ConnectionError("transient")
+        if FakeTicker.gate is not None:
+            FakeTicker.gate.wait(5)
+        idx = pd.date_range("2024-01-01", periods=3, name="Date")
+        return pd.DataFrame({"Close": [1.0, 2.0, 3.0], "Volume": [1, 2, 3]}, index=idx)
+
+    quarterly_balance_sheet = pd.DataFrame()
+    balance_sheet = pd.DataFrame()
+    info = {"sharesOutstanding": 10}
+
+
+@pytest.fixture(autouse=True)
+def reset_fake():
+    FakeTicker.calls, FakeTicker.fail, FakeTicker.gate = 0, 0, None
+
+
+def _fetcher(**kw):
+    return ConcurrentFetcher(max_workers=4, rate_per_sec=None, backoff_base=0.001,
+                             ticker_factory=FakeTicker, use_cache=False, **kw)
+
+
+def test_fetch_many_and_coalescing():
+    FakeTicker.gate = threading.Event()
+    with _fetcher() as f:
+        a = f.submit("NVDA")
+        b = f.submit("NVDA")
+        assert a is b
+        # a caller that already stores other quarters needs its own filtering
+        assert f.submit("NVDA", known_quarters=["2024-03-31"]) is not a
+        FakeTicker.gate.set()
+        raw = a.result()
+        assert list(raw["prices"].columns) == ["date", "close", "volume"]
+        assert raw["source_info"]["used"] == "info"
+        assert set(f.fetch_many(["AAPL", "MSFT"])) == {"AAPL", "MSFT"}
+    assert FakeTicker.calls == 4
+
+
+def test_retries_with_backoff_then_succeeds():
+    FakeTicker.fail = 2
+    with _fetcher(retries=3) as f:
+        assert len(f.fetch("NVDA")["prices"]) == 3
+    assert FakeTicker.calls == 3
+
+    FakeTicker.calls, FakeTicker.fail = 0, 5
+    with _fetcher(retries=1) as f:
+        with pytest.raises(ConnectionError):
+            f.fetch("NVDA")
+    assert FakeTicker.calls == 2
+
+
+def test_token_bucket_waits_for_refill():
+    now = [0.0]
+    slept = []
+
+    def sleep(s):
+        slept.append(s)
+        now[0] += s
+
+    bucket = TokenBucket(rate=2.0, burst=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(4):
+        bucket.acquire()
+    assert sum(slept) == pytest.approx(1.0)
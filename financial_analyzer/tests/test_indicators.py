@@ -0,0 +1,54 @@
+# tests/test_indicators.py
+import numpy as np
+import pandas as pd
+import pytest
+from src.indicators import compute_indicators, normalize_specs, required_lookback
+
+
+def test_registry_kernels_match_pandas(simple_price_df):
+    out = compute_indicators(simple_price_df, ["sma:50", "rolling_max:252", "ema:20", "rsi:14"])
+    close = simple_price_df["close"]
+    pd.testing.assert_series_equal(out["sma50"], close.rolling(50, min_periods=1).mean(), check_names=False)
+    pd.testing.assert_series_equal(out["rolling_max252"], close.rolling(252, min_periods=1).max(), check_names=False)
+    assert out["rsi14"].dropna().between(0, 100).all()
+    assert required_lookback(["sma:50", "rsi:14"]) == 50
+
+
+def test_ratio_kernels_are_vectorized_and_guard_zero():
+    df = pd.DataFrame({
+        "close": [10.0, 10.0, 10.0],
+        "total_stockholder_equity": [100.0, 100.0, np.nan],
+        "shares_outstanding": [10.0, 0.0, 10.0],
+        "market_cap": [1000.0, np.nan, 1000.0],
+        "total_debt": [50.0, 50.0, 50.0],
+        "cash_and_cash_equivalents": [20.0, 20.0, 20.0],
+    })
+    out = compute_indicators(df, normalize_specs(["bvps", "price_to_book", "enterprise_value"]))
+    assert out["bvps"].tolist()[0] == 10.0 and out["bvps"].isna().tolist()[1:] == [True, True]
+    assert out["price_to_book"].iloc[0] == 1.0
+    assert out["enterprise_value"].iloc[0] == 1030.0 and np.isnan(out["enterprise_value"].iloc[1])
+
+
+def test_unknown_indicator_raises():
+    with pytest.raises(ValueError):
+        compute_indicators(pd.DataFrame({"close": [1.0]}), ["nope:3"])
+
+
+def test_pct_from_high_reuses_the_rolling_max_column(monkeypatch, simple_price_df):
+    import functools
+    from src import indicators
+
+    calls = []
+    orig = indicators.INDICATORS["rolling_max"]
+
+    @functools.wraps(orig)
+    def counted(*args, **kwargs):
+        calls.append(args[1:])
+        return orig(*args, **kwargs)
+
+    monkeypatch.setitem(indicators.INDICATORS, "rolling_max", counted)
+    out = compute_indicators(simple_price_df, {"52w_high": "rolling_max:252:close", "pct": "pct_from_high"})
+    close = simple_price_df["close"]
+    pd.testing.assert_series_equal(out["pct"], (close / close.rolling(252, min_periods=1).max() - 1) * 100,
+                                   check_names=False)
+    assert len(calls) == 1
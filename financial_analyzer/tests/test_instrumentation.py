@@ -0,0 +1,45 @@
+# tests/test_instrumentation.py
+import json
+from src import main
+from src.database import get_engine, init_db
+from src.instrumentation import StageTimer, merge_timings, stage, to_prometheus, write_prometheus
+
+
+def test_stage_timer_records_substages_and_counters():
+    timer = StageTimer()
+    with timer.stage("process", rows_in=10) as rec:
+        with stage("process.merge_asof") as sub:
+            sub["rows_out"] = 10
+        rec["rows_out"] = 8
+    with stage("ignored"):  # no active timer outside
+        pass
+    t = timer.as_dict()
+    assert set(t) == {"process", "process.merge_asof"}
+    assert t["process"]["rows_in"] == 10 and t["process"]["rows_out"] == 8
+    assert t["process"]["wall_s"] >= t["process.merge_asof"]["wall_s"] >= 0
+    assert timer.hot_stage() == "process"
+
+
+def test_analyze_ticker_payload_has_timings(fake_fetcher, tmp_path):
+    engine = get_engine(str(tmp_path / "t.db"))
+    init_db(engine)
+    fake_fetcher(300)
+    payload = main.analyze_ticker("TEST", engine=engine, output=str(tmp_path / "out.json"))
+    timings = json.loads((tmp_path / "out.json").read_text())["timings"]
+    assert {"fetch", "process", "signals", "save"} <= set(timings)
+    assert timings["fetch"]["bytes"] > 0
+    assert timings["save"]["db_rows"] == 300 + len(payload["signals"])
+
+
+def test_prometheus_textfile(tmp_path):
+    timings = merge_timings([
+        {"fetch": {"wall_s": 1.5, "cpu_s": 0.1, "rows_out": 10, "db_rows": None, "peak_rss_bytes": 100}},
+        {"fetch": {"wall_s": 0.5, "cpu_s": 0.1, "rows_out": 5, "db_rows": None, "peak_rss_bytes": 300}},
+    ])
+    text = to_prometheus(timings, labels={"ticker": 'A"B'})
+    assert 'financial_analyzer_stage_wall_seconds{ticker="A\\"B",stage="fetch"} 2.0' in text
+    assert 'financial_analyzer_stage_rows_out{ticker="A\\"B",stage="fetch"} 15' in text
+    assert "stage_db_rows_written" not in text
+    assert 'financial_analyzer_peak_rss_bytes{ticker="A\\"B"} 300' in text
+    write_prometheus(str(tmp_path / "m.prom"), timings)
+    assert (tmp_path / "m.prom").read_text().startswith("# HELP")
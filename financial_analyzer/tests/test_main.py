@@ -0,0 +1,103 @@
+# tests/test_main.py
+from src import main
+
+
+def test_read_tickers_dedupes_and_skips_comments(tmp_path):
+    f = tmp_path / "tickers.txt"
+    f.write_text("nvda\n# comment\n\nAAPL, reliance.ns\nNVDA  # again\n")
+    assert main.read_tickers(str(f)) == ["NVDA", "AAPL", "RELIANCE.NS"]
+
+
+def test_batch_job_isolates_failures(monkeypatch, tmp_path):
+    def fake_analyze(ticker, engine=None, output=None, **kwargs):
+        if ticker == "BAD":
+            raise RuntimeError("boom")
+        return {"price_rows_count": 10, "signals": [{}]}
+
+    monkeypatch.setattr(main, "analyze_ticker", fake_analyze)
+    monkeypatch.setattr(main, "_WORKER_ENGINE", None)
+    db_path = str(tmp_path / "t.db")
+    good = main._batch_job("GOOD", db_path, None, {})
+    bad = main._batch_job("BAD", db_path, None, {})
+    assert good["ok"] and good["rows"] == 10 and good["signals"] == 1
+    assert not bad["ok"] and "boom" in bad["error"]
+
+
+def test_incremental_refresh_matches_full_run(fake_fetcher, tmp_path):
+    import pandas as pd
+    from src.database import get_engine, init_db
+
+    full_engine = get_engine(str(tmp_path / "full.db"))
+    inc_engine = get_engine(str(tmp_path / "inc.db"))
+    init_db(full_engine)
+    init_db(inc_engine)
+
+    fake_fetcher(600)
+    main.analyze_ticker("TEST", engine=full_engine)
+
+    fake_fetcher(580)
+    main.analyze_ticker("TEST", engine=inc_engine)
+    fake_fetcher(600)
+    payload = main.analyze_ticker("TEST", engine=inc_engine, incremental=True)
+    assert payload["price_rows_count"] == 20
+
+    q = "SELECT date, close, sma50, sma200 FROM daily_metrics ORDER BY date"
+    full = pd.read_sql(q, full_engine)
+    inc = pd.read_sql(q, inc_engine)
+    pd.testing.assert_frame_equal(full, inc)
+    q = "SELECT date, signal_type FROM signal_events ORDER BY date, signal_type"
+    pd.testing.assert_frame_equal(pd.read_sql(q, full_engine), pd.read_sql(q, inc_engine))
+
+
+def test_cli_import_stays_light():
+    import subprocess
+    import sys
+
+    code = "import sys, src.main; print(sorted(m for m in ('pandas', 'sqlalchemy', 'yfinance', 'pydantic') if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
+
+
+def test_stored_fundamentals_are_not_refetched(fake_fetcher, tmp_path):
+    from benchmarks.synthetic import SyntheticYFinance
+    from src.database import get_engine, init_db, load_fundamentals
+
+    stub = SyntheticYFinance(years=2)
+    fake_fetcher(stub)
+    engine = get_engine(str(tmp_path / "t.db"))
+    init_db(engine)
+
+    first = main.analyze_ticker("AAA", engine=engine)
+    assert stub.calls == 2 and first["timings"]["fundamentals_save"]["db_rows"] == 8
+    # checked recently: prices only
+    second = main.analyze_ticker("AAA", engine=engine)
+    assert stub.calls == 3 and second["fundamentals_used"] == first["fundamentals_used"]
+    # forced re-check: balance sheet fetched, unchanged quarters are not rewritten
+    main.analyze_ticker("AAA", engine=engine, fundamentals_max_age_days=None)
+    assert stub.calls == 5
+    assert load_fundamentals(engine)["version"].eq(1).all()
+
+
+def test_restated_quarter_is_versioned_on_refresh(fake_fetcher, tmp_path):
+    from src.database import FUNDAMENTAL_COLUMNS, get_engine, init_db, load_fundamentals
+
+    engine = get_engine(str(tmp_path / "t.db"))
+    init_db(engine)
+
+    def reporting(equity):
+        def fetch(prices, ticker, known_quarters=None, **kwargs):
+            # like data_fetcher.fetch_fundamentals: known quarters are not returned
+            quarters = [{**dict.fromkeys(FUNDAMENTAL_COLUMNS), "as_of": d, "total_stockholder_equity": equity}
+                        for d in ("2024-03-31", "2024-06-30")]
+            return {**prices(ticker, **kwargs), "source_info": {"used": "quarterly_balance_sheet"},
+                    "fundamentals": [q for q in quarters if q["as_of"] not in (known_quarters or ())]}
+        return fetch
+
+    fake_fetcher(300, reporting(10))
+    main.analyze_ticker("AAA", engine=engine)
+    fake_fetcher(300, reporting(12))
+    main.analyze_ticker("AAA", engine=engine)  # checked recently: not asked again
+    assert load_fundamentals(engine)["version"].eq(1).all()
+    main.analyze_ticker("AAA", engine=engine, fundamentals_max_age_days=None)
+    stored = load_fundamentals(engine)
+    assert stored["version"].eq(2).all() and stored["total_stockholder_equity"].eq(12).all()
@@ -0,0 +1,84 @@
+# tests/test_memo.py
+import json
+import sqlite3
+import pandas as pd
+from src import main
+from src.database import get_engine, get_fingerprint, init_db
+from src.pipeline import Pipeline
+
+
+def test_unchanged_inputs_skip_processing_until_they_change(fake_fetcher, tmp_path):
+    engine = get_engine(str(tmp_path / "t.db"))
+    init_db(engine)
+    fake_fetcher(400)
+    first = main.analyze_ticker("TEST", engine=engine)
+    assert "unchanged" not in first and get_fingerprint("TEST", engine)
+    stored = pd.read_sql("SELECT * FROM daily_metrics", engine)
+
+    again = main.analyze_ticker("TEST", engine=engine)
+    assert again["unchanged"] and "process" not in again["timings"]
+    pd.testing.assert_frame_equal(pd.read_sql("SELECT * FROM daily_metrics", engine), stored)
+
+    # new settings, --force and new bars all recompute
+    assert "unchanged" not in main.analyze_ticker("TEST", engine=engine, indicators={"sma20": "sma:20"})
+    assert "unchanged" not in main.analyze_ticker("TEST", engine=engine, indicators={"sma20": "sma:20"},
+                                                  force=True)
+    fake_fetcher(401)
+    assert "unchanged" not in main.analyze_ticker("TEST", engine=engine)
+
+    # the pipeline shares the fingerprints: only the new ticker is processed, then nothing
+    results = Pipeline(engine, validation=None).run(["TEST", "NEW"])
+    assert {r["ticker"]: r["unchanged"] for r in results} == {"TEST": True, "NEW": False}
+    results = Pipeline(engine, validation=None).run(["TEST", "NEW"])
+    assert all(r["ok"] and r["unchanged"] and r["rows"] == 0 for r in results)
+
+
+def test_incremental_run_keeps_the_full_run_fingerprint(fake_fetcher, tmp_path):
+    engine = get_engine(str(tmp_path / "t.db"))
+    init_db(engine)
+    fake_fetcher(400)
+    main.analyze_ticker("TEST", engine=engine)
+    full = get_fingerprint("TEST", engine)
+
+    incremental = main.analyze_ticker("TEST", engine=engine, incremental=True)
+    assert "unchanged" not in incremental and incremental["price_rows_count"] == 0
+    Pipeline(engine, validation=None, incremental=True).run(["TEST"])
+    assert get_fingerprint("TEST", engine) == full
+    assert main.analyze_ticker("TEST", engine=engine)["unchanged"]
+
+
+def test_unchanged_rerun_keeps_the_output_file(fake_fetcher, tmp_path):
+    engine = get_engine(str(tmp_path / "t.db"))
+    init_db(engine)
+    fake_fetcher(600)
+    output = tmp_path / "t_analysis.json"
+    main.analyze_ticker("T", engine=engine, output=str(output))
+    written = output.read_text()
+    assert json.loads(written)["price_rows_count"] == 600
+
+    assert main.analyze_ticker("T", engine=engine, output=str(output))["unchanged"]
+    assert output.read_text() == written
+    # a missing output is a result still to produce
+    other = tmp_path / "other.json"
+    assert "unchanged" not in main.analyze_ticker("T", engine=engine, output=str(other))
+    assert json.loads(other.read_text())["signals"] == json.loads(written)["signals"]
+
+    Pipeline(engine, validation=None, output_dir=str(tmp_path)).run(["T"])
+    assert output.read_text() == written
+
+
+def test_init_db_adds_fingerprint_columns_to_old_tickers_table(tmp_path):
+    path = tmp_path / "old.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE tickers (id INTEGER PRIMARY KEY, ticker VARCHAR UNIQUE NOT NULL, "
+                     "added_at DATETIME, info TEXT)")
+        conn.execute("INSERT INTO tickers (ticker, info) VALUES ('OLD', 'kept')")
+    engine = get_engine(str(path))
+    init_db(engine)
+    init_db(engine)  # idempotent
+    assert get_fingerprint("OLD", engine) is None
+    from src.database import save_fingerprints
+    save_fingerprints({"OLD": "abc", "NEW": "def"}, engine)
+    rows = pd.read_sql("SELECT ticker, info, fingerprint FROM tickers ORDER BY ticker", engine).fillna("")
+    assert rows.to_dict("records") == [{"ticker": "NEW", "info": "", "fingerprint": "def"},
+                                       {"ticker": "OLD", "info": "kept", "fingerprint": "abc"}]
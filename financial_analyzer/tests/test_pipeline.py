@@ -0,0 +1,63 @@
+# tests/test_pipeline.py
+import threading
+import pandas as pd
+from src import main
+from src.database import get_engine, init_db
+from src.pipeline import Pipeline
+
+
+def test_pipeline_matches_analyze_ticker_and_isolates_failures(fake_fetcher, tmp_path):
+    def fail_bad(fetch, ticker, **kwargs):
+        if ticker == "BAD":
+            raise RuntimeError("no data")
+        return fetch(ticker, **kwargs)
+
+    fake_fetcher(400, fail_bad)
+    serial, piped = get_engine(str(tmp_path / "serial.db")), get_engine(str(tmp_path / "piped.db"))
+    init_db(serial)
+    init_db(piped)
+    tickers = ["AAA", "BBB", "BAD", "CCC", "DDD"]
+    for t in tickers[:2] + tickers[3:]:
+        main.analyze_ticker(t, engine=serial)
+
+    # tiny queues and batches: stages block on each other and the writer flushes often
+    pipeline = Pipeline(piped, fetch_workers=3, process_workers=2, queue_size=1, batch_tickers=2,
+                        output_dir=str(tmp_path), validation=None)
+    results = {r["ticker"]: r for r in pipeline.run(tickers)}
+    assert set(results) == set(tickers)
+    assert not results["BAD"]["ok"] and "no data" in results["BAD"]["error"]
+    assert all(results[t]["ok"] and results[t]["rows"] == 400 for t in tickers if t != "BAD")
+    assert (tmp_path / "aaa_analysis.json").exists()
+    assert pipeline.writer_timer.as_dict()["write"]["db_rows"] >= 4 * 400
+
+    for q in ("SELECT ticker, date, close, sma50, sma200 FROM daily_metrics ORDER BY ticker, date",
+              "SELECT ticker, date, signal_type, meta FROM signal_events ORDER BY ticker, date, signal_type",
+              "SELECT * FROM latest_metrics ORDER BY ticker"):
+        pd.testing.assert_frame_equal(pd.read_sql(q, serial), pd.read_sql(q, piped))
+
+
+def test_pipeline_backpressure_and_stop_flush(fake_fetcher, tmp_path):
+    fetched = []
+
+    def record(fetch, ticker, **kwargs):
+        fetched.append(ticker)
+        return fetch(ticker, **kwargs)
+
+    fake_fetcher(250, record)
+    engine = get_engine(str(tmp_path / "t.db"))
+    init_db(engine)
+    gate = threading.Event()
+    # the writer is held after its first ticker: fetching stops once the queues are full
+    pipeline = Pipeline(engine, fetch_workers=2, queue_size=1, batch_tickers=1, on_result=lambda r: gate.wait(5))
+    runner = threading.Thread(target=pipeline.run, args=([f"T{i}" for i in range(20)],))
+    runner.start()
+    runner.join(1.0)
+    assert runner.is_alive() and len(fetched) <= 6
+    pipeline.stop()
+    gate.set()
+    runner.join(10)
+    assert not runner.is_alive()
+    # everything fetched before stop() was still processed and written
+    assert len(pipeline.results) == len(fetched)
+    stored = pd.read_sql("SELECT COUNT(DISTINCT ticker) AS n FROM daily_metrics", engine)["n"][0]
+    assert stored == len(fetched)
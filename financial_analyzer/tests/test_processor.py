@@ -11,3 +11,48 @@ def test_process_calculations(simple_price_df):
     assert "52w_high" in out.columns or "52w_high" in out.columns
     # SMA monotonic property: sma200 should be numeric
     assert out["sma200"].notna().any()
+
+
+def test_process_panel_matches_process_data(simple_price_df):
+    from src.processor import build_panel, process_panel
+
+    fundamentals = [{"as_of": "2023-03-31", "total_stockholder_equity": 1000.0, "shares_outstanding": 10.0,
+                     "market_cap": 5000.0, "total_debt": 100.0, "cash_and_cash_equivalents": 50.0}]
+    ny = simple_price_df.assign(date=simple_price_df["date"].dt.tz_localize("America/New_York"))
+    raws = [
+        {"ticker": "AAA", "prices": ny, "fundamentals": fundamentals},
+        {"ticker": "BBB", "prices": ny.iloc[:120].assign(close=ny["close"].iloc[:120] * 2), "fundamentals": []},
+    ]
+    expected = pd.concat([process_data(r) for r in raws], ignore_index=True)
+    expected["date"] = expected["date"].dt.tz_localize(None)
+
+    prices, funds = build_panel(raws)
+    panel = process_panel(prices, funds)
+    pd.testing.assert_frame_equal(
+        panel.drop(columns="generated_at"), expected.drop(columns="generated_at"), check_dtype=False
+    )
+    assert panel.loc[panel["ticker"] == "AAA", "bvps"].iloc[-1] == 100.0
+
+
+def test_compact_frame_matches_within_float32_tolerance(simple_price_df):
+    import numpy as np
+    from src.database import get_engine, init_db, save_daily_metrics
+
+    raw = {"ticker": "TEST", "prices": simple_price_df, "fundamentals": [], "source_info": {}}
+    before = simple_price_df.copy()
+    full = process_data(raw)
+    small = process_data(raw, compact_frame=True)
+    pd.testing.assert_frame_equal(simple_price_df, before)  # input left untouched
+
+    assert "generated_at" not in small.columns and "generated_at" in small.attrs
+    assert isinstance(small["ticker"].dtype, pd.CategoricalDtype)
+    assert str(small["volume"].dtype) == "Int64"
+    assert small.memory_usage(deep=True).sum() < full.memory_usage(deep=True).sum() / 2
+    for col in small.columns:
+        if small[col].dtype.kind == "f":
+            assert small[col].dtype == np.float32
+            np.testing.assert_allclose(small[col].astype(float), full[col], rtol=1e-6)
+
+    engine = get_engine(":memory:")
+    init_db(engine)
+    assert save_daily_metrics(small, engine=engine) == len(small)
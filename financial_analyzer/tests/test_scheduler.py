@@ -0,0 +1,90 @@
+# tests/test_scheduler.py
+import threading
+from datetime import datetime, timezone
+from src import main
+from src.scheduler import FakeClock, PriceHistory, Scheduler
+
+MONDAY_NOON = datetime(2025, 1, 6, 12, 0, tzinfo=timezone.utc)
+
+
+def test_refreshes_follow_each_exchange_close():
+    clock = FakeClock(MONDAY_NOON)
+    ran = []
+    s = Scheduler(ran.append, ["AAPL", "RELIANCE.NS"], workers=2, clock=clock)
+    assert s.stats()["queue_depth"] == 0 and s.stats()["scheduled"] == 2
+    assert s.tick() == 2 and s.wait_idle(5)
+    assert sorted(ran) == ["AAPL", "RELIANCE.NS"]
+
+    # 16:00 New York + 20 min today; NSE closed at 10:00 UTC already, so tomorrow 15:30 IST + 20 min
+    assert s._next_due["AAPL"] == datetime(2025, 1, 6, 21, 20, tzinfo=timezone.utc)
+    assert s._next_due["RELIANCE.NS"] == datetime(2025, 1, 7, 10, 20, tzinfo=timezone.utc)
+    assert s.stats()["next_ticker"] == "AAPL" and s.stats()["completed"] == 2
+
+    clock.advance(hours=9, minutes=20)
+    assert s.tick() == 1 and s.wait_idle(5) and ran[-1] == "AAPL"
+    # Friday's close is followed by Monday's
+    assert s.next_refresh("AAPL", datetime(2025, 1, 10, 22, 0, tzinfo=timezone.utc)) == \
+        datetime(2025, 1, 13, 21, 20, tzinfo=timezone.utc)
+    s.shutdown()
+
+
+def test_bounded_pool_runs_urgent_requests_first_and_retries_failures():
+    clock = FakeClock(MONDAY_NOON)
+    gate, ran = threading.Event(), []
+
+    def job(ticker):
+        ran.append(ticker)
+        gate.wait(5)
+        if ticker == "BAD":
+            raise ConnectionError("boom")
+
+    s = Scheduler(job, ["AAA", "BBB", "BAD"], workers=1, clock=clock, retry_delay_seconds=30)
+    assert s.tick() == 1
+    s.request("ZZZ")
+    stats = s.stats()
+    assert stats["in_flight"] == 1 and stats["queue_depth"] == 2 and stats["watchlist"] == 4
+    for _ in range(4):
+        gate.set()
+        s.wait_idle(5)
+        s.tick()
+    s.wait_idle(5)
+    assert ran == ["AAA", "ZZZ", "BBB", "BAD"]
+    assert s.stats()["failed"] == 1 and s.stats()["last_error"]["ticker"] == "BAD"
+    assert (s._next_due["BAD"] - clock.now()).total_seconds() == 30
+    s.shutdown()
+
+
+def test_serve_forever_stops_and_fake_clock_jumps_to_next_due():
+    clock = FakeClock(MONDAY_NOON)
+
+    def job(ticker):
+        if s.stats()["completed"] >= 2:
+            s.stop()
+
+    s = Scheduler(job, ["AAPL"], clock=clock)
+    s.serve_forever(max_wait=3600)
+    assert s.stats()["completed"] == 3
+    assert clock.now() >= datetime(2025, 1, 7, 21, 20, tzinfo=timezone.utc)
+
+
+def test_warm_history_fetches_only_new_bars(fake_fetcher, tmp_path):
+    from benchmarks.synthetic import SyntheticYFinance
+    from src.database import get_engine, init_db
+
+    starts = []
+
+    def record(fetch, ticker, **kw):
+        starts.append(kw.get("start"))
+        return fetch(ticker, **kw)
+
+    fake_fetcher(SyntheticYFinance(years=2), record)
+    engine = get_engine(str(tmp_path / "t.db"))
+    init_db(engine)
+    history = PriceHistory(keep_bars=260)
+
+    first = main.analyze_ticker("AAA", engine=engine, incremental=True, history=history)
+    assert starts == [None] and len(history.get("AAA")) == 260
+    second = main.analyze_ticker("AAA", engine=engine, incremental=True, history=history)
+    last = history.get("AAA")["date"].iloc[-1].date()
+    assert starts[1] > last and "db_lookup" not in second["timings"]
+    assert first["price_rows_count"] == 504 and second["price_rows_count"] == 0
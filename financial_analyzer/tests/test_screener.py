@@ -0,0 +1,47 @@
+# tests/test_screener.py
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+from src.database import get_engine, init_db, save_daily_metrics
+from src.screener import parse_filter, screen
+from src.sharding import ShardedStore
+
+
+def _panel(tickers: int = 20) -> pd.DataFrame:
+    dates = pd.bdate_range("2024-01-01", periods=260)
+    frames = []
+    for i in range(tickers):
+        close = 50 + i + np.linspace(0, 10, len(dates)) * (1 if i % 2 else -1)
+        frames.append(pd.DataFrame({"ticker": f"S{i:02d}", "date": dates, "close": close,
+                                    "volume": 1000 * (i + 1), "price_to_book": i / 4}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_parse_filter():
+    assert parse_filter("price_to_book < 3") == ("price_to_book", "<", 3.0)
+    assert parse_filter("pct_from_52w_high>=-5") == ("pct_from_high", ">=", -5.0)
+    assert parse_filter("sma50 > sma200") == ("sma50", ">", ("sma200",))
+    assert parse_filter("date == '2024-06-03'") == ("date", "=", "2024-06-03")
+    for bad in ("close", "close ~ 3", "close; DROP TABLE x < 1"):
+        with pytest.raises(ValueError):
+            parse_filter(bad)
+
+
+def test_screen_single_file_and_shards_agree(tmp_path):
+    df = _panel()
+    engine = get_engine(str(tmp_path / "one.db"))
+    init_db(engine)
+    save_daily_metrics(df, engine=engine)
+    store = ShardedStore(tmp_path / "fa.db", 3)
+    store.init()
+    store.save_daily_metrics(df)
+
+    filters = ["pct_from_high >= -5", "price_to_book < 3"]
+    options = {"columns": ["close", "pct_from_high"], "sort": "volume", "descending": True, "limit": 4}
+    cols, rows = screen(sqlite3.connect(tmp_path / "one.db"), filters, **options)
+    # rising tickers sit at their high; falling ones are ~10-16% below it
+    assert cols == ["ticker", "close", "pct_from_high", "volume"]
+    assert [r[0] for r in rows] == ["S11", "S09", "S07", "S05"]
+    assert store.screen(filters, **options) == (cols, rows)
+    assert len(store.screen(["pct_from_high < -5"])[1]) == 10
@@ -1,7 +1,10 @@
 # tests/test_signals.py
+import numpy as np
 import pandas as pd
+import pytest
 from src.signals import detect_golden_crossover, detect_death_cross
 
+
 def test_signal_detection_simple():
     # create a scenario where sma50 crosses above sma200 on day 3
     df = pd.DataFrame({
@@ -21,4 +24,48 @@ def test_signal_detection_simple():
     })
     death = detect_death_cross(df2)
     assert len(death) >= 1
-    # Expect cross when sma50 moves from >= sma200 to < sma200 (day index 2 -> day3)
\ No newline at end of file
+    # Expect cross when sma50 moves from >= sma200 to < sma200 (day index 2 -> day3)
+
+
+def test_rule_set_panel_meta_and_custom_rules():
+    from src.signals import RuleSet, rules_from_config
+
+    one = pd.DataFrame({
+        "date": pd.date_range("2023-01-02", periods=6),
+        "close": [10.0, 11, 12, 11, 13, 14],
+        "52w_high": [10.0, 11, 12, 12, 13, 14],
+        "price_to_book": [2.0, 0.9, 0.8, 1.2, 0.7, 0.6],
+        "sma50": [1.0, 1, 2, 3, 1, 0],
+        "sma200": [2.0, 2, 2, 2, 2, 2],
+    })
+    # the second ticker starts above: no cross may leak over from the first
+    panel = pd.concat([one.assign(ticker="AAA"), one.assign(ticker="BBB", sma50=[3.0, 3, 3, 3, 1, 1])],
+                      ignore_index=True)
+    rules = rules_from_config({"signals": {
+        "new_high": "cross_above(close, high_52w[1])",
+        "cheap": {"when": "price_to_book < 1", "edge": True, "meta": ["price_to_book"]},
+        "cheap_golden": "golden_cross and price_to_book < 3",
+    }})
+    assert rules.names == ["golden_cross", "death_cross", "new_high", "cheap", "cheap_golden"]
+    events = rules.events(panel)
+    got = {(e["ticker"], e["date"][:10], e["signal_type"]) for e in events}
+    assert got == {
+        ("AAA", "2023-01-05", "golden_cross"), ("AAA", "2023-01-05", "cheap_golden"),
+        ("AAA", "2023-01-06", "death_cross"), ("BBB", "2023-01-06", "death_cross"),
+        ("AAA", "2023-01-06", "new_high"), ("BBB", "2023-01-06", "new_high"),
+        ("AAA", "2023-01-03", "cheap"), ("AAA", "2023-01-06", "cheap"),
+        ("BBB", "2023-01-03", "cheap"), ("BBB", "2023-01-06", "cheap"),
+    }
+    golden = next(e for e in events if e["signal_type"] == "golden_cross")
+    assert golden["date"] == "2023-01-05T00:00:00" and golden["meta"] == {"sma50": 3.0, "sma200": 2.0}
+    assert next(e for e in events if e["signal_type"] == "cheap")["meta"] == {"price_to_book": 0.9}
+
+    masks = RuleSet({"up": "cross_above(sma50 - prev(sma50), 0)"}).masks(one, by=None)
+    assert np.flatnonzero(masks["up"]).tolist() == [2]
+    with pytest.raises(ValueError):
+        RuleSet({"bad": "__import__('os')"})
+    with pytest.raises(ValueError):
+        RuleSet({"bad": "sma50[-1] > 0"})
+    for spec in (True, 5, ["close > 0"]):
+        with pytest.raises(ValueError, match="'bad'"):
+            RuleSet({"bad": spec})
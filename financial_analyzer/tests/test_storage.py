@@ -0,0 +1,70 @@
+# tests/test_storage.py
+import pandas as pd
+import pytest
+from datetime import date
+from src import main
+from src.storage import ParquetStore, init_store, open_store
+
+pytest.importorskip("pyarrow")
+
+
+def _metrics(ticker, start, n):
+    dates = pd.bdate_range(start, periods=n)
+    return pd.DataFrame({"ticker": ticker, "date": dates, "close": range(n), "volume": 100,
+                         "sma50": 1.0, "sma200": None})
+
+
+def test_parquet_store_upserts_partitions(tmp_path):
+    store = ParquetStore(tmp_path / "pq")
+    assert store.save_daily_metrics(_metrics("AAA", "2023-12-25", 10)) == 10
+    store.save_daily_metrics(_metrics("BRK/B", "2023-12-25", 5))
+    # overlapping rewrite: same dates replaced, new ones appended, nothing duplicated
+    store.save_daily_metrics(_metrics("AAA", "2024-01-01", 10).assign(close=-1.0))
+    assert sorted(p.name for p in (store.metrics_dir / "ticker=AAA").iterdir()) == ["year=2023", "year=2024"]
+
+    df = store.read_daily_metrics(columns=["date", "close"], tickers=["AAA"])
+    assert list(df.columns) == ["ticker", "date", "close"]
+    assert len(df) == 15 and df["date"].is_unique
+    assert (df.loc[df["date"] >= "2024-01-01", "close"] == -1.0).all()
+    assert store.get_latest_date("AAA") == date(2024, 1, 12)
+    assert store.get_latest_date("BRK/B") == date(2023, 12, 29)
+    assert store.get_latest_date("NONE") is None
+
+    jan = store.scan(["close"], start=date(2024, 1, 1))
+    assert set(jan.column("ticker").to_pylist()) == {"AAA"}
+
+
+def test_pipeline_on_parquet_backend_matches_sqlite(fake_fetcher, tmp_path):
+    fake_fetcher(600)
+    store = open_store({"database": {"backend": "parquet", "parquet_dir": str(tmp_path / "pq")}})
+    engine = open_store({"database": {"path": str(tmp_path / "t.db")}})
+    init_store(engine)
+    main.analyze_ticker("TEST", engine=store)
+    main.analyze_ticker("TEST", engine=store)  # idempotent re-run
+    main.analyze_ticker("TEST", engine=engine)
+
+    pq_df = store.read_daily_metrics(columns=["date", "close", "sma50", "sma200"])
+    sql_df = pd.read_sql("SELECT date, close, sma50, sma200 FROM daily_metrics ORDER BY date", engine,
+                         parse_dates=["date"])
+    pd.testing.assert_frame_equal(pq_df.drop(columns="ticker"), sql_df, check_dtype=False)
+    signals = store.read_signal_events()
+    assert len(signals) == pd.read_sql("SELECT COUNT(*) AS n FROM signal_events", engine)["n"][0]
+
+
+def test_parquet_fingerprints_are_kept_per_ticker(tmp_path):
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import get_context
+
+    root = tmp_path / "pq"
+    store = ParquetStore(root)
+    assert store.get_fingerprint("BRK.B") is None
+    # separate writer processes only ever replace their own tickers' files
+    with ProcessPoolExecutor(max_workers=2, mp_context=get_context("spawn")) as pool:
+        list(pool.map(_save_fingerprint, [str(root)] * 20, [f"T{i}" for i in range(20)]))
+    store.save_fingerprints({"BRK.B": "abc", "T3": "new"})
+    assert [store.get_fingerprint(t) for t in ("BRK.B", "T3", "T19")] == ["abc", "new", "fp-T19"]
+    assert len(list(store.tickers_dir.glob("*.json"))) == 21
+
+
+def _save_fingerprint(root, ticker):
+    return ParquetStore(root).save_fingerprints({ticker: f"fp-{ticker}"})
@@ -0,0 +1,44 @@
+# tests/test_streaming.py
+import json
+import numpy as np
+import pandas as pd
+from src.processor import process_data
+from src.signals import detect_death_cross, detect_golden_crossover
+from src.streaming import StreamingEngine
+
+
+def _history(n=700, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    close[300:310] = close[299]  # flat run exercises pandas' same-value handling
+    close[400] = np.nan
+    return pd.DataFrame({"date": pd.date_range("2020-01-01", periods=n), "close": close})
+
+
+def test_replay_matches_process_data_and_signals():
+    hist = _history()
+    expected = process_data({"ticker": "X", "prices": hist, "fundamentals": []})
+
+    seen = []
+    engine = StreamingEngine(on_event=seen.append)
+    # stream the first half bar by bar, snapshot/restore, then the rest as one micro-batch
+    rows = [engine.update("X", d, c)[0] for d, c in zip(hist["date"][:350], hist["close"][:350])]
+    engine = StreamingEngine.restore(json.loads(json.dumps(engine.snapshot())), on_event=seen.append)
+    batch, _ = engine.update_batch(hist.iloc[350:].assign(ticker="X"))
+    got = pd.concat([pd.DataFrame(rows), batch], ignore_index=True)
+
+    for col in ("sma50", "sma200", "52w_high", "pct_from_52w_high"):
+        pd.testing.assert_series_equal(got[col], expected[col], check_exact=True, check_names=False)
+
+    golden = [e["date"] for e in seen if e["signal_type"] == "golden_cross"]
+    death = [e["date"] for e in seen if e["signal_type"] == "death_cross"]
+    assert golden == detect_golden_crossover(expected)
+    assert death == detect_death_cross(expected)
+    assert golden and set(seen[0]["meta"]) == {"sma50", "sma200"}
+
+
+def test_stale_bars_are_ignored():
+    engine = StreamingEngine()
+    engine.update("X", "2024-01-02", 10.0)
+    row, events = engine.update("X", "2024-01-01", 11.0)
+    assert row is None and events == []
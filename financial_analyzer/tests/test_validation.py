@@ -0,0 +1,67 @@
+# tests/test_validation.py
+import numpy as np
+import pandas as pd
+import pytest
+from src import main
+from src.database import get_engine, init_db
+from src.validation import PriceValidationError, check_prices, validate_prices
+
+
+def _prices(n=10, ticker=None):
+    df = pd.DataFrame({"date": pd.bdate_range("2024-01-01", periods=n), "open": 10.0, "high": 11.0,
+                       "low": 9.0, "close": 10.5, "volume": 100})
+    return df if ticker is None else df.assign(ticker=ticker)
+
+
+def test_checks_flag_each_problem_row():
+    df = _prices(12)
+    df.loc[1, "low"] = 10.8                      # above open and close
+    df.loc[2, "volume"] = -1
+    df.loc[[4, 5, 6], "close"] = np.nan          # a 3-bar NaN run
+    df.loc[8, "date"] = df.loc[7, "date"]        # duplicate, the later row wins
+    df = df.iloc[[0, 1, 2, 3, 4, 5, 6, 7, 8, 10, 9]].reset_index(drop=True)
+    df.loc[len(df)] = [pd.Timestamp("2024-02-01"), 10.0, 11.0, 9.0, 10.5, 100]
+    masks, run_len = check_prices(df)
+    flagged = {k: np.flatnonzero(v).tolist() for k, v in masks.items()}
+    assert flagged == {"ohlc_bounds": [1], "negative_volume": [2], "duplicate_date": [7],
+                       "out_of_order": [10], "nan_run": [4, 5, 6], "calendar_gap": [11]}
+    assert run_len[4:7].tolist() == [3, 3, 3]
+
+    out, report = validate_prices(df, policy="repair", max_fill_bars=3)
+    assert report.to_dict()["counts"]["nan_run"] == 3 and report.longest_nan_run == 3
+    assert report.samples["ohlc_bounds"][0]["row"] == 1
+    assert len(out) == 11 and out["date"].is_monotonic_increasing and not out["date"].duplicated().any()
+    assert out["close"].notna().all() and (out["low"] <= out[["open", "close"]].min(axis=1)).all()
+    assert out["volume"].isna().sum() == 1
+
+    dropped, report = validate_prices(df, policy="drop")
+    assert report.rows_out == len(dropped) == 6
+    assert validate_prices(df, policy="repair", max_fill_bars=2)[0]["date"].nunique() == 8
+    with pytest.raises(PriceValidationError) as err:
+        validate_prices(df, policy="fail")
+    assert err.value.report.counts["calendar_gap"] == 1
+
+
+def test_panel_checks_stay_within_each_ticker():
+    # the same dates under two tickers are neither duplicates nor out of order
+    panel = pd.concat([_prices(5, "AAA"), _prices(5, "BBB")], ignore_index=True)
+    out, report = validate_prices(panel, policy="fail")
+    assert report.ok and out is panel
+    assert not validate_prices(panel, policy="warn", by=None)[1].ok
+
+
+def test_pipeline_validates_fetched_prices(fake_fetcher, tmp_path):
+    def corrupt(fetch, ticker, **kwargs):
+        raw = fetch(ticker, **kwargs)
+        raw["prices"].loc[100, "low"] = raw["prices"].loc[100, "high"] + 5
+        return raw
+
+    fake_fetcher(300, corrupt)
+    engine = get_engine(str(tmp_path / "t.db"))
+    init_db(engine)
+    settings = {"policy": "drop", "max_missing_sessions": 3}
+    payload = main.analyze_ticker("AAA", engine=engine, validation=settings)
+    assert payload["price_rows_count"] == 299 and "validate" in payload["timings"]
+    assert payload["validation"]["counts"] == {"ohlc_bounds": 1}
+    with pytest.raises(PriceValidationError):
+        main.analyze_ticker("AAA", engine=engine, validation={"policy": "fail"})